@@ -1,13 +1,15 @@
 # api.py
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Body, Path
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Body, Path, Query, Header
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
 import numpy as np
-from io import StringIO
 import os
 import traceback
 from typing import Dict, Any, List, Tuple, Optional # Add Optional
+import asyncio
+import json
 from pydantic import BaseModel # NEW: Import BaseModel for Pydantic models
 
 app = FastAPI()
@@ -17,13 +19,21 @@ try:
     from src.database import (
         save_actual_to_db, load_actuals, init_db,
         update_anomaly_flags_in_db, update_single_data_point_anomaly_status,
-        update_imputed_values_in_db,
+        update_imputed_values_in_db, load_forecasts, load_forecast_vs_actual, load_actuals_bulk,
         # NEW IMPORTS
-        get_containers, add_container, update_container_name, delete_container
+        get_containers, add_container, update_container_name, delete_container,
+        container_exists, refresh_container_registry, close_all_connections
     )
-    from src.prophet_model import forecast_with_prophet
-    from src.tf_keras_model import forecast_with_tensorflow
+    from src.forecast_service import run_forecast, run_forecast_batch_item, train_global_lstm_job, stored_model_name, ForecastRequestError, PERIODS_MAP, SUPPORTED_MODELS
+    from src.forecast_jobs import submit_job, submit_coordinator_job, submit_task, get_job, get_job_future, get_job_counts, prune_finished_jobs, shutdown_executor, start_workers
+    from src.backtesting import run_backtest, BACKTEST_MODELS
     from src.data_loader import add_features, identify_anomalies_iqr, clean_actual_data_interpolate
+    from src.ingestion import ingest_csv_stream, CsvStructureError
+    from src.downsampling import downsample_actuals, DOWNSAMPLING_METHODS
+    from src.model_store import delete_container_artifacts, rename_container_artifacts
+    from src.serialization import (
+        negotiate_format, render_table_response, forecast_payload_to_records, UnsupportedFormatError, RESPONSE_FORMATS
+    )
     from src import config
 except ImportError as e:
     print(f"ERROR: Could not import module: {e}")
@@ -34,23 +44,61 @@ except ImportError as e:
     def update_anomaly_flags_in_db(*args, **kwargs): print("WARN: update_anomaly_flags_in_db (dummy) called"); return 0
     def update_single_data_point_anomaly_status(*args, **kwargs): print("WARN: update_single_data_point_anomaly_status (dummy) called"); return 0
     def update_imputed_values_in_db(*args, **kwargs): print("WARN: update_imputed_values_in_db (dummy) called"); return 0
+    def load_forecasts(*args, **kwargs): print("WARN: load_forecasts (dummy) called"); return []
+    def load_forecast_vs_actual(*args, **kwargs): print("WARN: load_forecast_vs_actual (dummy) called"); return []
+    def load_actuals_bulk(*args, **kwargs): print("WARN: load_actuals_bulk (dummy) called"); return {}
     # Dummy functions for NEW container management
     def get_containers(*args, **kwargs): print("WARN: get_containers (dummy) called"); return []
     def add_container(*args, **kwargs): print("WARN: add_container (dummy) called"); return False
     def update_container_name(*args, **kwargs): print("WARN: update_container_name (dummy) called"); return False
     def delete_container(*args, **kwargs): print("WARN: delete_container (dummy) called"); return False
-    # Ensure dummy forecast_with_prophet returns two values now
-    def forecast_with_prophet(*args, **kwargs):
-        print("WARN: forecast_with_prophet (dummy) called")
-        return pd.DataFrame({'ds': [], 'yhat': [], 'yhat_lower': [], 'yhat_upper': [], 'trend': []}), {}
-    def forecast_with_tensorflow(*args, **kwargs):
-        print("WARN: forecast_with_tensorflow (dummy) called")
-        # TF model might also return a report in the future, for now, empty dict
-        return pd.DataFrame({'ds': [], 'yhat': []}), {}
+    def container_exists(*args, **kwargs): return False
+    def refresh_container_registry(*args, **kwargs): pass
+    def close_all_connections(*args, **kwargs): pass
+    # Dummy forecast pipeline and job queue
+    PERIODS_MAP = {'1d': 1, '7d': 7, '30d': 30, '90d': 90}
+    SUPPORTED_MODELS = ['prophet', 'tensorflow', 'tensorflow_global']
+    class ForecastRequestError(Exception):
+        def __init__(self, status_code: int, detail: str):
+            super().__init__(status_code, detail); self.status_code = status_code; self.detail = detail
+    def run_forecast(*args, **kwargs):
+        print("WARN: run_forecast (dummy) called")
+        return {"forecast_data": [], "message": "Prognose-Modul nicht verfügbar."}
+    def run_forecast_batch_item(*args, **kwargs): print("WARN: run_forecast_batch_item (dummy) called"); return {}
+    def train_global_lstm_job(*args, **kwargs): print("WARN: train_global_lstm_job (dummy) called"); return {}
+    def stored_model_name(model_choice, lstm_mode=None, prophet_train_with_anomalies=False): return model_choice
+    def submit_job(*args, **kwargs): raise RuntimeError("forecast_jobs module not available")
+    def submit_coordinator_job(*args, **kwargs): raise RuntimeError("forecast_jobs module not available")
+    def submit_task(*args, **kwargs): raise RuntimeError("forecast_jobs module not available")
+    BACKTEST_MODELS = ['prophet', 'tensorflow']
+    def run_backtest(*args, **kwargs): print("WARN: run_backtest (dummy) called"); return {}
+    def get_job(*args, **kwargs): print("WARN: get_job (dummy) called"); return None
+    def get_job_future(*args, **kwargs): print("WARN: get_job_future (dummy) called"); return None
+    def get_job_counts(*args, **kwargs): return {}
+    def prune_finished_jobs(*args, **kwargs): pass
+    def shutdown_executor(*args, **kwargs): pass
+    def start_workers(*args, **kwargs): pass
     def identify_anomalies_iqr(df, value_column_name, iqr_factor=1.5) -> Tuple[pd.DataFrame, int]:
         print("WARN: identify_anomalies_iqr (dummy) called")
         df_copy = df.copy(); df_copy['is_anomaly'] = False; return df_copy, 0
     def add_features(df, target_column, include_lag_rolling=True): print("WARN: add_features (dummy) called"); return df, [], []
+    class CsvStructureError(ValueError):
+        def __init__(self, status_code: int, message: str, detail: str, errors=None):
+            super().__init__(status_code, message, detail, errors); self.status_code = status_code; self.message = message; self.detail = detail; self.errors = errors or []
+    def ingest_csv_stream(*args, **kwargs): print("WARN: ingest_csv_stream (dummy) called"); return {"rows_read": 0, "chunks": 0, "errors": []}
+    DOWNSAMPLING_METHODS = ['lttb', 'minmax']
+    def downsample_actuals(rows, max_points, method='lttb'): print("WARN: downsample_actuals (dummy) called"); return rows[:max_points]
+    def delete_container_artifacts(*args, **kwargs): pass
+    def rename_container_artifacts(*args, **kwargs): pass
+    RESPONSE_FORMATS = ['records']
+    class UnsupportedFormatError(Exception):
+        def __init__(self, detail: str):
+            super().__init__(detail); self.status_code = 406; self.detail = detail
+    def negotiate_format(*args, **kwargs): return 'records'
+    def forecast_payload_to_records(payload): return payload
+    def render_table_response(table, response_format, meta=None, table_key=None, status_code=200, headers=None):
+        records = [dict(zip(table.keys(), row)) for row in zip(*table.values())] if table else []
+        return JSONResponse(status_code=status_code, content=records if table_key is None else dict(meta or {}, **{table_key: records}), headers=headers)
     def clean_actual_data_interpolate(*args, **kwargs) -> Tuple[pd.DataFrame, List[Tuple[str, float]], int]:
         print("WARN: clean_actual_data_interpolate (dummy) called")
         return pd.DataFrame(columns=['date','actual','is_anomaly']), [], 0
@@ -58,12 +106,15 @@ except ImportError as e:
 app.add_middleware(
     CORSMiddleware, allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"],
+    expose_headers=["X-Total-Points"], # Sonst können Browser-Clients den Header der Ist-Werte-Abfrage nicht lesen
 )
 print("CORS middleware added.")
 
 @app.on_event("startup")
 async def startup_event():
     print("Application startup event triggered.")
+    config.log_config_summary()
+    config.ensure_results_dir()
     init_db()
     # Add default containers if the containers table is empty
     # This ensures there are always some containers available initially
@@ -74,7 +125,35 @@ async def startup_event():
         for container_name in default_containers:
             add_container(container_name)
         print("INFO (api.py - startup): Default containers added.")
+    refresh_container_registry()
     print("Database initialization complete (called from startup event).")
+    if config.PREWARM_MODEL_BACKENDS:
+        start_workers() # Worker laden ihre Modell-Backends im Hintergrund (forecast_jobs._initialize_worker)
+    app.state.job_pruner = asyncio.create_task(prune_jobs_periodically())
+
+async def prune_jobs_periodically():
+    """Entfernt abgelaufene Jobs im Hintergrund; das DELETE läuft im Threadpool, nicht im Event-Loop."""
+    while True:
+        await asyncio.sleep(config.FORECAST_JOB_PRUNE_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(prune_finished_jobs)
+        except Exception as e:
+            print(f"ERROR (api.py): Pruning finished jobs failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    print("Application shutdown event triggered.")
+    job_pruner = getattr(app.state, "job_pruner", None)
+    if job_pruner is not None:
+        job_pruner.cancel()
+    shutdown_executor()
+    close_all_connections()
+
+@app.get("/api/health")
+async def health_endpoint():
+    """Liveness check. Answers immediately, even while forecasts are training in the process pool."""
+    job_counts = await run_in_threadpool(get_job_counts)
+    return JSONResponse(status_code=200, content={"status": "ok", "forecast_jobs": job_counts})
 
 @app.post("/api/upload_data/")
 async def upload_data_endpoint(file: UploadFile = File(...), container_id: str = Form(...)):
@@ -82,65 +161,79 @@ async def upload_data_endpoint(file: UploadFile = File(...), container_id: str =
         raise HTTPException(status_code=400, detail="Nur CSV Dateien (.csv) sind erlaubt.")
     
     # Check if the container_id exists in the containers table
-    if container_id not in get_containers():
+    if not container_exists(container_id):
         raise HTTPException(status_code=404, detail=f"Container '{container_id}' existiert nicht in der Datenbank. Bitte erstellen Sie ihn zuerst.")
 
     try:
-        content = await file.read()
-        if not content:
-            raise HTTPException(status_code=400, detail="Die hochgeladene Datei ist leer.")
-
-        try: decoded_content = content.decode('utf-8-sig')
-        except UnicodeDecodeError:
-            try: decoded_content = content.decode('utf-8')
-            except UnicodeDecodeError:
-                decoded_content = content.decode('latin1', errors='replace')
-                print(f"WARN (api.py - upload): File '{file.filename}' for '{container_id}' was not UTF-8. Decoded with latin1 (errors replaced).")
-
-        df_uploaded = pd.read_csv(StringIO(decoded_content), sep=config.DATA_SEPARATOR)
-        if df_uploaded.empty: raise HTTPException(status_code=400, detail="CSV enthält keine Datenzeilen.")
-
-        df_uploaded.columns = [str(col).strip().lower() for col in df_uploaded.columns]
-        date_col_variants = ['date', 'datum', 'zeitstempel', 'timestamp', 'ds']
-        value_col_variants = ['value', 'wert', 'verbrauch', 'y']
-        actual_date_col = next((col for col in df_uploaded.columns if col in date_col_variants), None)
-        actual_value_col = next((col for col in df_uploaded.columns if col in value_col_variants), None)
-        error_details_for_user = []
-        if not actual_date_col: error_details_for_user.append(f"Datum ('{'/'.join(date_col_variants)}')")
-        if not actual_value_col: error_details_for_user.append(f"Wert ('{'/'.join(value_col_variants)}')")
-
-        if error_details_for_user:
-            detail_msg = f"CSV muss Spalten für { ' und '.join(error_details_for_user) } enthalten."
-            return JSONResponse(status_code=422, content={"message": "Fehlerhafte CSV-Struktur.", "detail": detail_msg, "errors": [{"row_csv": 1, "column_name": "Header", "error_message": detail_msg, "original_value": f"Gefundene Spalten (normalisiert): {df_uploaded.columns.tolist()}"}]})
-
-        df_to_save = df_uploaded[[actual_date_col, actual_value_col]].rename(columns={actual_date_col: 'Date', actual_value_col: 'Value'})
-        processing_errors = save_actual_to_db(df_to_save, container_id, source_file=file.filename or "unknown.csv")
+        # Streams the spooled upload in chunks in a worker thread instead of reading it into memory.
+        ingestion_result = await run_in_threadpool(ingest_csv_stream, file.file, container_id, file.filename or "unknown.csv")
+        processing_errors = ingestion_result["errors"]
         if processing_errors: return JSONResponse(status_code=422, content={"message": "Fehler bei Verarbeitung.", "detail": "Einige Zeilen fehlerhaft.", "errors": processing_errors})
-        return JSONResponse(status_code=200, content={"message": f"Daten für '{container_id}' erfolgreich hochgeladen."})
+        return JSONResponse(status_code=200, content={"message": f"Daten für '{container_id}' erfolgreich hochgeladen.", "rows_read": ingestion_result["rows_read"]})
+    except CsvStructureError as ce:
+        if ce.status_code == 422: return JSONResponse(status_code=422, content={"message": ce.message, "detail": ce.detail, "errors": ce.errors})
+        raise HTTPException(status_code=ce.status_code, detail=ce.detail)
     except HTTPException as he: raise he
     except UnicodeDecodeError: traceback.print_exc(); raise HTTPException(status_code=400, detail="Fehler beim Dekodieren der Datei. Bitte stellen Sie sicher, dass die Datei UTF-8 kodiert ist.")
     except Exception as e: traceback.print_exc(); raise HTTPException(status_code=500, detail=f"Interner Serverfehler beim Upload: {str(e)}.")
 
+def _negotiate_response_format(accept: Optional[str], requested_format: Optional[str]) -> str:
+    try:
+        return negotiate_format(accept, requested_format)
+    except UnsupportedFormatError as ue:
+        raise HTTPException(status_code=ue.status_code, detail=ue.detail)
+
+def _normalize_date_bound(value: Optional[str], param_name: str, end_of_day: bool = False) -> Optional[str]:
+    """Bringt from/to-Parameter in das Speicherformat von 'actuals'; ein reines Datum als 'to' schließt den ganzen Tag ein."""
+    if value is None:
+        return None
+    try:
+        timestamp = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail=f"Ungültiges Datum für '{param_name}': '{value}'. Erwartet ISO-Format, z.B. 2024-01-31.")
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    if end_of_day and len(value.strip()) == 10:
+        timestamp = timestamp + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')
+
 @app.get("/api/historical_data/{container_id:path}")
-async def get_historical_data_endpoint(container_id: str = Path(..., title="The ID of the container, can contain slashes")):
+async def get_historical_data_endpoint(
+    container_id: str = Path(..., title="The ID of the container, can contain slashes"),
+    date_from: Optional[str] = Query(None, alias="from", description="Startdatum (inklusive), ISO-Format"),
+    date_to: Optional[str] = Query(None, alias="to", description="Enddatum (inklusive), ISO-Format"),
+    max_points: Optional[int] = Query(None, ge=3, description="Höchstzahl gelieferter Punkte; größere Reihen werden formerhaltend ausgedünnt"),
+    downsample: str = Query('lttb', description=f"Ausdünnungsverfahren: {', '.join(DOWNSAMPLING_METHODS)}"),
+    response_format: Optional[str] = Query(None, alias="format", description=f"Antwortformat: {', '.join(RESPONSE_FORMATS)} (sonst per Accept-Header)"),
+    accept: Optional[str] = Header(None)
+):
     # Check if the container_id exists in the containers table
-    if container_id not in get_containers():
+    if not container_exists(container_id):
         raise HTTPException(status_code=404, detail=f"Container '{container_id}' existiert nicht.")
+    response_format = _negotiate_response_format(accept, response_format)
+    if downsample not in DOWNSAMPLING_METHODS:
+        raise HTTPException(status_code=400, detail=f"Ungültige Downsampling-Methode '{downsample}'. Erlaubt: {DOWNSAMPLING_METHODS}")
+    range_from = _normalize_date_bound(date_from, "from")
+    range_to = _normalize_date_bound(date_to, "to", end_of_day=True)
     try:
-        rows: List[Tuple[str, float | None, bool]] = load_actuals(container_id)
-        if not rows: return JSONResponse(status_code=200, content=[])
-        df_from_db = pd.DataFrame(rows, columns=['date', 'actual', 'is_anomaly'])
-        df_for_json = df_from_db.replace({pd.NA: None, np.nan: None})
-        df_for_json = df_for_json.sort_values(by='date')
-        records = df_for_json.to_dict(orient='records')
-        return JSONResponse(status_code=200, content=records)
+        rows: List[Tuple[str, float | None, bool]] = await run_in_threadpool(load_actuals, container_id, range_from, range_to)
+        total_points = len(rows)
+        if max_points is not None:
+            rows = downsample_actuals(rows, max_points, downsample)
+        # Zeilen kommen bereits sortiert aus SQLite; spaltenweise aufteilen, None wird im Werte-Array zu NaN.
+        table = {}
+        if rows:
+            dates, values, flags = zip(*rows)
+            table = {"date": list(dates), "actual": np.array(values, dtype=np.float64), "is_anomaly": np.array(flags, dtype=bool)}
+        return render_table_response(table, response_format, headers={"X-Total-Points": str(total_points)})
+    except UnsupportedFormatError as ue: raise HTTPException(status_code=ue.status_code, detail=ue.detail)
     except Exception as e: traceback.print_exc(); raise HTTPException(status_code=500, detail=f"Failed to load historical data: {str(e)}")
 
 @app.post("/api/actuals/{container_id:path}/analyze_and_mark_anomalies")
 async def analyze_and_mark_anomalies_endpoint(container_id: str = Path(..., title="The ID of the container, can contain slashes")):
     print(f"--- POST /api/actuals/{container_id}/analyze_and_mark_anomalies ---")
     # Check if the container_id exists in the containers table
-    if container_id not in get_containers():
+    if not container_exists(container_id):
         raise HTTPException(status_code=404, detail=f"Container '{container_id}' existiert nicht.")
     try:
         historical_rows = load_actuals(container_id)
@@ -168,7 +261,7 @@ async def analyze_and_mark_anomalies_endpoint(container_id: str = Path(..., titl
 async def update_anomaly_datapoint_status_endpoint(container_id: str = Path(..., title="The ID of the container, can contain slashes"), payload: Dict[str, Any] = Body(...)):
     print(f"--- POST /api/actuals/{container_id}/update_anomaly_datapoint ---")
     # Check if the container_id exists in the containers table
-    if container_id not in get_containers():
+    if not container_exists(container_id):
         raise HTTPException(status_code=404, detail=f"Container '{container_id}' existiert nicht.")
     datapoint_date_str = payload.get("date"); new_status = payload.get("is_anomaly")
     if datapoint_date_str is None or not isinstance(new_status, bool): raise HTTPException(status_code=400, detail="Payload must include 'date' (string) and 'is_anomaly' (boolean).")
@@ -186,7 +279,7 @@ async def update_anomaly_datapoint_status_endpoint(container_id: str = Path(...,
 async def clean_data_endpoint(container_id: str = Path(..., title="The ID of the container, can contain slashes")):
     print(f"--- POST /api/actuals/{container_id}/clean_data ---")
     # Check if the container_id exists in the containers table
-    if container_id not in get_containers():
+    if not container_exists(container_id):
         raise HTTPException(status_code=404, detail=f"Container '{container_id}' existiert nicht.")
     try:
         historical_rows: List[Tuple[str, float | None, bool]] = load_actuals(container_id)
@@ -215,8 +308,7 @@ async def clean_data_endpoint(container_id: str = Path(..., title="The ID of the
     except HTTPException as he: raise he
     except Exception as e: traceback.print_exc(); raise HTTPException(status_code=500, detail=f"Fehler bei der Datenbereinigung für Container '{container_id}': {str(e)}")
 
-@app.post("/api/generate_forecast/")
-async def generate_forecast_endpoint(payload: Dict[str, Any] = Body(...)):
+def _validate_forecast_payload(payload: Dict[str, Any]) -> Tuple[str, str, str, bool]:
     containerId = payload.get("containerId")
     duration = payload.get("duration")
     model_choice = payload.get("model")
@@ -224,139 +316,225 @@ async def generate_forecast_endpoint(payload: Dict[str, Any] = Body(...)):
 
     if not all([containerId, duration, model_choice]):
         raise HTTPException(status_code=400, detail="Fehlende Parameter: containerId, duration und model sind erforderlich.")
-    
+
     # Check if the containerId exists in the containers table
-    if containerId not in get_containers():
+    if not container_exists(containerId):
         raise HTTPException(status_code=404, detail=f"Container '{containerId}' existiert nicht.")
+    if duration not in PERIODS_MAP:
+        raise HTTPException(status_code=400, detail=f"Ungültige Prognosedauer: '{duration}'. Erlaubt: {list(PERIODS_MAP.keys())}")
+    if model_choice not in SUPPORTED_MODELS:
+        raise HTTPException(status_code=400, detail=f"Ungültiges Modell ausgewählt: {model_choice}")
+    return containerId, duration, model_choice, bool(prophet_train_with_anomalies)
+
+def _validate_lstm_mode(payload: Dict[str, Any]) -> Optional[str]:
+    """Optionales Payload-Feld 'lstm_mode' ('recursive'/'direct'); None = config.LSTM_FORECAST_MODE."""
+    lstm_mode = payload.get("lstm_mode")
+    if lstm_mode is not None and lstm_mode not in config.LSTM_FORECAST_MODES:
+        raise HTTPException(status_code=400, detail=f"Ungültiger LSTM-Modus: '{lstm_mode}'. Erlaubt: {config.LSTM_FORECAST_MODES}")
+    return lstm_mode
+
+def _validate_model_query(model: Optional[str]) -> None:
+    """Query-Parameter 'model' der Lese-Endpunkte: ein Tippfehler soll 400 liefern, nicht eine leere Liste wie 'noch nichts gespeichert'."""
+    if model is not None and model not in SUPPORTED_MODELS:
+        raise HTTPException(status_code=400, detail=f"Ungültiges Modell: '{model}'. Erlaubt: {SUPPORTED_MODELS}")
+
+def _validate_include_history(payload: Dict[str, Any]) -> Optional[bool]:
+    """Optionales Payload-Feld 'include_history' (nur Prophet): In-Sample-Fit vor den Prognosetagen; None = config.PROPHET_PREDICT_INCLUDE_HISTORY."""
+    include_history = payload.get("include_history")
+    if include_history is not None and not isinstance(include_history, bool):
+        raise HTTPException(status_code=400, detail="'include_history' muss true oder false sein.")
+    return include_history
+
+def _submit_forecast_job(containerId: str, duration: str, model_choice: str, prophet_train_with_anomalies: bool, lstm_mode: Optional[str] = None,
+                         include_history: Optional[bool] = None) -> str:
+    return submit_job(
+        "forecast", run_forecast, containerId, duration, model_choice, prophet_train_with_anomalies, lstm_mode=lstm_mode, include_history=include_history,
+        description={"containerId": containerId, "duration": duration, "model": model_choice, "lstm_mode": lstm_mode, "include_history": include_history}
+    )
 
+@app.post("/api/generate_forecast/")
+async def generate_forecast_endpoint(
+    payload: Dict[str, Any] = Body(...),
+    response_format: Optional[str] = Query(None, alias="format", description=f"Antwortformat: {', '.join(RESPONSE_FORMATS)} (sonst per Accept-Header)"),
+    accept: Optional[str] = Header(None)
+):
+    """Runs the forecast in the process pool and awaits it without blocking the event loop."""
+    containerId, duration, model_choice, prophet_train_with_anomalies = _validate_forecast_payload(payload)
+    lstm_mode = _validate_lstm_mode(payload)
+    include_history = _validate_include_history(payload)
+    response_format = _negotiate_response_format(accept, response_format)
     try:
-        historical_rows = load_actuals(containerId)
-        if not historical_rows:
-            raise HTTPException(status_code=404, detail=f"Keine historischen Daten für Container '{containerId}' gefunden, um eine Prognose zu erstellen.")
-
-        history_df_raw = pd.DataFrame(historical_rows, columns=[config.DATE_COLUMN, config.TARGET_COLUMN, 'is_anomaly'])
-        history_df_raw[config.DATE_COLUMN] = pd.to_datetime(history_df_raw[config.DATE_COLUMN])
-        history_df_raw[config.TARGET_COLUMN] = pd.to_numeric(history_df_raw[config.TARGET_COLUMN], errors='coerce')
-        history_df_raw['is_anomaly'] = history_df_raw['is_anomaly'].astype(bool)
-
-        if history_df_raw[config.TARGET_COLUMN].isnull().any():
-            print(f"WARNING (api.py - forecast): Zielspalte '{config.TARGET_COLUMN}' für '{containerId}' enthält {history_df_raw[config.TARGET_COLUMN].isnull().sum()} NaNs. Fülle mit ffill/bfill vor Modelltraining.")
-            history_df_raw[config.TARGET_COLUMN] = history_df_raw[config.TARGET_COLUMN].ffill().bfill()
-            if history_df_raw[config.TARGET_COLUMN].isnull().any():
-                print(f"WARNUNG (api.py - forecast): Zielspalte '{config.TARGET_COLUMN}' enthält immer noch NaNs nach ffill/bfill. Fülle mit 0 für Modell '{model_choice}'.")
-                history_df_raw[config.TARGET_COLUMN] = history_df_raw[config.TARGET_COLUMN].fillna(0)
-
-        history_df_raw = history_df_raw.sort_values(by=config.DATE_COLUMN).reset_index(drop=True)
-        print(f"INFO (api.py - forecast): Rohdaten für '{containerId}' (nach initialer NaN-Füllung der Zielspalte): {len(history_df_raw)} Zeilen.")
-
-        history_df_for_feature_eng = pd.DataFrame()
-        if model_choice == 'prophet' and prophet_train_with_anomalies:
-            history_df_for_feature_eng = history_df_raw.copy()
-            print(f"INFO (api.py - forecast): Prophet wird MIT Anomalien (gemäß Payload-Option) für '{containerId}' trainiert. Daten für Feature Engineering: {len(history_df_for_feature_eng)} Zeilen.")
-        else:
-            history_df_for_feature_eng = history_df_raw[~history_df_raw['is_anomaly']].copy()
-            removed_count = len(history_df_raw) - len(history_df_for_feature_eng)
-            print(f"INFO (api.py - forecast): {removed_count} Anomalien basierend auf DB-Flag entfernt. Daten für Feature Engineering: {len(history_df_for_feature_eng)} Zeilen.")
-
-        if 'is_anomaly' in history_df_for_feature_eng.columns:
-             history_df_for_feature_eng = history_df_for_feature_eng.drop(columns=['is_anomaly'])
-
-        if history_df_for_feature_eng.empty:
-            detail_message = f"Keine gültigen Datenpunkte für die Prognose für Container '{containerId}' nach der optionalen Anomalieentfernung vorhanden."
-            print(f"WARN (api.py - forecast): {detail_message}")
-            return JSONResponse(status_code=200, content={"forecast_data": [], "message": detail_message}) # Changed "data" to "forecast_data" for clarity
-
-        if history_df_for_feature_eng[config.DATE_COLUMN].dt.tz is not None:
-            history_df_for_feature_eng[config.DATE_COLUMN] = history_df_for_feature_eng[config.DATE_COLUMN].dt.tz_localize(None)
-
-        history_df_indexed = history_df_for_feature_eng.set_index(config.DATE_COLUMN)
-        history_df_model_input, _, _ = add_features(
-            history_df_indexed.copy(), target_column=config.TARGET_COLUMN, include_lag_rolling=True
-        )
-        history_df_model_input = history_df_model_input.reset_index()
-
-        min_data_prophet = 2; min_data_tf = config.LSTM_LOOK_BACK + 1
-        data_length_check = len(history_df_model_input); min_data_required = 0
-        if model_choice == 'prophet':
-            min_data_required = min_data_prophet
-            data_length_check = history_df_model_input[config.TARGET_COLUMN].notna().sum()
-        elif model_choice == 'tensorflow': min_data_required = min_data_tf
-        else: min_data_required = 2
-
-        if data_length_check < min_data_required:
-            detail_message = f"Nicht genügend Datenpunkte ({data_length_check} gültige) für Modell '{model_choice}' für Container '{containerId}'. Benötigt: {min_data_required}."
-            print(f"ERROR (api.py - forecast): {detail_message}")
-            return JSONResponse(status_code=200, content={"forecast_data": [], "message": detail_message})
-
-        periods_map = {'1d': 1, '7d': 7, '30d': 30, '90d': 90}
-        periods = periods_map.get(duration)
-        if periods is None: raise HTTPException(status_code=400, detail=f"Ungültige Prognosedauer: '{duration}'. Erlaubt: {list(periods_map.keys())}")
-
-        forecast_df = pd.DataFrame()
-        model_training_report = None
-
-        if model_choice == 'prophet':
-            future_start_date = history_df_model_input[config.DATE_COLUMN].max() + pd.Timedelta(days=1)
-            future_dates_for_regressors = pd.date_range(start=future_start_date, periods=periods, freq='D')
-            future_regressors_df_base = pd.DataFrame({config.DATE_COLUMN: future_dates_for_regressors})
-            future_regressors_df_base = future_regressors_df_base.set_index(config.DATE_COLUMN)
-            future_regressors_df_with_features, _, _ = add_features(
-                future_regressors_df_base.copy(), target_column=config.TARGET_COLUMN, include_lag_rolling=False
-            )
-            future_regressors_df_with_features = future_regressors_df_with_features.reset_index()
-
-            forecast_df, model_training_report = forecast_with_prophet(
-                history_df_model_input.copy(), periods,
-                extra_regressors_df=future_regressors_df_with_features.copy()
-            )
-        elif model_choice == 'tensorflow':
-            forecast_df_tf, tf_report = forecast_with_tensorflow(history_df_model_input.copy(), periods)
-            forecast_df = forecast_df_tf
-            model_training_report = tf_report
-        else:
-            raise HTTPException(status_code=400, detail=f"Ungültiges Modell ausgewählt: {model_choice}")
-
-        if forecast_df is None or forecast_df.empty or 'ds' not in forecast_df.columns or 'yhat' not in forecast_df.columns:
-            detail_message = f"Modell '{model_choice}' lieferte kein Ergebnis für Container '{containerId}'."
-            print(f"ERROR (api.py - forecast): {detail_message}")
-            return JSONResponse(status_code=200, content={"forecast_data": [], "message": detail_message, "model_training_report": model_training_report})
-
-        forecast_df['ds'] = pd.to_datetime(forecast_df['ds'])
-        if forecast_df['ds'].dt.tz is not None: forecast_df['ds'] = forecast_df['ds'].dt.tz_localize(None)
-
-        last_hist_date = history_df_model_input[config.DATE_COLUMN].max()
-        future_forecast_df = forecast_df[forecast_df['ds'] > last_hist_date].copy()
-
-        if future_forecast_df.empty:
-            detail_message = f"Keine zukünftigen Prognosepunkte von Modell '{model_choice}' für Container '{containerId}' generiert."
-            print(f"WARN (api.py - forecast): {detail_message}")
-            return JSONResponse(status_code=200, content={"forecast_data": [], "message": detail_message, "model_training_report": model_training_report})
-
-        result_columns = ['ds', 'yhat']
-        if 'yhat_lower' in future_forecast_df.columns and 'yhat_upper' in future_forecast_df.columns:
-            result_columns.extend(['yhat_lower', 'yhat_upper'])
-        if 'trend' in future_forecast_df.columns and model_choice == 'prophet': result_columns.append('trend')
-
-        result_df = future_forecast_df[result_columns].rename(columns={'ds': 'date', 'yhat': 'forecast'})
-        result_df['date'] = pd.to_datetime(result_df['date']).dt.tz_localize('UTC').dt.strftime('%Y-%m-%dT%H:%M:%SZ')
-
-        response_payload = {
-            "forecast_data": result_df.to_dict(orient='records'),
-            "message": f"Prognose für Container '{containerId}' mit Modell '{model_choice}' erfolgreich generiert."
-        }
-        if model_training_report:
-            response_payload["model_training_report"] = model_training_report
-
-        return JSONResponse(status_code=200, content=response_payload)
-
-    except HTTPException as he: raise he
+        # Kein Job-Eintrag: der Request wartet selbst auf das Ergebnis, das daher nicht in der Tabelle 'jobs' landen muss.
+        future = submit_task(run_forecast, containerId, duration, model_choice, prophet_train_with_anomalies, lstm_mode=lstm_mode, include_history=include_history)
+        response_payload = await asyncio.wrap_future(future)
+        forecast_table = response_payload.get("forecast_data") or {}
+        meta = {key: value for key, value in response_payload.items() if key != "forecast_data"}
+        return render_table_response(forecast_table, response_format, meta=meta, table_key="forecast_data")
+    except UnsupportedFormatError as ue: raise HTTPException(status_code=ue.status_code, detail=ue.detail)
+    except ForecastRequestError as fe: raise HTTPException(status_code=fe.status_code, detail=fe.detail)
     except ValueError as ve: traceback.print_exc(); raise HTTPException(status_code=400, detail=f"Datenverarbeitungs- oder Modellkonfigurationsfehler: {str(ve)}")
     except Exception as e: traceback.print_exc(); raise HTTPException(status_code=500, detail=f"Interner Serverfehler bei Prognoseerstellung: {str(e)}")
 
+@app.post("/api/forecast_jobs")
+async def submit_forecast_job_endpoint(payload: Dict[str, Any] = Body(...)):
+    """Queues a forecast and returns its job id right away. Poll GET /api/forecast_jobs/{job_id} for the result."""
+    containerId, duration, model_choice, prophet_train_with_anomalies = _validate_forecast_payload(payload)
+    lstm_mode = _validate_lstm_mode(payload)
+    include_history = _validate_include_history(payload)
+    try:
+        job_id = await run_in_threadpool(_submit_forecast_job, containerId, duration, model_choice, prophet_train_with_anomalies, lstm_mode, include_history)
+    except Exception as e: traceback.print_exc(); raise HTTPException(status_code=500, detail=f"Prognose-Job konnte nicht eingereiht werden: {str(e)}")
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued", "status_url": f"/api/forecast_jobs/{job_id}"})
+
+@app.post("/api/generate_forecast/batch")
+async def generate_forecast_batch_endpoint(payload: Dict[str, Any] = Body(...)):
+    """
+    Forecasts every combination of containerIds x models x durations. Actuals are loaded in one DB pass,
+    each (container, model) pair is fitted once in the process pool and results are streamed back as
+    newline-delimited JSON, one line per pair, in completion order.
+    """
+    container_ids = payload.get("containerIds") or []
+    models = payload.get("models") or []
+    durations = payload.get("durations") or []
+    prophet_train_with_anomalies = bool(payload.get("prophet_train_with_anomalies", False))
+    lstm_mode = _validate_lstm_mode(payload)
+    include_history = _validate_include_history(payload)
+
+    if not container_ids or not models or not durations:
+        raise HTTPException(status_code=400, detail="Fehlende Parameter: containerIds, models und durations (jeweils Listen) sind erforderlich.")
+    unknown = [c for c in container_ids if not container_exists(c)]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Container existieren nicht: {unknown}")
+    invalid_durations = [d for d in durations if d not in PERIODS_MAP]
+    if invalid_durations:
+        raise HTTPException(status_code=400, detail=f"Ungültige Prognosedauer(n): {invalid_durations}. Erlaubt: {list(PERIODS_MAP.keys())}")
+    invalid_models = [m for m in models if m not in SUPPORTED_MODELS]
+    if invalid_models:
+        raise HTTPException(status_code=400, detail=f"Ungültige Modelle ausgewählt: {invalid_models}")
+
+    container_ids = list(dict.fromkeys(container_ids)); models = list(dict.fromkeys(models)); durations = list(dict.fromkeys(durations))
+    rows_by_container = await run_in_threadpool(load_actuals_bulk, container_ids)
+
+    pending = []
+    for container_id in container_ids:
+        for model_choice in models:
+            job_id = await run_in_threadpool(
+                submit_job, "forecast_batch_item", run_forecast_batch_item, container_id, model_choice, durations,
+                prophet_train_with_anomalies, rows_by_container.get(container_id, []), lstm_mode=lstm_mode, include_history=include_history,
+                description={"containerId": container_id, "model": model_choice, "durations": durations}
+            )
+            pending.append((job_id, container_id, model_choice))
+
+    async def await_item(job_id: str, container_id: str, model_choice: str) -> Dict[str, Any]:
+        try:
+            result = await asyncio.wrap_future(get_job_future(job_id))
+            results = {duration: forecast_payload_to_records(item) for duration, item in result.get("results", {}).items()}
+            return dict(result, results=results, job_id=job_id, status="completed")
+        except Exception as e:
+            traceback.print_exc()
+            return {"job_id": job_id, "containerId": container_id, "model": model_choice, "status": "failed", "error": str(e)}
+
+    async def stream_results():
+        for next_done in asyncio.as_completed([await_item(*item) for item in pending]):
+            item_result = await next_done
+            yield json.dumps(item_result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.post("/api/global_model/train")
+async def train_global_model_endpoint(payload: Dict[str, Any] = Body(default={})):
+    """
+    Queues training of the global LSTM (model 'tensorflow_global') on all containers, or on payload['containerIds'].
+    Meant to run nightly; poll GET /api/forecast_jobs/{job_id} for the training report.
+    """
+    container_ids = payload.get("containerIds") or None
+    lstm_mode = _validate_lstm_mode(payload)
+    if container_ids:
+        unknown = [c for c in container_ids if not container_exists(c)]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Container existieren nicht: {unknown}")
+        container_ids = list(dict.fromkeys(container_ids))
+    try:
+        job_id = await run_in_threadpool(
+            submit_job, "global_model_training", train_global_lstm_job, container_ids, lstm_mode=lstm_mode,
+            description={"containerIds": container_ids or "all", "lstm_mode": lstm_mode}
+        )
+    except Exception as e: traceback.print_exc(); raise HTTPException(status_code=500, detail=f"Trainings-Job konnte nicht eingereiht werden: {str(e)}")
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued", "status_url": f"/api/forecast_jobs/{job_id}"})
+
+@app.post("/api/backtest")
+async def backtest_endpoint(payload: Dict[str, Any] = Body(default={})):
+    """
+    Queues a rolling-origin backtest over payload['containerIds'] (default: all) x payload['models'] (default: prophet,
+    tensorflow). Optional: initial_days, period_days, horizon_days, max_cutoffs, lstm_mode (defaults: config.BACKTEST_*).
+    Each (model, container, cutoff) fit runs in the process pool; poll GET /api/forecast_jobs/{job_id} for the MAE/RMSE/MAPE tables.
+    """
+    container_ids = payload.get("containerIds") or None
+    models = payload.get("models") or None
+    lstm_mode = _validate_lstm_mode(payload)
+    if container_ids:
+        unknown = [c for c in container_ids if not container_exists(c)]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Container existieren nicht: {unknown}")
+        container_ids = list(dict.fromkeys(container_ids))
+    if models:
+        invalid_models = [m for m in models if m not in BACKTEST_MODELS]
+        if invalid_models:
+            raise HTTPException(status_code=400, detail=f"Ungültige Modelle für das Backtesting: {invalid_models}. Erlaubt: {BACKTEST_MODELS}")
+        models = list(dict.fromkeys(models))
+    windows = {}
+    for key in ("initial_days", "period_days", "horizon_days", "max_cutoffs"):
+        if payload.get(key) is None:
+            continue
+        if isinstance(payload[key], bool) or not isinstance(payload[key], int) or payload[key] < 1:
+            raise HTTPException(status_code=400, detail=f"'{key}' muss eine positive ganze Zahl sein.")
+        windows[key] = payload[key]
+    try:
+        job_id = await run_in_threadpool(
+            submit_coordinator_job, "backtest", run_backtest, container_ids, models, lstm_mode=lstm_mode, **windows,
+            description=dict({"containerIds": container_ids or "all", "models": models or BACKTEST_MODELS, "lstm_mode": lstm_mode}, **windows)
+        )
+    except Exception as e: traceback.print_exc(); raise HTTPException(status_code=500, detail=f"Backtest-Job konnte nicht eingereiht werden: {str(e)}")
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued", "status_url": f"/api/forecast_jobs/{job_id}"})
+
+@app.get("/api/forecast_jobs/{job_id}")
+async def get_forecast_job_endpoint(job_id: str = Path(..., title="The ID returned when the job was submitted")):
+    job = await run_in_threadpool(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' nicht gefunden oder bereits abgelaufen.")
+    if "result" in job:
+        job = dict(job, result=forecast_payload_to_records(job["result"]))
+    return JSONResponse(status_code=200, content=job)
+
+@app.get("/api/forecasts/{container_id:path}")
+async def get_stored_forecast_endpoint(container_id: str = Path(..., title="The ID of the container, can contain slashes"), model: str = Query(...), forecast_date: Optional[str] = Query(None),
+                                       lstm_mode: Optional[str] = Query(None), prophet_train_with_anomalies: bool = Query(False)):
+    """Serves the latest stored forecast (or the one issued on forecast_date) without retraining. lstm_mode/prophet_train_with_anomalies select the variant."""
+    if not container_exists(container_id):
+        raise HTTPException(status_code=404, detail=f"Container '{container_id}' existiert nicht.")
+    _validate_model_query(model)
+    model_name = stored_model_name(model, _validate_lstm_mode({"lstm_mode": lstm_mode}), prophet_train_with_anomalies)
+    try:
+        rows = load_forecasts(container_id, model_name, forecast_date=forecast_date)
+        records = [{"date": target_date, "forecast": value, "forecast_date": issued} for issued, target_date, value in rows]
+        return JSONResponse(status_code=200, content={"container_id": container_id, "model": model_name, "forecast_data": records})
+    except Exception as e: traceback.print_exc(); raise HTTPException(status_code=500, detail=f"Failed to load stored forecast: {str(e)}")
+
 @app.get("/api/forecast_vs_actual/{container_id:path}")
-async def get_forecast_vs_actual_endpoint(container_id: str = Path(..., title="The ID of the container, can contain slashes")):
-    print(f"WARN: /api/forecast_vs_actual/{container_id} endpoint called but not fully implemented in provided code.")
-    return JSONResponse(status_code=501, content={"message": "Endpoint not implemented yet."})
+async def get_forecast_vs_actual_endpoint(container_id: str = Path(..., title="The ID of the container, can contain slashes"), model: Optional[str] = Query(None),
+                                          lstm_mode: Optional[str] = Query(None), prophet_train_with_anomalies: bool = Query(False)):
+    """Latest stored forecast per target date joined with the actual value (null if not yet measured). Without model: all models and variants."""
+    if not container_exists(container_id):
+        raise HTTPException(status_code=404, detail=f"Container '{container_id}' existiert nicht.")
+    _validate_model_query(model)
+    lstm_mode = _validate_lstm_mode({"lstm_mode": lstm_mode})
+    model_name = stored_model_name(model, lstm_mode, prophet_train_with_anomalies) if model else None
+    try:
+        rows = load_forecast_vs_actual(container_id, model_name=model_name)
+        records = [{"model": model_name, "date": target_date, "forecast": forecast_value, "actual": actual_value, "forecast_date": issued}
+                   for model_name, target_date, issued, forecast_value, actual_value in rows]
+        return JSONResponse(status_code=200, content=records)
+    except Exception as e: traceback.print_exc(); raise HTTPException(status_code=500, detail=f"Failed to load forecast vs. actual data: {str(e)}")
 
 # --- NEW ENDPOINTS FOR CONTAINER MANAGEMENT ---
 
@@ -405,7 +583,7 @@ async def update_container_endpoint(old_name: str = Path(..., title="Old contain
     if not sanitized_new_name:
         raise HTTPException(status_code=400, detail="Neuer Container-Name darf nicht leer sein.")
 
-    if old_name not in get_containers():
+    if not container_exists(old_name):
         raise HTTPException(status_code=404, detail=f"Container '{old_name}' nicht gefunden.")
     
     if old_name == sanitized_new_name:
@@ -413,6 +591,7 @@ async def update_container_endpoint(old_name: str = Path(..., title="Old contain
 
     success = update_container_name(old_name, sanitized_new_name)
     if success:
+        rename_container_artifacts(old_name, sanitized_new_name) # Gespeicherte Modelle ziehen mit um
         return JSONResponse(status_code=200, content={"message": f"Container '{old_name}' erfolgreich in '{sanitized_new_name}' umbenannt."})
     else:
         # The database function returns False if the new name exists for another container
@@ -421,11 +600,12 @@ async def update_container_endpoint(old_name: str = Path(..., title="Old contain
 @app.delete("/api/containers/{name:path}")
 async def delete_container_endpoint(name: str = Path(..., title="Name of the container to delete")):
     """Delete a water container and all its associated data."""
-    if name not in get_containers():
+    if not container_exists(name):
         raise HTTPException(status_code=404, detail=f"Container '{name}' nicht gefunden.")
     
     success = delete_container(name)
     if success:
+        delete_container_artifacts(name)
         return JSONResponse(status_code=200, content={"message": f"Container '{name}' und zugehörige Daten erfolgreich gelöscht."})
     else:
         raise HTTPException(status_code=500, detail=f"Fehler beim Löschen von Container '{name}'.")
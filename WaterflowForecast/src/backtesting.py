@@ -0,0 +1,195 @@
+# src/backtesting.py
+# Rolling-Origin-Backtesting für die Prognosemodelle: je Container mehrere Cutoffs, an jedem Cutoff wird auf der
+# Historie bis dahin trainiert und der folgende Horizont mit den Ist-Werten verglichen (MAE, RMSE, MAPE).
+# Jeder (Modell, Container, Cutoff)-Fit läuft als Teilaufgabe im Prozess-Pool (forecast_jobs.submit_task) und bekommt
+# nur die Rohdaten bis Cutoff + Horizont; Imputation und Features entstehen dort allein aus den Werten bis zum Cutoff.
+# run_backtest selbst koordiniert nur (POST /api/backtest) und hält höchstens BACKTEST_MAX_IN_FLIGHT Fits im Pool.
+# Ersetzt für die API die sequentiellen Einzel-Holdouts aus comparison.py / tf_keras_and_prophet.py.
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple # Für Typ-Annotationen
+from src import config
+from src.database import load_actuals_bulk, get_containers
+from src.forecast_jobs import submit_task
+from src.forecast_service import history_frame_from_rows, build_features_from_history, build_future_regressors, ForecastRequestError
+from src.model_backends import get_backend
+
+# 'tensorflow_global' fehlt bewusst: das globale Modell ist auf der gesamten Historie trainiert und sähe die Testdaten.
+BACKTEST_MODELS = ['prophet', 'tensorflow']
+
+
+def make_cutoffs(dates: pd.Series, initial_days: int, period_days: int, horizon_days: int, max_cutoffs: int) -> List[pd.Timestamp]:
+    """Cutoffs vom Ende der Historie rückwärts (der letzte lässt genau horizon_days Ist-Werte übrig), aufsteigend sortiert."""
+    if dates.empty:
+        return []
+    earliest = dates.min() + pd.Timedelta(days=initial_days)
+    cutoff = dates.max() - pd.Timedelta(days=horizon_days)
+    cutoffs = []
+    while cutoff >= earliest and len(cutoffs) < max_cutoffs:
+        cutoffs.append(cutoff)
+        cutoff -= pd.Timedelta(days=period_days)
+    return sorted(cutoffs)
+
+
+def evaluate_cutoff(model_choice: str, container_id: str, raw_frame: pd.DataFrame, cutoff: pd.Timestamp, horizon_days: int,
+                    lstm_mode: str) -> Dict[str, Any]:
+    """
+    Teilaufgabe im Pool: Fit auf raw_frame (history_frame_from_rows, höchstens bis cutoff + horizon_days) bis
+    einschließlich cutoff, Prognose über horizon_days, Fehlersummen gegen die gemessenen, nicht als Anomalie markierten
+    Ist-Werte danach. Ohne cache_key, damit weder model_cache noch model_store mit Backtest-Modellen gefüllt werden.
+    """
+    train_df = build_features_from_history(container_id, raw_frame[raw_frame[config.DATE_COLUMN] <= cutoff], 'backtest')
+    if train_df is None:
+        raise ForecastRequestError(404, f"Keine Datenpunkte bis zum Cutoff {cutoff.strftime('%Y-%m-%d')}.")
+    horizon_end = cutoff + pd.Timedelta(days=horizon_days)
+    actual_df = raw_frame[(raw_frame[config.DATE_COLUMN] > cutoff) & (raw_frame[config.DATE_COLUMN] <= horizon_end)
+                          & raw_frame[config.TARGET_COLUMN].notna() & ~raw_frame['is_anomaly']]
+
+    start = time.perf_counter()
+    if model_choice == 'prophet':
+        forecast_df, _ = get_backend('prophet').forecast_with_prophet(
+            train_df, horizon_days, extra_regressors_df=build_future_regressors(train_df[config.DATE_COLUMN].max(), horizon_days)
+        )
+    else:
+        forecast_df, _ = get_backend('tensorflow').forecast_with_tensorflow(train_df, horizon_days, mode=lstm_mode)
+    fit_seconds = time.perf_counter() - start
+
+    forecast_df = forecast_df[['ds', 'yhat']].assign(ds=pd.to_datetime(forecast_df['ds']))
+    merged = actual_df[[config.DATE_COLUMN, config.TARGET_COLUMN]].merge(forecast_df, left_on=config.DATE_COLUMN, right_on='ds', how='inner')
+    actual = merged[config.TARGET_COLUMN].to_numpy(dtype=np.float64)
+    errors = merged['yhat'].to_numpy(dtype=np.float64) - actual
+    nonzero = actual != 0 # MAPE ist für Ist-Werte 0 nicht definiert
+    return {
+        "model": model_choice,
+        "container_id": container_id,
+        "cutoff": cutoff.strftime('%Y-%m-%d'),
+        "n_points": int(len(errors)),
+        "abs_error_sum": float(np.abs(errors).sum()),
+        "squared_error_sum": float(np.square(errors).sum()),
+        "ape_sum": float(np.abs(errors[nonzero] / actual[nonzero]).sum()),
+        "ape_points": int(nonzero.sum()),
+        "fit_seconds": round(fit_seconds, 3),
+    }
+
+
+def _metrics(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """MAE/RMSE/MAPE über alle Prognosepunkte der Teilergebnisse (aus den Fehlersummen, nicht als Mittel der Mittel)."""
+    n_points = sum(part["n_points"] for part in parts)
+    ape_points = sum(part["ape_points"] for part in parts)
+    return {
+        "n_cutoffs": len(parts),
+        "n_points": n_points,
+        "mae": sum(part["abs_error_sum"] for part in parts) / n_points if n_points else None,
+        "rmse": float(np.sqrt(sum(part["squared_error_sum"] for part in parts) / n_points)) if n_points else None,
+        "mape": 100.0 * sum(part["ape_sum"] for part in parts) / ape_points if ape_points else None,
+        "fit_seconds_total": round(sum(part["fit_seconds"] for part in parts), 3),
+    }
+
+
+def _group_metrics(results: List[Dict[str, Any]], keys: List[str]) -> List[Dict[str, Any]]:
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for result in results:
+        groups.setdefault(tuple(result[key] for key in keys), []).append(result)
+    return [dict(zip(keys, group_key), **_metrics(parts)) for group_key, parts in sorted(groups.items())]
+
+
+def _cutoff_row(result: Dict[str, Any]) -> Dict[str, Any]:
+    metrics = _metrics([result])
+    return {
+        "model": result["model"], "container_id": result["container_id"], "cutoff": result["cutoff"], "n_points": result["n_points"],
+        "mae": metrics["mae"], "rmse": metrics["rmse"], "mape": metrics["mape"], "fit_seconds": result["fit_seconds"],
+    }
+
+
+def _backtest_tasks(raw_by_container: Dict[str, pd.DataFrame], cutoffs_by_container: Dict[str, List[pd.Timestamp]],
+                    models: List[str], horizon_days: int) -> Iterator[Tuple[str, str, pd.Timestamp, pd.DataFrame]]:
+    """(Modell, Container, Cutoff, Rohdaten bis Cutoff + Horizont); die Ausschnitte entstehen erst beim Einreichen."""
+    for container_id, cutoffs in cutoffs_by_container.items():
+        raw_frame = raw_by_container[container_id]
+        for cutoff in cutoffs:
+            task_frame = raw_frame[raw_frame[config.DATE_COLUMN] <= cutoff + pd.Timedelta(days=horizon_days)]
+            for model_choice in models:
+                yield model_choice, container_id, cutoff, task_frame
+
+
+def run_backtest(container_ids: Optional[List[str]] = None, models: Optional[List[str]] = None,
+                 initial_days: Optional[int] = None, period_days: Optional[int] = None, horizon_days: Optional[int] = None,
+                 max_cutoffs: Optional[int] = None, lstm_mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Backtest über container_ids (Standard: alle) x models x Cutoffs. Nicht gesetzte Parameter kommen aus config.BACKTEST_*.
+    Ergebnis als Tabellen im records-Format: summary (je Modell), by_container, by_cutoff und failed.
+    """
+    started = time.perf_counter()
+    models = models or BACKTEST_MODELS
+    settings = {
+        "initial_days": int(initial_days or config.BACKTEST_INITIAL_DAYS),
+        "period_days": int(period_days or config.BACKTEST_PERIOD_DAYS),
+        "horizon_days": int(horizon_days or config.BACKTEST_HORIZON_DAYS),
+        "max_cutoffs": int(max_cutoffs or config.BACKTEST_MAX_CUTOFFS),
+        "lstm_mode": lstm_mode or config.LSTM_FORECAST_MODE,
+    }
+    invalid_models = [model for model in models if model not in BACKTEST_MODELS]
+    if invalid_models:
+        raise ForecastRequestError(400, f"Ungültige Modelle für das Backtesting: {invalid_models}. Erlaubt: {BACKTEST_MODELS}")
+    if min(settings["initial_days"], settings["period_days"], settings["horizon_days"], settings["max_cutoffs"]) < 1:
+        raise ForecastRequestError(400, "initial_days, period_days, horizon_days und max_cutoffs müssen positiv sein.")
+    if settings["lstm_mode"] not in config.LSTM_FORECAST_MODES:
+        raise ForecastRequestError(400, f"Ungültiger LSTM-Modus: '{settings['lstm_mode']}'. Erlaubt: {config.LSTM_FORECAST_MODES}")
+    if 'tensorflow' in models and settings["lstm_mode"] == 'direct' and settings["horizon_days"] > config.LSTM_DIRECT_HORIZON:
+        raise ForecastRequestError(400, f"horizon_days={settings['horizon_days']} übersteigt LSTM_DIRECT_HORIZON={config.LSTM_DIRECT_HORIZON}.")
+
+    container_ids = container_ids or get_containers()
+    rows_by_container = load_actuals_bulk(container_ids)
+    raw_by_container: Dict[str, pd.DataFrame] = {}
+    cutoffs_by_container: Dict[str, List[pd.Timestamp]] = {}
+    skipped = []
+    for container_id in container_ids:
+        rows = rows_by_container.get(container_id) or []
+        raw_frame = history_frame_from_rows(rows) if rows else None
+        cutoffs = make_cutoffs(raw_frame[config.DATE_COLUMN], settings["initial_days"], settings["period_days"],
+                               settings["horizon_days"], settings["max_cutoffs"]) if raw_frame is not None else []
+        if not cutoffs:
+            skipped.append(container_id)
+            continue
+        raw_by_container[container_id] = raw_frame
+        cutoffs_by_container[container_id] = cutoffs
+    total_fits = sum(len(cutoffs) for cutoffs in cutoffs_by_container.values()) * len(models)
+    if not total_fits:
+        raise ForecastRequestError(404, f"Zu wenig Historie für das Backtesting (mind. {settings['initial_days']} + {settings['horizon_days']} Tage).")
+    max_in_flight = max(1, int(config.BACKTEST_MAX_IN_FLIGHT or config.FORECAST_JOB_WORKERS))
+    print(f"INFO (backtesting.py): {total_fits} backtest fit(s) for {len(cutoffs_by_container)} container(s), at most {max_in_flight} in the pool at a time.")
+
+    # Nachschieben statt alles auf einmal einreichen: der Pool ist mit interaktiven Prognosen und Batch-Jobs geteilt.
+    tasks = _backtest_tasks(raw_by_container, cutoffs_by_container, models, settings["horizon_days"])
+    in_flight = {}
+    results, failed = [], []
+    while True:
+        for model_choice, container_id, cutoff, task_frame in tasks:
+            future = submit_task(evaluate_cutoff, model_choice, container_id, task_frame, cutoff, settings["horizon_days"], settings["lstm_mode"])
+            in_flight[future] = (model_choice, container_id, cutoff.strftime('%Y-%m-%d'))
+            if len(in_flight) >= max_in_flight:
+                break
+        if not in_flight:
+            break
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            model_choice, container_id, cutoff = in_flight.pop(future)
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"WARN (backtesting.py): Backtest fit {model_choice}/'{container_id}'/{cutoff} failed: {e}")
+                failed.append({"model": model_choice, "container_id": container_id, "cutoff": cutoff, "error": str(getattr(e, "detail", e))})
+
+    elapsed_seconds = round(time.perf_counter() - started, 1)
+    return {
+        "message": f"Backtesting abgeschlossen: {len(results)} von {total_fits} Fits erfolgreich in {elapsed_seconds} s.",
+        "settings": settings,
+        "summary": _group_metrics(results, ["model"]),
+        "by_container": _group_metrics(results, ["model", "container_id"]),
+        "by_cutoff": [_cutoff_row(result) for result in sorted(results, key=lambda r: (r["model"], r["container_id"], r["cutoff"]))],
+        "failed": failed,
+        "skipped_containers": skipped,
+        "elapsed_seconds": elapsed_seconds,
+    }
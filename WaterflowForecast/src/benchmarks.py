@@ -0,0 +1,470 @@
+# src/benchmarks.py
+# Mikro-Benchmarks für die Performance-relevanten Pfade des Forecast-Backends.
+# Aufruf aus dem Projektverzeichnis:  python -m src.benchmarks [name ...]   (ohne Namen: alle)
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict
+from src import config
+
+
+def _time_call(fn: Callable, repeat: int = 3) -> float:
+    """Beste Laufzeit (Sekunden) aus `repeat` Durchläufen."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _synthetic_upload_frame(start: str, periods: int, freq: str, seed: int = 42) -> pd.DataFrame:
+    """Upload-Block wie ihn pd.read_csv aus einem SCADA-Export liefert: Datumsstrings und Werte mit Dezimalkomma."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start=start, periods=periods, freq=freq)
+    values = np.round(rng.normal(450, 80, periods), 2)
+    values[rng.choice(periods, size=max(1, periods // 500), replace=False)] = -5.0 # einige unplausible Werte
+    value_strings = pd.Series(values).map(lambda v: f"{v:.2f}".replace('.', ','))
+    value_strings[rng.choice(periods, size=max(1, periods // 1000), replace=False)] = ""
+    return pd.DataFrame({'Date': dates.strftime('%Y-%m-%d %H:%M:%S'), 'Value': value_strings})
+
+
+def _legacy_validate_rows(actual_df: pd.DataFrame):
+    """Zeilenweise Validierung wie vor der spaltenweisen Umstellung (iterrows), ohne DB-Zugriff; nur als Referenz."""
+    records, errors = [], []
+    for df_index, row in actual_df.iterrows():
+        csv_row_number = df_index + 2
+        date_val_raw = row.get('Date'); value_val_raw = row.get('Value')
+        original_row_snippet = f"Date='{date_val_raw if not pd.isnull(date_val_raw) else 'N/A'}', Value='{value_val_raw if not pd.isnull(value_val_raw) else 'N/A'}'"
+        if pd.isnull(date_val_raw):
+            errors.append({"row_csv": csv_row_number, "column_name": "Date", "original_value": original_row_snippet}); continue
+        try:
+            date_str = pd.to_datetime(date_val_raw).strftime('%Y-%m-%dT%H:%M:%SZ')
+            value_to_store = None
+            if pd.notnull(value_val_raw) and str(value_val_raw).strip() != "":
+                try:
+                    value = float(str(value_val_raw).replace(',', '.'))
+                    if pd.isnull(value): value_to_store = None
+                    elif value < 0 or value > config.MAX_PLAUSIBLE_CONSUMPTION_VALUE:
+                        errors.append({"row_csv": csv_row_number, "column_name": "Value", "original_value": original_row_snippet}); continue
+                    else: value_to_store = value
+                except ValueError:
+                    value_to_store = None
+            records.append((date_str, value_to_store))
+        except ValueError:
+            errors.append({"row_csv": csv_row_number, "column_name": "Date", "original_value": original_row_snippet})
+    return records, errors
+
+
+def bench_save_actuals():
+    """Validierung in save_actual_to_db: iterrows (alt) vs. validate_actuals_frame (spaltenweise)."""
+    # Referenzlauf (1 CPU, pandas 2.2): 5 Jahre täglich 1465 ms -> 15.5 ms (94x), 1 Jahr 15-Minuten 26915 ms -> 391 ms (69x).
+    from src.database import validate_actuals_frame
+    cases = {
+        "5 Jahre täglich": _synthetic_upload_frame('2020-01-01', 5 * 365 + 1, 'D'),
+        "1 Jahr 15-Minuten": _synthetic_upload_frame('2024-01-01', 365 * 96, '15min'),
+    }
+    for label, frame in cases.items():
+        legacy_records, legacy_errors = _legacy_validate_rows(frame)
+        date_strs, values, errors = validate_actuals_frame(frame)
+        assert len(date_strs) == len(legacy_records) and len(errors) == len(legacy_errors), "Ergebnisse weichen ab"
+        legacy_s = _time_call(lambda: _legacy_validate_rows(frame), repeat=1)
+        vectorized_s = _time_call(lambda: validate_actuals_frame(frame))
+        print(f"[save_actuals] {label:<20} rows={len(frame):>7}  iterrows={legacy_s * 1000:9.1f} ms  "
+              f"vectorized={vectorized_s * 1000:7.1f} ms  speedup={legacy_s / vectorized_s:6.1f}x")
+
+
+def _legacy_create_sequences(input_data: np.ndarray, target_data: np.ndarray, look_back: int):
+    """Ursprüngliche Fenstererzeugung (vor sequences.sliding_window_sequences): kopiert jedes Fenster in eine Liste und materialisiert den kompletten 3-D-Tensor; nur als Referenz."""
+    X, y = [], []
+    if input_data.ndim == 1: # Ensure input_data is 2D
+        input_data = input_data.reshape(-1,1)
+    if target_data.ndim == 1:
+        target_data = target_data.reshape(-1,1) # target_data also as 2D for consistency
+
+    if len(input_data) <= look_back: # Not enough data for one sequence
+        return np.array(X), np.array(y) # Return empty arrays
+
+    for i in range(len(input_data) - look_back): # target_data[i + look_back] is the y-value
+        X.append(input_data[i:(i + look_back), :]) # All features for the lookback period
+        y.append(target_data[i + look_back, 0])    # Only the target value (first column of target_data)
+    return np.array(X), np.array(y)
+
+
+def _peak_memory_mb(fn: Callable) -> float:
+    """Spitzen-Speicherbedarf (MB) eines Aufrufs laut tracemalloc (NumPy meldet seine Puffer dort an)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def _rss_peak_mb() -> float:
+    """
+    Bisher höchster RSS dieses Prozesses in MB: VmHWM aus /proc/self/status, das bei exec zurückgesetzt wird.
+    ru_maxrss erbt unter Linux über fork und exec den Wert des Elternprozesses; nur ohne /proc als Rückfall.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_in_fresh_process(fn: Callable, *args):
+    """fn(*args) in einem eigenen spawn-Prozess, damit der RSS-Höchststand nur diesen Lauf erfasst (TensorFlow-Puffer sieht tracemalloc nicht)."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _legacy_windows_probe(scaled: np.ndarray) -> Dict[str, float]:
+    baseline_mb = _rss_peak_mb()
+    start = time.perf_counter()
+    X, y = _legacy_create_sequences(scaled, scaled[:, 0], config.LSTM_LOOK_BACK)
+    return {"seconds": time.perf_counter() - start, "rss_growth_mb": _rss_peak_mb() - baseline_mb}
+
+
+def _iterate_epochs(dataset, epochs: int) -> list:
+    epoch_seconds = []
+    for _ in range(epochs):
+        start = time.perf_counter()
+        for _ in dataset:
+            pass
+        epoch_seconds.append(time.perf_counter() - start)
+    return epoch_seconds
+
+
+def _window_dataset_probe(scaled: np.ndarray, epochs: int, cache: bool) -> Dict[str, float]:
+    """Trainings-Pipeline wie in train_lstm_model (make_training_windows + make_window_dataset), `epochs` Epochen."""
+    config.LSTM_DATASET_CACHE = cache
+    from src.tf_keras_model import make_training_windows, make_window_dataset
+    look_back, batch_size = config.LSTM_LOOK_BACK, config.LSTM_BATCH_SIZE
+    windows, targets = make_training_windows(scaled, 'recursive', 1)
+    _iterate_epochs(make_window_dataset(scaled, targets, 0, 4 * batch_size, batch_size), 1) # Warm-up (tf.data, Graph-Aufbau)
+    baseline_mb = _rss_peak_mb()
+    dataset = make_window_dataset(scaled, targets, 0, len(windows), batch_size)
+    first_X, first_y = next(iter(dataset))
+    assert np.array_equal(first_X.numpy()[1], scaled[1:1 + look_back]) and first_y.numpy()[1] == scaled[look_back + 1, 0], "Fenster weichen ab"
+    epoch_seconds = _iterate_epochs(dataset, epochs)
+    return {"first_epoch_s": epoch_seconds[0], "later_epoch_s": min(epoch_seconds[1:] or epoch_seconds),
+            "rss_growth_mb": _rss_peak_mb() - baseline_mb}
+
+
+def bench_sequences(n_features: int = 17, epochs: int = 3):
+    """
+    LSTM-Trainingsfenster: _legacy_create_sequences (kompletter 3-D-Tensor) vs. make_window_dataset, wie es
+    train_lstm_model nutzt, ohne und mit cache(). Jede Variante in einem eigenen Prozess (RSS-Zuwachs nach Warm-up).
+    """
+    cases = {"10 Jahre täglich": 10 * 365 + 2, "1 Jahr 15-Minuten": 365 * 96}
+    for label, n_rows in cases.items():
+        scaled = np.random.default_rng(0).random((n_rows, n_features), dtype=np.float32)
+        legacy = _run_in_fresh_process(_legacy_windows_probe, scaled)
+        results = {cache: _run_in_fresh_process(_window_dataset_probe, scaled, epochs, cache) for cache in (False, True)}
+        print(f"[sequences] {label:<18} rows={n_rows:>6} features={n_features} look_back={config.LSTM_LOOK_BACK}  "
+              f"legacy={legacy['seconds'] * 1000:8.1f} ms / +{legacy['rss_growth_mb']:6.1f} MB")
+        for cache, result in results.items():
+            print(f"[sequences]   make_window_dataset cache={str(cache):<5}  epoch 1={result['first_epoch_s'] * 1000:8.1f} ms  "
+                  f"later epochs={result['later_epoch_s'] * 1000:8.1f} ms  +{result['rss_growth_mb']:6.1f} MB")
+
+
+def _feature_dtype_probe(history: pd.DataFrame, dtype: str) -> Dict[str, float]:
+    """LSTM-Datenpfad bis zur ersten Epoche mit config.FEATURE_DTYPE = dtype, im eigenen Prozess."""
+    config.FEATURE_DTYPE = dtype
+    from sklearn.preprocessing import MinMaxScaler
+    from src.data_loader import add_features
+    from src.lstm_inference import prepare_lstm_input
+    from src.tf_keras_model import make_training_windows, make_window_dataset
+
+    def data_path():
+        with_features, _, _ = add_features(history.set_index(config.DATE_COLUMN), target_column=config.TARGET_COLUMN)
+        _, _, lstm_input_data_df = prepare_lstm_input(with_features.reset_index())
+        scaled = np.ascontiguousarray(MinMaxScaler().fit_transform(lstm_input_data_df), dtype=config.FEATURE_DTYPE)
+        windows, targets = make_training_windows(scaled, 'recursive', 1)
+        _iterate_epochs(make_window_dataset(scaled, targets, 0, len(windows), config.LSTM_BATCH_SIZE), 1)
+        return scaled
+
+    _iterate_epochs(make_window_dataset(np.zeros((200, 3), dtype=np.float32), np.zeros(200, dtype=np.float32), 0, 64, 32), 1) # Warm-up
+    baseline_mb = _rss_peak_mb()
+    start = time.perf_counter()
+    scaled = data_path()
+    seconds = time.perf_counter() - start
+    rss_growth_mb = _rss_peak_mb() - baseline_mb
+    assert scaled.dtype == np.dtype(dtype) and scaled.flags['C_CONTIGUOUS'], f"Skalierte Daten nicht {dtype}/zusammenhängend"
+    return {"seconds": seconds, "rss_growth_mb": rss_growth_mb, "numpy_peak_mb": _peak_memory_mb(data_path)}
+
+
+def bench_feature_dtype(years: int = 10):
+    """
+    Spitzen-Speicher des LSTM-Datenpfads (add_features -> Skalierung -> make_window_dataset, eine Epoche) mit float64
+    vs. float32: tracemalloc für die NumPy/pandas-Puffer und RSS-Zuwachs des ganzen Laufs (inkl. tf.data).
+    """
+    # Referenzlauf (10 Jahre täglich, 1 CPU): NumPy-Spitze 2.63 -> 1.45 MB (1.8x), RSS +9.4 -> +8.1 MB, 164 -> 116 ms.
+    dates = pd.date_range('2015-01-01', periods=years * 365, freq='D')
+    history = pd.DataFrame({config.DATE_COLUMN: dates, config.TARGET_COLUMN: np.random.default_rng(5).normal(450, 80, len(dates))})
+    results = {dtype: _run_in_fresh_process(_feature_dtype_probe, history, dtype) for dtype in ('float64', 'float32')}
+    for dtype, result in results.items():
+        print(f"[feature_dtype] rows={len(history)} {dtype}  numpy peak={result['numpy_peak_mb']:6.2f} MB  "
+              f"rss +{result['rss_growth_mb']:6.1f} MB  {result['seconds'] * 1000:7.1f} ms")
+    print(f"[feature_dtype] numpy peak float64/float32={results['float64']['numpy_peak_mb'] / results['float32']['numpy_peak_mb']:4.2f}x")
+
+
+def bench_recursive_features(horizon: int = 90):
+    """Feature-Zeilen im rekursiven LSTM-Loop: add_features über die ganze Historie je Schritt vs. IncrementalFeatureEngine."""
+    from src.data_loader import add_features, IncrementalFeatureEngine
+    dates = pd.date_range('2015-01-01', periods=10 * 365, freq='D')
+    history = pd.DataFrame({config.DATE_COLUMN: dates, config.TARGET_COLUMN: np.random.default_rng(1).normal(450, 80, len(dates))})
+    history_with_features, _, _ = add_features(history.set_index(config.DATE_COLUMN), target_column=config.TARGET_COLUMN)
+    predictions = np.random.default_rng(2).normal(450, 80, horizon)
+
+    def legacy():
+        rows, frame = [], history.copy()
+        for i, value in enumerate(predictions):
+            new_row = pd.DataFrame([{config.DATE_COLUMN: dates[-1] + pd.Timedelta(days=i + 1), config.TARGET_COLUMN: value}])
+            frame = pd.concat([frame, new_row], ignore_index=True)
+            recalculated, _, _ = add_features(frame.set_index(config.DATE_COLUMN), target_column=config.TARGET_COLUMN)
+            rows.append(recalculated.iloc[-1])
+        return rows
+
+    def incremental():
+        engine = IncrementalFeatureEngine(history[config.TARGET_COLUMN].to_numpy(), last_row=history_with_features.iloc[-1].to_dict())
+        return [engine.next_row(dates[-1] + pd.Timedelta(days=i + 1), value) for i, value in enumerate(predictions)]
+
+    for legacy_row, incremental_row in zip(legacy(), incremental()):
+        for name, value in incremental_row.items():
+            assert np.isclose(legacy_row[name], value), f"Feature '{name}' weicht ab"
+    legacy_s, incremental_s = _time_call(legacy, repeat=1), _time_call(incremental)
+    print(f"[recursive_features] history={len(history)} horizon={horizon}  add_features={legacy_s * 1000:8.1f} ms  "
+          f"incremental={incremental_s * 1000:6.1f} ms  speedup={legacy_s / incremental_s:6.1f}x")
+
+
+def bench_lstm_inference(horizon: int = 90, n_features: int = 17):
+    """Latenz pro Schritt im rekursiven LSTM-Loop: model.predict vs. getracte tf.function (get_predictor)."""
+    # Referenzlauf (1 CPU, TensorFlow 2.19, horizon=90, 17 Features): model.predict 126.8 ms/Schritt -> tf.function 7.4 ms/Schritt (17x).
+    from src.tf_keras_model import build_lstm_model, get_predictor
+    model = build_lstm_model(n_features) # Latenz hängt nicht von trainierten Gewichten ab
+    trained = {"model": model, "features": [f"f{i}" for i in range(n_features)]}
+    window = np.random.default_rng(3).random((1, config.LSTM_LOOK_BACK, n_features)).astype(np.float32)
+    predictor = get_predictor(trained)
+    predictor(window) # Tracing einmalig vorab, wie beim ersten Request
+
+    def with_predict():
+        for _ in range(horizon):
+            model.predict(window, verbose=0)
+
+    def with_predictor():
+        for _ in range(horizon):
+            predictor(window).numpy()
+
+    assert np.allclose(model.predict(window, verbose=0), predictor(window).numpy(), atol=1e-5), "Vorhersagen weichen ab"
+    predict_s, predictor_s = _time_call(with_predict), _time_call(with_predictor)
+    print(f"[lstm_inference] horizon={horizon} features={n_features}  model.predict={predict_s / horizon * 1000:7.2f} ms/step  "
+          f"tf.function={predictor_s / horizon * 1000:6.2f} ms/step  speedup={predict_s / predictor_s:6.1f}x")
+
+
+def bench_numpy_lstm(horizon: int = 90, n_features: int = 17):
+    """Rekursiver Loop pro Schritt: getracte tf.function vs. NumPy-Forward-Pass aus model.npz, inkl. Abweichung."""
+    import os
+    import tempfile
+    from sklearn.preprocessing import MinMaxScaler
+    from src.tf_keras_model import build_lstm_model, get_predictor
+    from src.numpy_lstm import NumpyLSTMModel, export_npz, max_abs_difference
+    rng = np.random.default_rng(4)
+    model = build_lstm_model(n_features)
+    model.set_weights([rng.normal(0, 0.3, w.shape).astype(np.float32) for w in model.get_weights()]) # nicht nur Startgewichte
+    trained = {"model": model, "features": [f"f{i}" for i in range(n_features)]}
+    scaler = MinMaxScaler().fit(rng.random((10, n_features)))
+    windows = rng.random((horizon, 1, config.LSTM_LOOK_BACK, n_features)).astype(np.float32)
+    predictor = get_predictor(trained)
+    predictor(windows[0])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.npz")
+        export_npz(path, model, scaler, trained["features"])
+        npz_kb = os.path.getsize(path) / 1024
+        numpy_model = NumpyLSTMModel.load(path)
+    difference = max(max_abs_difference(numpy_model, lambda w: predictor(w).numpy(), window) for window in windows)
+
+    def with_tf():
+        for window in windows:
+            predictor(window).numpy()
+
+    def with_numpy():
+        for window in windows:
+            numpy_model.predict(window)
+
+    tf_s, numpy_s = _time_call(with_tf), _time_call(with_numpy)
+    print(f"[numpy_lstm] horizon={horizon} features={n_features}  tf.function={tf_s / horizon * 1000:6.2f} ms/step  "
+          f"numpy={numpy_s / horizon * 1000:6.2f} ms/step  max_abs_diff={difference:.2e}  npz={npz_kb:.0f} KB")
+
+
+def _synthetic_training_frame(n_days: int, seed: int) -> pd.DataFrame:
+    from src.data_loader import add_features
+    dates = pd.date_range('2015-01-01', periods=n_days, freq='D')
+    values = 450 + 80 * np.sin(np.arange(n_days) * 2 * np.pi / 365) + np.random.default_rng(seed).normal(0, 20, n_days)
+    frame = pd.DataFrame({config.DATE_COLUMN: dates, config.TARGET_COLUMN: values}).set_index(config.DATE_COLUMN)
+    frame_with_features, _, _ = add_features(frame, target_column=config.TARGET_COLUMN)
+    return frame_with_features.reset_index()
+
+
+def _train_for_throughput(n_days: int, epochs: int, concurrent: int, seed: int) -> float:
+    """Läuft in einem eigenen (spawn-)Prozess wie ein Pool-Worker; config wird vor dem TensorFlow-Import angepasst."""
+    config.LSTM_EPOCHS = epochs
+    config.LSTM_EARLY_STOPPING_PATIENCE = epochs # Jede Epoche läuft durch, damit die Durchläufe vergleichbar sind
+    config.FORECAST_JOB_WORKERS = concurrent # Thread-Aufteilung wie bei `concurrent` Pool-Workern
+    from src.tf_keras_model import train_lstm_model
+    return train_lstm_model(_synthetic_training_frame(n_days, seed))["report"]["training_samples_per_second"]
+
+
+def bench_training_throughput(n_days: int = 5 * 365, epochs: int = 3):
+    """Trainingsdurchsatz (Samples/s über alle Prozesse) bei 1, 2 und 4 gleichzeitigen Trainings, Thread-Pools laut config."""
+    # Referenzlauf (1 CPU, TensorFlow 2.19): gesamt 231 / 239 / 236 Samples/s bei 1 / 2 / 4 gleichzeitigen Trainings.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    for concurrent in (1, 2, 4):
+        with ProcessPoolExecutor(max_workers=concurrent, mp_context=multiprocessing.get_context('spawn')) as pool:
+            per_process = list(pool.map(_train_for_throughput, [n_days] * concurrent, [epochs] * concurrent,
+                                        [concurrent] * concurrent, range(concurrent)))
+        print(f"[training_throughput] concurrent={concurrent} days={n_days} epochs={epochs}  "
+              f"total={sum(per_process):9.1f} samples/s  per_training={sum(per_process) / concurrent:9.1f} samples/s")
+
+
+def bench_prophet_warm_start(years: int = 6, repeat: int = 3):
+    """Täglicher Refit nach einem neuen Ist-Wert: Kaltstart vs. Warm-Start aus den Parametern des Vortags-Fits."""
+    from src.model_cache import fingerprint_config
+    from src.prophet_model import fit_prophet_model, warm_start_params
+    n_days = years * 365
+    dates = pd.date_range('2015-01-01', periods=n_days + 1, freq='D')
+    values = 450 + 80 * np.sin(np.arange(n_days + 1) * 2 * np.pi / 365) + np.random.default_rng(42).normal(0, 20, n_days + 1)
+    history = pd.DataFrame({'ds': dates, 'y': values})
+    yesterday_model, regressors, _, _ = fit_prophet_model(history.iloc[:-1].copy())
+    warm_start_meta = {"config_fingerprint": fingerprint_config('prophet'), "regressors": regressors,
+                       "params": warm_start_params(yesterday_model)}
+
+    cold_s = _time_call(lambda: fit_prophet_model(history.copy()), repeat=repeat)
+    warm_s = _time_call(lambda: fit_prophet_model(history.copy(), warm_start_meta=warm_start_meta), repeat=repeat)
+    _, _, _, warm_report = fit_prophet_model(history.copy(), warm_start_meta=warm_start_meta)
+    print(f"[prophet_warm_start] days={n_days + 1}  cold={cold_s:6.2f} s  warm={warm_s:6.2f} s  "
+          f"speedup={cold_s / warm_s:4.1f}x  warm_start_used={warm_report['warm_start']}")
+
+
+def bench_prophet_predict(years: int = 10, horizon: int = 7):
+    """Prophet-Vorhersage für `horizon` Tage: nur Prognosetage vs. Historie + Prognosetage (bisheriges Verhalten)."""
+    from src.prophet_model import fit_prophet_model, predict_prophet_model
+    n_days = years * 365
+    dates = pd.date_range('2015-01-01', periods=n_days, freq='D')
+    values = 450 + 80 * np.sin(np.arange(n_days) * 2 * np.pi / 365) + np.random.default_rng(42).normal(0, 20, n_days)
+    model, regressors, _, _ = fit_prophet_model(pd.DataFrame({'ds': dates, 'y': values}))
+    for include_history in (True, False):
+        seconds = _time_call(lambda: predict_prophet_model(model, horizon, regressors, None, include_history=include_history))
+        print(f"[prophet_predict] days={n_days} horizon={horizon} include_history={str(include_history):5s}  {seconds * 1000:8.1f} ms")
+
+
+def bench_prophet_uncertainty(years: int = 10, horizon: int = 90):
+    """Vorhersagezeit und mittlere Intervallbreite je PROPHET_UNCERTAINTY_MODE (inkl. reduzierter Sample-Zahl)."""
+    from src.prophet_model import fit_prophet_model, predict_prophet_model
+    n_days = years * 365
+    dates = pd.date_range('2015-01-01', periods=n_days, freq='D')
+    values = 450 + 80 * np.sin(np.arange(n_days) * 2 * np.pi / 365) + np.random.default_rng(42).normal(0, 20, n_days)
+    history = pd.DataFrame({'ds': dates, 'y': values})
+    original = (config.PROPHET_UNCERTAINTY_MODE, config.PROPHET_UNCERTAINTY_SAMPLES)
+    try:
+        for mode, samples in (('sampling', 1000), ('sampling', 200), ('residual', 0), ('off', 0)):
+            config.PROPHET_UNCERTAINTY_MODE, config.PROPHET_UNCERTAINTY_SAMPLES = mode, samples
+            model, regressors, _, report = fit_prophet_model(history.copy())
+            predict = lambda: predict_prophet_model(model, horizon, regressors, None, residual_interval=report["residual_interval"])
+            seconds = _time_call(predict)
+            forecast = predict()
+            width = (forecast['yhat_upper'] - forecast['yhat_lower']).mean() if 'yhat_upper' in forecast.columns else float('nan')
+            print(f"[prophet_uncertainty] mode={mode:8s} samples={samples:4d} horizon={horizon}  predict={seconds * 1000:8.1f} ms  "
+                  f"mean_interval_width={width:7.2f}")
+    finally:
+        config.PROPHET_UNCERTAINTY_MODE, config.PROPHET_UNCERTAINTY_SAMPLES = original
+
+
+def bench_prophet_reload(years: int = 10, horizon: int = 7):
+    """Prognose aus dem model_store (Deserialisieren + Vorhersage nur der Prognosetage) vs. neuer Fit + Vorhersage."""
+    from prophet.serialize import model_to_json, model_from_json
+    from src.prophet_model import fit_prophet_model, predict_prophet_model
+    n_days = years * 365
+    dates = pd.date_range('2015-01-01', periods=n_days, freq='D')
+    values = 450 + 80 * np.sin(np.arange(n_days) * 2 * np.pi / 365) + np.random.default_rng(42).normal(0, 20, n_days)
+    history = pd.DataFrame({'ds': dates, 'y': values})
+
+    def fit_and_predict():
+        model, regressors, _, report = fit_prophet_model(history.copy())
+        predict_prophet_model(model, horizon, regressors, None, residual_interval=report["residual_interval"])
+
+    model, regressors, _, report = fit_prophet_model(history.copy())
+    model_json = model_to_json(model)
+
+    def reload_and_predict():
+        predict_prophet_model(model_from_json(model_json), horizon, regressors, None, residual_interval=report["residual_interval"])
+
+    fit_s, reload_s = _time_call(fit_and_predict, repeat=1), _time_call(reload_and_predict)
+    print(f"[prophet_reload] days={n_days} horizon={horizon}  fit+predict={fit_s:6.2f} s  reload+predict={reload_s:6.2f} s  "
+          f"model_json={len(model_json) / 1024:.0f} KB")
+
+
+_STARTUP_PROBE = """
+import asyncio, json, re, sys, time
+start = time.perf_counter()
+if sys.argv[1] == 'eager':
+    import src.prophet_model, src.tf_keras_model # Verhalten vor model_backends.py: beide Backends beim Import von api.py
+import api
+response = asyncio.run(api.health_endpoint())
+print(json.dumps({"first_response_s": time.perf_counter() - start, "status": response.status_code,
+                  "max_rss_mb": int(re.search(r'VmHWM:\\s+(\\d+)', open('/proc/self/status').read()).group(1)) / 1024, # ru_maxrss erbt den Elternwert
+                  "heavy_modules": sorted(m for m in ('tensorflow', 'prophet', 'sklearn', 'pyarrow') if m in sys.modules)}))
+"""
+
+
+def bench_startup():
+    """Kaltstart eines API-Workers, der nie prognostiziert: Zeit bis zur ersten /api/health-Antwort und RSS, lazy vs. eager."""
+    # Referenzlauf (1 CPU, VmHWM): eager 6.9 s / 725 MB, lazy 1.3 s / 134 MB, auch nach allen anderen Benchmarks im selben Prozess.
+    import os
+    import json
+    import subprocess
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for variant in ('eager', 'lazy'):
+        completed = subprocess.run([sys.executable, "-c", _STARTUP_PROBE, variant], cwd=project_dir, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"[startup] {variant}: failed\n{completed.stderr.strip()[-2000:]}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"[startup] {variant:5s}  first_response={result['first_response_s']:6.2f} s  max_rss={result['max_rss_mb']:7.1f} MB  "
+              f"heavy_modules={result['heavy_modules']}")
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "save_actuals": bench_save_actuals,
+    "sequences": bench_sequences,
+    "feature_dtype": bench_feature_dtype,
+    "recursive_features": bench_recursive_features,
+    "lstm_inference": bench_lstm_inference,
+    "numpy_lstm": bench_numpy_lstm,
+    "training_throughput": bench_training_throughput,
+    "startup": bench_startup,
+    "prophet_warm_start": bench_prophet_warm_start,
+    "prophet_predict": bench_prophet_predict,
+    "prophet_uncertainty": bench_prophet_uncertainty,
+    "prophet_reload": bench_prophet_reload,
+}
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS.keys())
+    for name in selected:
+        if name not in BENCHMARKS:
+            print(f"Unbekannter Benchmark '{name}'. Verfügbar: {', '.join(BENCHMARKS.keys())}")
+            sys.exit(1)
+        BENCHMARKS[name]()
@@ -41,6 +41,25 @@ PROPHET_DAILY_SEASONALITY = False
 # Consider 'multiplicative' if seasonal fluctuations scale with the trend.
 # Options: 'additive' (default) or 'multiplicative'
 PROPHET_SEASONALITY_MODE = 'additive' # or 'multiplicative'
+# Warm-Start: die zuletzt optimierten Parameter (k, m, delta, beta, sigma_obs) je Container werden im model_store
+# abgelegt und beim nächsten Fit als Stan-Startwert (init) verwendet. Passen Changepoints/Regressoren nicht, Kaltstart.
+PROPHET_WARM_START = True
+# Gefittete Modelle zusätzlich serialisiert ablegen (model_store, model.json). Bei unveränderten Ist-Werten und gleicher
+# Konfiguration lädt jeder Worker (auch nach einem Neustart) das Modell, statt neu zu fitten.
+PROPHET_STORE_MODELS = True
+# Vorhersage nur für die Prognosetage (make_future_dataframe(include_history=False)); True rechnet zusätzlich den
+# gesamten In-Sample-Fit (Trend, Saisonalität, Unsicherheit für jeden historischen Tag) mit, nur für Diagnosezwecke.
+# Standardwert für das Payload-Feld 'include_history' der Prognose-Endpunkte.
+PROPHET_PREDICT_INCLUDE_HISTORY = False
+# Unsicherheitsintervall (yhat_lower/yhat_upper) der Prophet-Prognose:
+# 'sampling': Prophet simuliert PROPHET_UNCERTAINTY_SAMPLES Trendpfade je Prognosetag (Prophet-Standard 1000, genaueste
+#             und teuerste Variante; kleinere Werte = schneller, aber unruhigere Grenzen).
+# 'residual': Quantile der In-Sample-Residuen, einmal beim Fit in einem vektorisierten Durchlauf berechnet und auf
+#             yhat addiert. Bildet das Beobachtungsrauschen ab, nicht die mit dem Horizont wachsende Trendunsicherheit.
+# 'off':      keine Intervalle, die Antwort enthält dann kein yhat_lower/yhat_upper.
+PROPHET_UNCERTAINTY_MODE = 'sampling'
+PROPHET_UNCERTAINTY_SAMPLES = 1000
+PROPHET_UNCERTAINTY_MODES = ['sampling', 'residual', 'off']
 
 # --- LSTM Konfiguration ---
 LSTM_LOOK_BACK = 60
@@ -49,7 +68,29 @@ LSTM_UNITS_L2 = 50
 LSTM_DROPOUT = 0.2
 LSTM_EPOCHS = 50
 LSTM_BATCH_SIZE = 32
+# True: fertige Trainings-Batches ab der 2. Epoche aus dem Speicher (spart den tf.gather je Batch), hält dafür aber den
+# kompletten Tensor Samples x LSTM_LOOK_BACK x Features im RAM, den make_window_dataset sonst vermeidet.
+LSTM_DATASET_CACHE = False
 LSTM_EARLY_STOPPING_PATIENCE = 10
+# 'recursive': Dense(1), ein predict-Aufruf pro Prognosetag mit fortgeschriebenen Features.
+# 'direct': Dense(LSTM_DIRECT_HORIZON), der gesamte Horizont in einem Forward-Pass (kürzere Horizonte = die ersten Werte).
+# Per Request über das Payload-Feld 'lstm_mode' überschreibbar.
+LSTM_FORECAST_MODE = 'recursive'
+LSTM_DIRECT_HORIZON = 90 # Muss >= der längsten Prognosedauer (PERIODS_MAP) sein
+LSTM_FORECAST_MODES = ['recursive', 'direct']
+# Warm-Start: gespeicherte Gewichte + Scaler je Container (model_store.py) werden auf den jüngsten Fenstern
+# nachtrainiert statt von Grund auf neu. Volltraining bei Drift, zu hohem Loss oder zu altem Basismodell.
+LSTM_WARM_START = True
+LSTM_FINETUNE_EPOCHS = 5
+LSTM_FINETUNE_RECENT_WINDOWS = 365 # Anzahl der jüngsten Trainingsfenster für das Fine-Tuning
+LSTM_FINETUNE_LEARNING_RATE = 1e-4
+LSTM_FINETUNE_MAX_LOSS_RATIO = 2.0 # Fine-Tune-Loss > Faktor x Loss des Volltrainings -> Volltraining
+LSTM_FINETUNE_DRIFT_TOLERANCE = 0.1 # Neue Werte außerhalb [-tol, 1 + tol] des gespeicherten Scalers -> Volltraining
+LSTM_FULL_RETRAIN_MAX_AGE_DAYS = 30 # Spätestens nach so vielen Tagen wieder von Grund auf trainieren
+# Serving gespeicherter LSTM-Modelle: 'numpy' rechnet aus model.npz ohne TensorFlow (lstm_inference.py, numpy_lstm.py),
+# 'tensorflow' immer über Keras. Trainiert/nachtrainiert wird in beiden Fällen mit TensorFlow.
+LSTM_INFERENCE_ENGINE = 'numpy'
+LSTM_NUMPY_TOLERANCE = 1e-4 # Max. Abweichung NumPy vs. Keras beim Export, sonst kein model.npz
 
 # --- Feature Engineering Konfiguration (für data_loader.py) ---
 CREATE_LAG_FEATURES = True
@@ -60,15 +101,74 @@ ROLLING_WINDOWS = [7, 14, 30]
 
 CREATE_DATE_FEATURES = True
 EXCLUDE_COLUMNS_FROM_FEATURES = []
+# Dtype der Features und des LSTM-Datenpfads (Skalierung, Fenster, Batches). Keras rechnet ohnehin in float32;
+# 'float64' nur zum Vergleich mit dem früheren Verhalten.
+FEATURE_DTYPE = 'float32'
 
-os.makedirs(RESULTS_DIR, exist_ok=True)
+# --- CSV-Upload (blockweises Einlesen, siehe ingestion.py) ---
+UPLOAD_CHUNK_ROWS = 50000 # Zeilen pro Block; jeder Block wird in einer eigenen Transaktion gespeichert
+UPLOAD_ENCODING_SAMPLE_BYTES = 64 * 1024 # Stichprobe für die UTF-8/latin1-Erkennung
+UPLOAD_MAX_REPORTED_ERRORS = 1000 # Weitere fehlerhafte Zeilen werden nur noch gezählt
 
-print(f"INFO (config.py): Project Base Directory: {BASE_DIR}")
-print(f"INFO (config.py): Using Data From: {os.path.join(DATA_DIR, FILE_PATTERN if FILE_PATTERN else '')}")
-print(f"INFO (config.py): Results Directory: {RESULTS_DIR}")
-print(f"INFO (config.py): MAX_PLAUSIBLE_CONSUMPTION_VALUE set to: {MAX_PLAUSIBLE_CONSUMPTION_VALUE}")
-print(f"INFO (config.py): PROPHET_CHANGEPOINT_PRIOR set to {PROPHET_CHANGEPOINT_PRIOR}")
-print(f"INFO (config.py): PROPHET_SEASONALITY_MODE set to {PROPHET_SEASONALITY_MODE}")
+# --- Hintergrund-Jobs (Modell-Fits im Prozess-Pool, siehe forecast_jobs.py) ---
+# Ein Kern bleibt für den API-Prozess frei, damit Health-Checks und Datenabfragen schnell bleiben.
+FORECAST_JOB_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# TensorFlow-Thread-Pools je Prozess (tf_keras_model.configure_tf_threading). None = CPU-Kerne / FORECAST_JOB_WORKERS,
+# damit parallele Trainings im Pool die Kerne nicht mehrfach belegen; 0 = TensorFlow-Standard (alle Kerne).
+TF_INTRA_OP_THREADS = None
+TF_INTER_OP_THREADS = 2
+FORECAST_JOB_RETENTION_SECONDS = 3600 # Wie lange abgeschlossene Jobs (inkl. Ergebnis) abrufbar bleiben
+FORECAST_JOB_PRUNE_INTERVAL_SECONDS = 300 # Abstand, in dem abgelaufene Jobs im Hintergrund entfernt werden
+
+# Generierte Prognosen in der Tabelle 'forecasts' ablegen (Grundlage für /api/forecasts und /api/forecast_vs_actual)
+PERSIST_FORECASTS = True
+
+# --- Backtesting (Rolling-Origin-Evaluation, siehe backtesting.py) ---
+# Cutoffs ab dem Ende der Historie rückwärts im Abstand BACKTEST_PERIOD_DAYS, solange vor dem Cutoff mindestens
+# BACKTEST_INITIAL_DAYS Historie liegen; höchstens BACKTEST_MAX_CUTOFFS (die jüngsten). Per Request überschreibbar.
+BACKTEST_INITIAL_DAYS = 730
+BACKTEST_PERIOD_DAYS = 30
+BACKTEST_HORIZON_DAYS = 30
+BACKTEST_MAX_CUTOFFS = 12
+# Höchstens so viele Backtest-Fits gleichzeitig im Prozess-Pool (None = FORECAST_JOB_WORKERS). Weitere werden erst
+# eingereicht, wenn einer fertig ist, damit interaktive Prognosen und Batch-Jobs nicht hinter dem ganzen Backtest warten.
+BACKTEST_MAX_IN_FLIGHT = None
+
+# --- Modell-Artefakte (persistente Modelle je Container, siehe model_store.py) ---
+MODEL_ARTIFACT_DIR = os.path.join(BASE_DIR, 'models')
+
+# --- Modell-Cache (trainierte Modelle je Container, siehe model_cache.py) ---
+MODEL_CACHE_MAX_ENTRIES = 32
+MODEL_CACHE_MAX_BYTES = 512 * 1024 * 1024 # Geschätzte Größe (Gewichte + Trainingsdaten) pro Worker-Prozess
+
+# --- SQLite (eine dauerhafte Verbindung pro Thread im WAL-Modus, siehe database.get_connection) ---
+SQLITE_BUSY_TIMEOUT_SECONDS = 10
+SQLITE_SYNCHRONOUS = 'NORMAL' # Im WAL-Modus ausreichend: kein Datenverlust bei Prozessabsturz, nur bei Stromausfall
+SQLITE_CACHE_SIZE_KB = 64 * 1024 # Seiten-Cache pro Verbindung
+SQLITE_MMAP_SIZE_BYTES = 256 * 1024 * 1024
+SQLITE_CACHED_STATEMENTS = 256 # Vorbereitete Statements, die pro Verbindung wiederverwendet werden
+
+# --- Container-Registry (prozessweiter Cache der Containernamen, siehe database.container_exists) ---
+CONTAINER_REGISTRY_RECHECK_SECONDS = 2.0 # Wie oft der Versionszähler auf Änderungen anderer Worker geprüft wird
+
+# --- Modell-Backends (lazy import, siehe model_backends.py) ---
+# Diese Backends ('prophet', 'tensorflow') importieren die Worker des Prozess-Pools gleich nach dem Start im Hintergrund,
+# damit die erste Prognose nicht die Importzeit trägt. Leer = erst bei der ersten Nutzung laden (schnellster Kaltstart).
+PREWARM_MODEL_BACKENDS = []
+
+
+def ensure_results_dir():
+    """Legt RESULTS_DIR an; früher beim Import dieses Moduls, jetzt beim Start der Anwendung."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+
+def log_config_summary():
+    print(f"INFO (config.py): Project Base Directory: {BASE_DIR}")
+    print(f"INFO (config.py): Using Data From: {os.path.join(DATA_DIR, FILE_PATTERN if FILE_PATTERN else '')}")
+    print(f"INFO (config.py): Results Directory: {RESULTS_DIR}")
+    print(f"INFO (config.py): MAX_PLAUSIBLE_CONSUMPTION_VALUE set to: {MAX_PLAUSIBLE_CONSUMPTION_VALUE}")
+    print(f"INFO (config.py): PROPHET_CHANGEPOINT_PRIOR set to {PROPHET_CHANGEPOINT_PRIOR}")
+    print(f"INFO (config.py): PROPHET_SEASONALITY_MODE set to {PROPHET_SEASONALITY_MODE}")
 
 
 def sanitize_filename(name: str) -> str:
@@ -3,10 +3,12 @@ import pandas as pd
 import os
 import glob
 import numpy as np
-from typing import Tuple, List # Für Typ-Annotationen
+from collections import deque
+from typing import Tuple, List, Dict, Optional # Für Typ-Annotationen
 from src import config
 
 def add_features(df: pd.DataFrame, target_column: str, include_lag_rolling: bool = True):
+    feature_dtype = np.dtype(config.FEATURE_DTYPE) # Alle erzeugten Features in einem Dtype (ein zusammenhängender Block)
     df_out = df.copy()
     created_base_features = []
     created_date_features = []
@@ -26,15 +28,15 @@ def add_features(df: pd.DataFrame, target_column: str, include_lag_rolling: bool
                         f"oder eine als '{config.DATE_COLUMN}' benannte Spalte fehlt oder ist kein Datumsformat. Fehler: {e}"
                     )
         
-        df_out['date_dayofweek'] = df_out.index.dayofweek
-        df_out['date_dayofyear_sin'] = np.sin(2 * np.pi * df_out.index.dayofyear / 365.25)
-        df_out['date_dayofyear_cos'] = np.cos(2 * np.pi * df_out.index.dayofyear / 365.25)
-        df_out['date_month_sin'] = np.sin(2 * np.pi * df_out.index.month / 12)
-        df_out['date_month_cos'] = np.cos(2 * np.pi * df_out.index.month / 12)
+        df_out['date_dayofweek'] = df_out.index.dayofweek.astype(feature_dtype)
+        df_out['date_dayofyear_sin'] = np.sin(2 * np.pi * df_out.index.dayofyear / 365.25).astype(feature_dtype)
+        df_out['date_dayofyear_cos'] = np.cos(2 * np.pi * df_out.index.dayofyear / 365.25).astype(feature_dtype)
+        df_out['date_month_sin'] = np.sin(2 * np.pi * df_out.index.month / 12).astype(feature_dtype)
+        df_out['date_month_cos'] = np.cos(2 * np.pi * df_out.index.month / 12).astype(feature_dtype)
         if hasattr(df_out.index.isocalendar(), 'week'):
-            df_out['date_weekofyear'] = df_out.index.isocalendar().week.astype(float)
+            df_out['date_weekofyear'] = df_out.index.isocalendar().week.to_numpy(dtype=feature_dtype)
         else:
-            df_out['date_weekofyear'] = df_out.index.weekofyear.astype(float)
+            df_out['date_weekofyear'] = df_out.index.weekofyear.astype(feature_dtype)
         
         created_date_features.extend(['date_dayofweek', 'date_dayofyear_sin', 'date_dayofyear_cos', 'date_month_sin', 'date_month_cos', 'date_weekofyear'])
 
@@ -45,14 +47,15 @@ def add_features(df: pd.DataFrame, target_column: str, include_lag_rolling: bool
         else:
             if config.CREATE_LAG_FEATURES:
                 for lag in config.LAG_VALUES:
-                    df_out[f'{target_column}_lag_{lag}'] = df_out[target_column].shift(lag)
+                    df_out[f'{target_column}_lag_{lag}'] = df_out[target_column].shift(lag).astype(feature_dtype)
                     created_base_features.append(f'{target_column}_lag_{lag}')
             
             if config.CREATE_ROLLING_FEATURES:
-                shifted_target = df_out[target_column].shift(1)
+                shifted_target = df_out[target_column].shift(1).astype(np.float64)
                 for window in config.ROLLING_WINDOWS:
-                    df_out[f'{target_column}_roll_mean_{window}'] = shifted_target.rolling(window=window, min_periods=1).mean()
-                    df_out[f'{target_column}_roll_std_{window}'] = shifted_target.rolling(window=window, min_periods=1).std()
+                    # Statistik in float64 rechnen (Genauigkeit der laufenden Summen), erst das Ergebnis in feature_dtype ablegen
+                    df_out[f'{target_column}_roll_mean_{window}'] = shifted_target.rolling(window=window, min_periods=1).mean().astype(feature_dtype)
+                    df_out[f'{target_column}_roll_std_{window}'] = shifted_target.rolling(window=window, min_periods=1).std().astype(feature_dtype)
                     created_base_features.extend([f'{target_column}_roll_mean_{window}', f'{target_column}_roll_std_{window}'])
     
     all_newly_created_features = created_base_features + created_date_features
@@ -74,6 +77,60 @@ def add_features(df: pd.DataFrame, target_column: str, include_lag_rolling: bool
     return df_out, all_potential_feature_names, created_date_features
 
 
+def date_features_for(timestamp: pd.Timestamp) -> Dict[str, float]:
+    """Die Datumsfeatures aus add_features für einen einzelnen Zeitpunkt."""
+    day_of_year = timestamp.dayofyear
+    return {
+        'date_dayofweek': timestamp.dayofweek,
+        'date_dayofyear_sin': np.sin(2 * np.pi * day_of_year / 365.25),
+        'date_dayofyear_cos': np.cos(2 * np.pi * day_of_year / 365.25),
+        'date_month_sin': np.sin(2 * np.pi * timestamp.month / 12),
+        'date_month_cos': np.cos(2 * np.pi * timestamp.month / 12),
+        'date_weekofyear': float(timestamp.isocalendar()[1]),
+    }
+
+
+class IncrementalFeatureEngine:
+    """
+    Liefert die Feature-Zeile, die add_features(include_lag_rolling=True) für eine neu angehängte Zeile berechnen würde,
+    ohne die Historie erneut zu verarbeiten. Die letzten max(LAG_VALUES + ROLLING_WINDOWS) Zielwerte liegen in einem
+    Ringpuffer; Lags und Rolling-Statistiken (über den um 1 verschobenen Zielwert, std mit ddof=1) werden daraus gelesen.
+    Nicht berechenbare Werte werden wie in add_features mit dem Wert der Vorzeile (ffill) bzw. 0 gefüllt.
+    """
+    def __init__(self, target_history: np.ndarray, target_column: str = config.TARGET_COLUMN, last_row: Optional[Dict[str, float]] = None):
+        self.target_column = target_column
+        self.lags = list(config.LAG_VALUES) if config.CREATE_LAG_FEATURES else []
+        self.windows = list(config.ROLLING_WINDOWS) if config.CREATE_ROLLING_FEATURES else []
+        buffer_length = max(self.lags + self.windows, default=1)
+        self._targets = deque((float(v) for v in np.asarray(target_history)[-buffer_length:]), maxlen=buffer_length)
+        self._last_row: Dict[str, float] = dict(last_row or {}) # Letzte Feature-Zeile der Historie, Quelle für ffill
+
+    def _fill(self, name: str, value: float) -> float:
+        if value is None or np.isnan(value):
+            return self._last_row.get(name, 0.0)
+        return value
+
+    def next_row(self, timestamp: pd.Timestamp, target_value: float) -> Dict[str, float]:
+        """Features für die Zeile (timestamp, target_value); danach wird target_value in den Puffer übernommen."""
+        row: Dict[str, float] = {self.target_column: target_value}
+        if config.CREATE_DATE_FEATURES:
+            row.update(date_features_for(timestamp))
+        previous = self._targets
+        for lag in self.lags:
+            name = f'{self.target_column}_lag_{lag}'
+            row[name] = self._fill(name, previous[-lag] if len(previous) >= lag else None)
+        if self.windows:
+            recent = np.fromiter(previous, dtype=np.float64, count=len(previous))
+            for window in self.windows:
+                values = recent[-window:]
+                mean_name, std_name = f'{self.target_column}_roll_mean_{window}', f'{self.target_column}_roll_std_{window}'
+                row[mean_name] = self._fill(mean_name, values.mean() if len(values) > 0 else None)
+                row[std_name] = self._fill(std_name, values.std(ddof=1) if len(values) > 1 else None)
+        self._targets.append(float(target_value))
+        self._last_row = row
+        return row
+
+
 def identify_anomalies_iqr(df: pd.DataFrame, value_column_name: str, iqr_factor: float = 1.5) -> Tuple[pd.DataFrame, int]:
     df_with_anomalies = df.copy()
     df_with_anomalies['is_anomaly'] = False
@@ -3,12 +3,65 @@ import sqlite3
 import os
 import pandas as pd
 import numpy as np
+import json
 import traceback
-from typing import List, Tuple, Optional # Für Typ-Annotationen
+import threading
+import time
+from itertools import repeat
+from typing import List, Tuple, Optional, Dict, Any # Für Typ-Annotationen
 from src import config
 
 DB_FILE = os.path.join(os.path.dirname(__file__), "..", "forecast.db")
 
+# --- Verbindungsverwaltung ---
+# Jeder Thread (uvicorn-Event-Loop, Threadpool, Job-Worker) bekommt eine eigene, dauerhaft offene Verbindung.
+# Damit entfallen Verbindungsaufbau und Schema-Parsing pro Aufruf, und der Statement-Cache (cached_statements)
+# bleibt über Requests hinweg erhalten. WAL erlaubt parallele Lesezugriffe, während ein Upload committet.
+_thread_local = threading.local()
+_open_connections: List[sqlite3.Connection] = []
+_open_connections_lock = threading.Lock()
+
+def _configure_connection(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{int(config.SQLITE_CACHE_SIZE_KB)}") # negativ = KiB statt Seiten
+    conn.execute(f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE_BYTES)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Liefert die Verbindung des aktuellen Threads (wird beim ersten Aufruf geöffnet). Nicht schließen;
+    Schreibvorgänge müssen mit commit() oder rollback() abgeschlossen werden, da die Verbindung weiterverwendet wird.
+    """
+    conn = getattr(_thread_local, "conn", None)
+    if conn is not None and getattr(_thread_local, "pid", None) == os.getpid():
+        if conn.in_transaction:
+            # Sicherheitsnetz: ein Aufrufer hat eine Transaktion offen gelassen (z.B. durch eine unerwartete Exception).
+            print("WARN (database.py): Pooled connection had an open transaction. Rolling back.")
+            conn.rollback()
+        return conn
+    # Nach fork() darf die Verbindung des Elternprozesses nicht weiterverwendet werden.
+    conn = sqlite3.connect(DB_FILE, timeout=config.SQLITE_BUSY_TIMEOUT_SECONDS,
+                           cached_statements=config.SQLITE_CACHED_STATEMENTS, check_same_thread=False)
+    _configure_connection(conn)
+    _thread_local.conn = conn
+    _thread_local.pid = os.getpid()
+    with _open_connections_lock:
+        _open_connections.append(conn)
+    return conn
+
+def close_all_connections() -> None:
+    """Schließt alle von diesem Prozess geöffneten Verbindungen (beim Herunterfahren der API)."""
+    with _open_connections_lock:
+        connections = list(_open_connections)
+        _open_connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"WARN (database.py): Error while closing pooled connection: {e}")
+    print(f"INFO (database.py): Closed {len(connections)} pooled database connection(s).")
+
 def init_db():
     conn = None
     try:
@@ -18,7 +71,7 @@ def init_db():
             print(f"INFO (database.py): Created directory for database: {db_dir}")
 
         print(f"INFO (database.py): Connecting to database at {DB_FILE} with timeout...")
-        conn = sqlite3.connect(DB_FILE, timeout=10)
+        conn = get_connection()
         c = conn.cursor()
         print("INFO (database.py): Database connection successful. Creating tables if not exist...")
 
@@ -54,6 +107,18 @@ def init_db():
         ''')
         print("INFO (database.py): 'containers' table schema checked/created.")
 
+        # Schlüssel/Wert-Tabelle für Zähler; 'containers_version' wird bei jeder Änderung an 'containers' erhöht,
+        # damit andere Worker-Prozesse ihre Container-Registry (siehe container_exists) neu laden.
+        # 'data_version:<container>' zählt Änderungen an den Ist-Werten eines Containers (siehe model_cache.sync_container).
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        c.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('containers_version', 0)")
+        print("INFO (database.py): 'meta' table schema checked/created.")
+
         # Existing forecasts table
         c.execute('''
             CREATE TABLE IF NOT EXISTS forecasts (
@@ -66,21 +131,135 @@ def init_db():
                 UNIQUE(container_id, model_name, target_date, forecast_date)
             )
         ''')
+        # Lookup "neueste Prognose je Container/Modell"; (container_id, model_name, target_date) deckt schon der UNIQUE-Index ab.
+        c.execute('CREATE INDEX IF NOT EXISTS idx_forecasts_container_model_issued ON forecasts (container_id, model_name, forecast_date)')
         print("INFO (database.py): 'forecasts' table schema checked/created.")
+
+        # Status der Hintergrund-Jobs (forecast_jobs.py), damit jeder API-Worker-Prozess jeden Job abfragen kann.
+        # result enthält das Ergebnis des Jobs als JSON-Text (forecast_data im records-Format).
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                description TEXT,
+                status TEXT NOT NULL,
+                submitted_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                finished_ts REAL,
+                result TEXT,
+                error TEXT,
+                error_status_code INTEGER
+            )
+        ''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_jobs_finished_ts ON jobs (finished_ts)')
+        print("INFO (database.py): 'jobs' table schema checked/created.")
         conn.commit()
         print("INFO (database.py): Database changes committed.")
     except sqlite3.Error as e:
         print(f"ERROR (database.py): SQLite error during init_db: {e}")
         traceback.print_exc()
-    finally:
-        if conn:
-            conn.close()
-            print("INFO (database.py): Database connection closed after init.")
+        if conn: conn.rollback()
+
+ACTUALS_DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+def _row_snippet(date_val_raw, value_val_raw) -> str:
+    return f"Date='{date_val_raw if not pd.isnull(date_val_raw) else 'N/A'}', Value='{value_val_raw if not pd.isnull(value_val_raw) else 'N/A'}'"
+
+def _to_naive_datetimes(parsed) -> pd.Series:
+    # Zeitzonen-behaftete Angaben behalten ihre Wanduhrzeit (wie zuvor strftime auf dem einzelnen Timestamp).
+    if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+        return parsed.dt.tz_localize(None)
+    return parsed
+
+def _parse_dates_vectorized(date_raw: pd.Series) -> pd.Series:
+    """Parst die Datumsspalte spaltenweise; nur Zeilen, an denen das erkannte Format scheitert, werden einzeln nachgeparst."""
+    try:
+        parsed = _to_naive_datetimes(pd.to_datetime(date_raw, errors='coerce'))
+    except (ValueError, TypeError): # z.B. gemischte Zeitzonen in einer Spalte
+        parsed = pd.Series(pd.NaT, index=date_raw.index, dtype='datetime64[ns]')
+    if not pd.api.types.is_datetime64_dtype(parsed):
+        parsed = pd.Series(pd.NaT, index=date_raw.index, dtype='datetime64[ns]')
+
+    retry_mask = parsed.isna() & date_raw.notna()
+    if retry_mask.any():
+        retried = date_raw[retry_mask].map(_parse_single_date)
+        parsed = parsed.copy()
+        parsed[retry_mask] = pd.to_datetime(retried, errors='coerce')
+    return parsed
+
+def _parse_single_date(date_val_raw):
+    try:
+        date_obj = pd.to_datetime(date_val_raw)
+        return date_obj.tz_localize(None) if date_obj.tzinfo is not None else date_obj
+    except (ValueError, TypeError):
+        return pd.NaT
+
+def _date_conversion_error(date_val_raw) -> str:
+    try:
+        pd.to_datetime(date_val_raw)
+        return "Datums-Konvertierungsfehler: Datum konnte nicht interpretiert werden."
+    except (ValueError, TypeError) as conversion_err:
+        return f"Datums-Konvertierungsfehler: {str(conversion_err)}"
+
+def _parse_values_vectorized(value_raw: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Gibt (Werte als float64 mit NaN für leer/ungültig, Maske der nicht-numerischen Einträge) zurück. Dezimalkomma wird akzeptiert."""
+    if pd.api.types.is_numeric_dtype(value_raw) and not pd.api.types.is_bool_dtype(value_raw):
+        return value_raw.to_numpy(dtype=np.float64, na_value=np.nan), np.zeros(len(value_raw), dtype=bool)
+    present = value_raw.notna().to_numpy()
+    value_str = value_raw.astype(str).str.strip()
+    present &= (value_str != "").to_numpy()
+    values = pd.to_numeric(value_str.str.replace(',', '.', regex=False), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    explicit_nan = value_str.str.lower().isin(['nan', '-nan', '+nan']).to_numpy()
+    non_numeric = present & np.isnan(values) & ~explicit_nan
+    values[~present] = np.nan
+    return values, non_numeric
+
+def validate_actuals_frame(actual_df: pd.DataFrame) -> Tuple[List[str], List[float | None], List[Dict[str, Any]]]:
+    """
+    Spaltenweise Validierung eines Upload-Blocks mit den Spalten 'Date' und 'Value'.
+    Liefert (ISO-Datumsstrings, Werte mit None für fehlende/nicht-numerische Angaben, Fehlerliste für übersprungene Zeilen).
+    Fehlereinträge werden nur für fehlerhafte Zeilen erzeugt; row_csv = DataFrame-Index + 2 (Kopfzeile, 1-basiert).
+    """
+    date_raw = actual_df['Date']
+    value_raw = actual_df['Value']
+    row_numbers = np.asarray(actual_df.index) + 2
+
+    date_missing = date_raw.isna().to_numpy()
+    parsed_dates = _parse_dates_vectorized(date_raw)
+    date_failed = parsed_dates.isna().to_numpy() & ~date_missing
+    date_ok = ~date_missing & ~date_failed
+
+    values, non_numeric = _parse_values_vectorized(value_raw)
+    with np.errstate(invalid='ignore'):
+        negative = date_ok & (values < 0)
+        too_large = date_ok & (values > config.MAX_PLAUSIBLE_CONSUMPTION_VALUE)
+    valid = date_ok & ~negative & ~too_large
+
+    error_rows: List[Tuple[int, Dict[str, Any]]] = []
+    for pos in np.flatnonzero(date_missing):
+        error_rows.append((pos, {"row_csv": int(row_numbers[pos]), "column_name": "Date", "error_message": "Fehlender Wert für 'Date'.", "original_value": _row_snippet(date_raw.iat[pos], value_raw.iat[pos])}))
+    for pos in np.flatnonzero(date_failed):
+        error_rows.append((pos, {"row_csv": int(row_numbers[pos]), "column_name": "Date", "error_message": _date_conversion_error(date_raw.iat[pos]), "original_value": _row_snippet(date_raw.iat[pos], value_raw.iat[pos])}))
+    for pos in np.flatnonzero(negative):
+        error_rows.append((pos, {"row_csv": int(row_numbers[pos]), "column_name": "Value", "error_message": f"Unplausibler Wert: Negativer Verbrauch ({float(values[pos])}) nicht erlaubt.", "original_value": _row_snippet(date_raw.iat[pos], value_raw.iat[pos])}))
+    for pos in np.flatnonzero(too_large):
+        error_rows.append((pos, {"row_csv": int(row_numbers[pos]), "column_name": "Value", "error_message": f"Unplausibler Wert: Verbrauch ({float(values[pos])}) überschreitet Maximum ({config.MAX_PLAUSIBLE_CONSUMPTION_VALUE}).", "original_value": _row_snippet(date_raw.iat[pos], value_raw.iat[pos])}))
+    error_rows.sort(key=lambda item: item[0])
+
+    non_numeric_valid = np.flatnonzero(non_numeric & valid)
+    if len(non_numeric_valid) > 0:
+        examples = [f"Zeile {int(row_numbers[pos])}: '{value_raw.iat[pos]}'" for pos in non_numeric_valid[:5]]
+        print(f"WARN (database.py): {len(non_numeric_valid)} Werte nicht numerisch, werden als NULL gespeichert (z.B. {', '.join(examples)}).")
+
+    date_strs = parsed_dates[valid].dt.strftime(ACTUALS_DATE_FORMAT).tolist()
+    valid_values = values[valid]
+    values_to_store = np.where(np.isnan(valid_values), None, valid_values).tolist()
+    return date_strs, values_to_store, [error for _, error in error_rows]
 
 def save_actual_to_db(actual_df: pd.DataFrame, container_id: str, source_file="uploaded_data.csv"):
     conn = None
     processed_count = 0
-    skipped_count = 0
     processing_errors = []
 
     print(f"INFO (database.py): Preparing to save {len(actual_df)} actual records for container '{container_id}' from {source_file}...")
@@ -92,64 +271,18 @@ def save_actual_to_db(actual_df: pd.DataFrame, container_id: str, source_file="u
         print(f"ERROR (database.py): {error_msg}")
         return processing_errors
 
-    records_to_insert = []
-    for df_index, row in actual_df.iterrows():
-        csv_row_number = df_index + 2
-        date_val_raw = row.get('Date')
-        value_val_raw = row.get('Value')
-        original_row_snippet = f"Date='{date_val_raw if not pd.isnull(date_val_raw) else 'N/A'}', Value='{value_val_raw if not pd.isnull(value_val_raw) else 'N/A'}'"
-
-        if pd.isnull(date_val_raw):
-            skipped_count += 1
-            error_msg = "Fehlender Wert für 'Date'."
-            processing_errors.append({ "row_csv": csv_row_number, "column_name": "Date", "error_message": error_msg, "original_value": original_row_snippet })
-            continue
-
-        try:
-            date_obj = pd.to_datetime(date_val_raw)
-            date_str = date_obj.strftime('%Y-%m-%dT%H:%M:%SZ')
-
-            value_to_store = None
-            if pd.notnull(value_val_raw) and str(value_val_raw).strip() != "": # Nur verarbeiten, wenn Wert nicht explizit NaN oder leer ist
-                current_value_str = str(value_val_raw).replace(',', '.')
-                try:
-                    value = float(current_value_str)
-                    if pd.isnull(value): # Falls Konvertierung zu float('nan') führt
-                         value_to_store = None
-                    elif value < 0:
-                        skipped_count += 1
-                        processing_errors.append({"row_csv": csv_row_number, "column_name": "Value", "error_message": f"Unplausibler Wert: Negativer Verbrauch ({value}) nicht erlaubt.", "original_value": original_row_snippet})
-                        continue # Diese Zeile überspringen
-                    elif value > config.MAX_PLAUSIBLE_CONSUMPTION_VALUE:
-                        skipped_count += 1
-                        processing_errors.append({"row_csv": csv_row_number, "column_name": "Value", "error_message": f"Unplausibler Wert: Verbrauch ({value}) überschreitet Maximum ({config.MAX_PLAUSIBLE_CONSUMPTION_VALUE}).", "original_value": original_row_snippet})
-                        continue # Diese Zeile überspringen
-                    else:
-                        value_to_store = value
-                except ValueError: # Wenn Konvertierung zu float fehlschlägt
-                    # Im neuen Workflow wollen wir diese Zeile trotzdem mit NULL für Value speichern,
-                    # wenn das Datum valide ist, damit sie später bereinigt werden kann.
-                    # Wenn ein nicht-konvertierbarer String ein harter Fehler sein soll, müsste hier `continue` stehen.
-                    print(f"WARN (database.py): Zeile {csv_row_number} - Wert '{value_val_raw}' nicht numerisch, wird als NULL gespeichert, falls Datum valide.")
-                    value_to_store = None
-
-            records_to_insert.append((container_id, date_str, value_to_store, source_file))
-        except ValueError as conversion_err: # Fehler bei Datums-Konvertierung
-            skipped_count += 1
-            processing_errors.append({ "row_csv": csv_row_number, "column_name": "Date", "error_message": f"Datums-Konvertierungsfehler: {str(conversion_err)}", "original_value": original_row_snippet })
-            continue # Ungültiges Datum -> Zeile überspringen
-        except Exception as e: # Andere unerwartete Fehler
-            skipped_count += 1
-            processing_errors.append({ "row_csv": csv_row_number, "column_name": "Unbekannt", "error_message": f"Unerwarteter Fehler: {str(e)}", "original_row_snippet": original_row_snippet })
-            continue # Zeile überspringen
+    date_strs, values_to_store, processing_errors = validate_actuals_frame(actual_df)
+    skipped_count = len(processing_errors)
+    records_to_insert = list(zip(repeat(container_id), date_strs, values_to_store, repeat(source_file)))
 
     if records_to_insert:
         try:
-            conn = sqlite3.connect(DB_FILE, timeout=10)
+            conn = get_connection()
             c = conn.cursor()
             # is_anomaly wird beim initialen Upload immer auf FALSE gesetzt
             c.executemany(''' INSERT OR REPLACE INTO actuals (container_id, date, value, source_file, is_anomaly)
                               VALUES (?, ?, ?, ?, FALSE) ''', records_to_insert)
+            _bump_container_data_version(c, container_id)
             conn.commit()
             processed_count = len(records_to_insert)
             print(f"INFO (database.py): Successfully processed and saved/replaced {processed_count} actual records for container '{container_id}'. Skipped: {skipped_count}.")
@@ -158,8 +291,6 @@ def save_actual_to_db(actual_df: pd.DataFrame, container_id: str, source_file="u
             if conn: conn.rollback()
             # Füge einen allgemeinen DB-Fehler hinzu, der im Frontend angezeigt werden kann
             processing_errors.append({ "row_csv": "Datenbank", "column_name": "Operation", "error_message": f"DB-Fehler: {str(e)}", "original_value": "Massen-Insert" })
-        finally:
-            if conn: conn.close()
     else:
         print(f"INFO (database.py): No valid records to insert for container '{container_id}'. Skipped: {skipped_count}.")
 
@@ -168,15 +299,27 @@ def save_actual_to_db(actual_df: pd.DataFrame, container_id: str, source_file="u
 
     return processing_errors
 
-def load_actuals(container_id: str) -> List[Tuple[str, float | None, bool]]:
-    print(f"DEBUG (database.py): load_actuals called for container_id: '{container_id}'")
+def load_actuals(container_id: str, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Tuple[str, float | None, bool]]:
+    """
+    Ist-Werte eines Containers, nach Datum sortiert. date_from/date_to (inklusive) im Format ACTUALS_DATE_FORMAT
+    grenzen den Zeitraum ein; da das Format lexikografisch sortierbar ist, läuft das als Bereichsscan über
+    den UNIQUE(container_id, date)-Index.
+    """
+    print(f"DEBUG (database.py): load_actuals called for container_id: '{container_id}' (from={date_from}, to={date_to})")
     conn = None
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        # row_factory, um sicherzustellen, dass None korrekt als None (und nicht z.B. als String 'None') behandelt wird
-        conn.row_factory = lambda cursor, row: (row[0], row[1] if row[1] is not None else None, bool(row[2]))
+        conn = get_connection()
         c = conn.cursor()
-        c.execute('SELECT date, value, is_anomaly FROM actuals WHERE container_id = ? ORDER BY date', (container_id,))
+        # row_factory, um sicherzustellen, dass None korrekt als None (und nicht z.B. als String 'None') behandelt wird
+        # (am Cursor, nicht an der geteilten Verbindung)
+        c.row_factory = lambda cursor, row: (row[0], row[1] if row[1] is not None else None, bool(row[2]))
+        query = 'SELECT date, value, is_anomaly FROM actuals WHERE container_id = ?'
+        params: List[Any] = [container_id]
+        if date_from is not None:
+            query += ' AND date >= ?'; params.append(date_from)
+        if date_to is not None:
+            query += ' AND date <= ?'; params.append(date_to)
+        c.execute(query + ' ORDER BY date', params)
         rows: List[Tuple[str, float | None, bool]] = c.fetchall() # Expliziter Typ-Hinweis
         print(f"DEBUG (database.py): SQL query for load_actuals executed. Found rows for '{container_id}': {len(rows)}")
         if rows:
@@ -185,8 +328,43 @@ def load_actuals(container_id: str) -> List[Tuple[str, float | None, bool]]:
     except sqlite3.Error as e:
         print(f"ERROR (database.py): SQLite error during load_actuals for '{container_id}': {e}")
         return []
-    finally:
-        if conn: conn.close()
+
+def load_actuals_bulk(container_ids: List[str]) -> Dict[str, List[Tuple[str, float | None, bool]]]:
+    """Lädt die Ist-Werte mehrerer Container in einer Abfrage (gleiches Zeilenformat wie load_actuals)."""
+    rows_by_container: Dict[str, List[Tuple[str, float | None, bool]]] = {container_id: [] for container_id in container_ids}
+    if not container_ids:
+        return rows_by_container
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        placeholders = ",".join("?" for _ in container_ids)
+        c.execute(f'SELECT container_id, date, value, is_anomaly FROM actuals WHERE container_id IN ({placeholders}) ORDER BY container_id, date', list(container_ids))
+        for container_id, date_str, value, is_anomaly in c:
+            rows_by_container[container_id].append((date_str, value, bool(is_anomaly)))
+        print(f"INFO (database.py): load_actuals_bulk loaded {sum(len(r) for r in rows_by_container.values())} rows for {len(container_ids)} containers.")
+        return rows_by_container
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during load_actuals_bulk: {e}")
+        return rows_by_container
+
+def _bump_container_data_version(c: sqlite3.Cursor, container_id: str) -> None:
+    """Erhöht meta['data_version:<container>'] innerhalb der laufenden Transaktion."""
+    c.execute(''' INSERT INTO meta (key, value) VALUES (?, 1)
+                  ON CONFLICT(key) DO UPDATE SET value = value + 1 ''', (f"data_version:{container_id}",))
+
+def get_container_data_version(container_id: str) -> int:
+    """Änderungszähler der Ist-Werte eines Containers (0, wenn noch nie geschrieben wurde)."""
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        c.execute("SELECT value FROM meta WHERE key = ?", (f"data_version:{container_id}",))
+        row = c.fetchone()
+        return row[0] if row else 0
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during get_container_data_version for '{container_id}': {e}")
+        return -1
 
 def update_anomaly_flags_in_db(container_id: str, df_with_anomalies: pd.DataFrame, date_col_name: str = 'ds'):
     conn = None
@@ -200,11 +378,7 @@ def update_anomaly_flags_in_db(container_id: str, df_with_anomalies: pd.DataFram
         return 0
 
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
-        c = conn.cursor()
-        print(f"INFO (database.py): Resetting all 'is_anomaly' flags for '{container_id}' to FALSE before update.")
-        c.execute("UPDATE actuals SET is_anomaly = FALSE WHERE container_id = ?", (container_id,))
-
+        # Datumswerte vor Beginn der Schreibtransaktion aufbereiten, damit Leser nicht unnötig lange warten.
         anomalies_to_mark_true = []
         if not df_with_anomalies.empty:
             for _, row in df_with_anomalies[df_with_anomalies['is_anomaly']].iterrows():
@@ -212,11 +386,17 @@ def update_anomaly_flags_in_db(container_id: str, df_with_anomalies: pd.DataFram
                 date_str_for_db = date_as_datetime.strftime('%Y-%m-%dT%H:%M:%SZ')
                 anomalies_to_mark_true.append((date_str_for_db, container_id))
 
+        conn = get_connection()
+        c = conn.cursor()
+        print(f"INFO (database.py): Resetting all 'is_anomaly' flags for '{container_id}' to FALSE before update.")
+        c.execute("UPDATE actuals SET is_anomaly = FALSE WHERE container_id = ?", (container_id,))
+
         if anomalies_to_mark_true:
             print(f"INFO (database.py): Marking {len(anomalies_to_mark_true)} data points for '{container_id}' as TRUE anomalies.")
             c.executemany("UPDATE actuals SET is_anomaly = TRUE WHERE date = ? AND container_id = ?", anomalies_to_mark_true)
             updated_anomaly_count = len(anomalies_to_mark_true)
 
+        _bump_container_data_version(c, container_id)
         conn.commit()
         print(f"INFO (database.py): Anomaly flags for '{container_id}' updated. {updated_anomaly_count} marked as anomaly (TRUE).")
         return updated_anomaly_count
@@ -224,21 +404,21 @@ def update_anomaly_flags_in_db(container_id: str, df_with_anomalies: pd.DataFram
         print(f"ERROR (database.py): SQLite error during update_anomaly_flags_in_db for '{container_id}': {e}")
         if conn: conn.rollback()
         return 0
-    finally:
-        if conn: conn.close()
 
 def update_single_data_point_anomaly_status(container_id: str, date_str_iso: str, new_is_anomaly_status: bool):
     conn = None
     updated_rows = 0
     print(f"INFO (database.py): Updating anomaly status for container '{container_id}', date '{date_str_iso}' to {new_is_anomaly_status}.")
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
+        conn = get_connection()
         c = conn.cursor()
         c.execute(''' UPDATE actuals SET is_anomaly = ?
                        WHERE container_id = ? AND date = ? ''',
                   (new_is_anomaly_status, container_id, date_str_iso))
-        conn.commit()
         updated_rows = c.rowcount
+        if updated_rows > 0:
+            _bump_container_data_version(c, container_id)
+        conn.commit()
         if updated_rows > 0:
             print(f"INFO (database.py): Successfully updated anomaly status for {updated_rows} record(s) for '{container_id}' on '{date_str_iso}'.")
         else:
@@ -248,8 +428,6 @@ def update_single_data_point_anomaly_status(container_id: str, date_str_iso: str
         print(f"ERROR (database.py): SQLite error during update_single_data_point_anomaly_status for '{container_id}', date '{date_str_iso}': {e}")
         if conn: conn.rollback()
         return 0
-    finally:
-        if conn: conn.close()
 
 def update_imputed_values_in_db(container_id: str, imputed_rows_data: List[Tuple[str, float]]):
     conn = None
@@ -263,12 +441,13 @@ def update_imputed_values_in_db(container_id: str, imputed_rows_data: List[Tuple
 
     print(f"INFO (database.py): Preparing to update {len(update_params)} imputed values for container '{container_id}'.")
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
+        conn = get_connection()
         c = conn.cursor()
         c.executemany(''' UPDATE actuals SET value = ?
                            WHERE container_id = ? AND date = ? ''', update_params)
-        conn.commit()
         updated_row_count = c.rowcount
+        _bump_container_data_version(c, container_id)
+        conn.commit()
 
         # SQLite gibt bei executemany oft -1 zurück, wenn die Anzahl der Zeilen nicht ermittelt werden kann
         # oder die Anzahl der tatsächlich ausgeführten Statements.
@@ -285,16 +464,90 @@ def update_imputed_values_in_db(container_id: str, imputed_rows_data: List[Tuple
         print(f"ERROR (database.py): SQLite error during update_imputed_values_in_db for '{container_id}': {e}")
         if conn: conn.rollback()
         return 0
-    finally:
-        if conn: conn.close()
 
 # --- NEW FUNCTIONS FOR CONTAINER MANAGEMENT ---
 
+# Prozessweite Container-Registry: Existenzprüfungen der API laufen gegen dieses Set statt gegen die DB.
+# add/update/delete_container halten es aktuell; Änderungen anderer Worker-Prozesse werden über den Zähler
+# meta.containers_version erkannt, der höchstens alle CONTAINER_REGISTRY_RECHECK_SECONDS abgefragt wird.
+_container_registry_lock = threading.Lock()
+_container_registry: Optional[set] = None # None = noch nicht geladen oder veraltet
+_container_registry_version = -1
+_container_registry_checked_at = 0.0
+
+def _read_containers_version(c: sqlite3.Cursor) -> int:
+    c.execute("SELECT value FROM meta WHERE key = 'containers_version'")
+    row = c.fetchone()
+    return row[0] if row else 0
+
+def _bump_containers_version(c: sqlite3.Cursor) -> Tuple[int, int]:
+    """Erhöht den Versionszähler innerhalb der laufenden Transaktion; gibt (alte, neue) Version zurück."""
+    old_version = _read_containers_version(c)
+    c.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('containers_version', ?)", (old_version + 1,))
+    return old_version, old_version + 1
+
+def _apply_registry_change(old_version: int, new_version: int, added: Optional[str] = None, removed: Optional[str] = None):
+    """Übernimmt eine eigene, bereits committete Änderung. Hat zwischendurch ein anderer Prozess geschrieben, wird neu geladen."""
+    global _container_registry, _container_registry_version
+    with _container_registry_lock:
+        if _container_registry is None or _container_registry_version != old_version:
+            _container_registry = None
+            return
+        if removed is not None: _container_registry.discard(removed)
+        if added is not None: _container_registry.add(added)
+        _container_registry_version = new_version
+
+def refresh_container_registry() -> None:
+    """Lädt alle Containernamen und den Versionszähler in einem Lesevorgang neu."""
+    global _container_registry, _container_registry_version, _container_registry_checked_at
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        version = _read_containers_version(c)
+        c.execute('SELECT name FROM containers')
+        names = {row[0] for row in c.fetchall()}
+        with _container_registry_lock:
+            _container_registry = names
+            _container_registry_version = version
+            _container_registry_checked_at = time.monotonic()
+        print(f"INFO (database.py): Container registry loaded ({len(names)} containers, version {version}).")
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during refresh_container_registry: {e}")
+
+def _container_registry_is_current() -> bool:
+    global _container_registry_checked_at
+    with _container_registry_lock:
+        if _container_registry is None:
+            return False
+        if time.monotonic() - _container_registry_checked_at < config.CONTAINER_REGISTRY_RECHECK_SECONDS:
+            return True
+        known_version = _container_registry_version
+    conn = None
+    try:
+        conn = get_connection()
+        current_version = _read_containers_version(conn.cursor())
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error while checking containers_version: {e}")
+        return True # Mit dem bekannten Stand weiterarbeiten
+    if current_version != known_version:
+        return False
+    with _container_registry_lock:
+        _container_registry_checked_at = time.monotonic()
+    return True
+
+def container_exists(name: str) -> bool:
+    """O(1)-Existenzprüfung gegen die prozessweite Registry (lädt sie bei Bedarf nach)."""
+    if not _container_registry_is_current():
+        refresh_container_registry()
+    with _container_registry_lock:
+        return _container_registry is not None and name in _container_registry
+
 def get_containers() -> List[str]:
     """Loads all container names from the database."""
     conn = None
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
+        conn = get_connection()
         c = conn.cursor()
         c.execute('SELECT name FROM containers ORDER BY name')
         # fetchall() gibt eine Liste von Tupeln zurück, z.B. [('Container1',), ('Container2',)]
@@ -305,14 +558,12 @@ def get_containers() -> List[str]:
     except sqlite3.Error as e:
         print(f"ERROR (database.py): SQLite error during get_containers: {e}")
         return []
-    finally:
-        if conn: conn.close()
 
 def add_container(name: str, description: Optional[str] = None) -> bool:
     """Adds a new container to the database."""
     conn = None
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
+        conn = get_connection()
         c = conn.cursor()
         # Check if container already exists
         c.execute('SELECT COUNT(*) FROM containers WHERE name = ?', (name,))
@@ -320,24 +571,25 @@ def add_container(name: str, description: Optional[str] = None) -> bool:
             print(f"WARN (database.py): Container '{name}' already exists.")
             return False # Indicate that it already exists
         c.execute('INSERT INTO containers (name, description) VALUES (?, ?)', (name, description))
+        old_version, new_version = _bump_containers_version(c)
         conn.commit()
+        _apply_registry_change(old_version, new_version, added=name)
         print(f"INFO (database.py): Container '{name}' added to database.")
         return True
     except sqlite3.IntegrityError: # Specifically for UNIQUE constraint violation
         print(f"WARN (database.py): Container '{name}' already exists (IntegrityError).")
+        if conn: conn.rollback()
         return False
     except sqlite3.Error as e:
         print(f"ERROR (database.py): SQLite error during add_container: {e}")
         if conn: conn.rollback()
         return False
-    finally:
-        if conn: conn.close()
 
 def update_container_name(old_name: str, new_name: str) -> bool:
     """Updates the name of an existing container and updates related actuals."""
     conn = None
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
+        conn = get_connection()
         c = conn.cursor()
         # Start transaction
         conn.execute("BEGIN TRANSACTION")
@@ -364,21 +616,23 @@ def update_container_name(old_name: str, new_name: str) -> bool:
         c.execute('UPDATE forecasts SET container_id = ? WHERE container_id = ?', (new_name, old_name))
         print(f"INFO (database.py): Updated {c.rowcount} forecasts for container '{old_name}' to '{new_name}'.")
 
+        old_version, new_version = _bump_containers_version(c)
+        _bump_container_data_version(c, old_name)
+        _bump_container_data_version(c, new_name)
         conn.commit()
+        _apply_registry_change(old_version, new_version, added=new_name, removed=old_name)
         print(f"INFO (database.py): Container '{old_name}' successfully renamed to '{new_name}' and related records updated.")
         return True
     except sqlite3.Error as e:
         print(f"ERROR (database.py): SQLite error during update_container_name: {e}")
         if conn: conn.rollback()
         return False
-    finally:
-        if conn: conn.close()
 
 def delete_container(name: str) -> bool:
     """Deletes a container and all its associated actuals and forecasts."""
     conn = None
     try:
-        conn = sqlite3.connect(DB_FILE, timeout=10)
+        conn = get_connection()
         c = conn.cursor()
         # Start transaction
         conn.execute("BEGIN TRANSACTION")
@@ -402,19 +656,185 @@ def delete_container(name: str) -> bool:
             print(f"WARN (database.py): Container '{name}' not found for deletion in containers table.")
             return False
 
+        old_version, new_version = _bump_containers_version(c)
+        _bump_container_data_version(c, name) # Nicht löschen: ein neuer Container gleichen Namens begänne sonst wieder bei 0
         conn.commit()
+        _apply_registry_change(old_version, new_version, removed=name)
         print(f"INFO (database.py): Container '{name}' and its related data successfully deleted.")
         return True
     except sqlite3.Error as e:
         print(f"ERROR (database.py): SQLite error during delete_container: {e}")
         if conn: conn.rollback()
         return False
-    finally:
-        if conn: conn.close()
-
-def save_forecast_to_db(*args, **kwargs):
-    # print("WARN: save_forecast_to_db (dummy) called") # Auskommentiert für weniger Logs
-    pass
-def load_forecasts(*args, **kwargs):
-    # print("WARN: load_forecasts (dummy) called") # Auskommentiert für weniger Logs
-    return []
\ No newline at end of file
+
+def save_forecast_to_db(container_id: str, model_name: str, forecast_rows: List[Tuple[str, float]], forecast_date: Optional[str] = None) -> int:
+    """
+    Speichert eine Prognose (Liste aus (target_date, forecast_value)) in einem Bulk-Insert.
+    forecast_date ist der Ausstellungstag im Format 'YYYY-MM-DDT00:00:00Z'; eine erneute Prognose am selben Tag ersetzt
+    die alte vollständig (auch wenn sie kürzer ist). model_name enthält die Variante (forecast_service.stored_model_name).
+    """
+    if not forecast_rows:
+        return 0
+    if forecast_date is None:
+        forecast_date = pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%dT00:00:00Z')
+
+    records_to_insert = [(container_id, model_name, forecast_date, target_date, float(value))
+                         for target_date, value in forecast_rows if value is not None and not pd.isnull(value)]
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        # DELETE und INSERT in derselben Transaktion: Leser sehen nie eine Mischung aus zwei Läufen.
+        c.execute('DELETE FROM forecasts WHERE container_id = ? AND model_name = ? AND forecast_date = ?', (container_id, model_name, forecast_date))
+        c.executemany(''' INSERT INTO forecasts (container_id, model_name, forecast_date, target_date, forecast_value)
+                          VALUES (?, ?, ?, ?, ?) ''', records_to_insert)
+        conn.commit()
+        print(f"INFO (database.py): Saved {len(records_to_insert)} forecast values for container '{container_id}' ({model_name}, issued {forecast_date}).")
+        return len(records_to_insert)
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during save_forecast_to_db for '{container_id}': {e}")
+        if conn: conn.rollback()
+        return 0
+
+def load_forecasts(container_id: str, model_name: str, forecast_date: Optional[str] = None) -> List[Tuple[str, str, float]]:
+    """
+    Lädt eine gespeicherte Prognose als Liste aus (forecast_date, target_date, forecast_value).
+    Ohne forecast_date wird die zuletzt ausgestellte Prognose geliefert.
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        if forecast_date is None:
+            c.execute('SELECT MAX(forecast_date) FROM forecasts WHERE container_id = ? AND model_name = ?', (container_id, model_name))
+            forecast_date = c.fetchone()[0]
+            if forecast_date is None:
+                return []
+        c.execute(''' SELECT forecast_date, target_date, forecast_value FROM forecasts
+                      WHERE container_id = ? AND model_name = ? AND forecast_date = ?
+                      ORDER BY target_date ''', (container_id, model_name, forecast_date))
+        return c.fetchall()
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during load_forecasts for '{container_id}': {e}")
+        return []
+
+def load_forecast_vs_actual(container_id: str, model_name: Optional[str] = None) -> List[Tuple[str, str, str, float, float | None]]:
+    """
+    Prognose vs. Ist-Wert in einer Abfrage: je (Modell, Zieldatum) die zuletzt ausgestellte Prognose,
+    verbunden mit dem Ist-Wert aus 'actuals' (NULL, falls es noch keinen gibt).
+    Liefert (model_name, target_date, forecast_date, forecast_value, actual_value).
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        c.execute(''' SELECT model_name, target_date, forecast_date, forecast_value, actual_value FROM (
+                          SELECT f.model_name, f.target_date, f.forecast_date, f.forecast_value, a.value AS actual_value,
+                                 ROW_NUMBER() OVER (PARTITION BY f.model_name, f.target_date ORDER BY f.forecast_date DESC) AS rn
+                          FROM forecasts f
+                          LEFT JOIN actuals a ON a.container_id = f.container_id AND a.date = f.target_date
+                          WHERE f.container_id = ? AND (? IS NULL OR f.model_name = ?)
+                      ) WHERE rn = 1
+                      ORDER BY model_name, target_date ''', (container_id, model_name, model_name))
+        return c.fetchall()
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during load_forecast_vs_actual for '{container_id}': {e}")
+        return []
+
+# --- Job-Status (siehe forecast_jobs.py) ---
+# Der einreichende Prozess legt den Job an und schreibt das Ergebnis, der Pool-Worker setzt 'running'.
+# Abfragen (load_job) funktionieren damit aus jedem uvicorn-Worker-Prozess.
+def insert_job(job_id: str, kind: str, description: Dict[str, Any], submitted_at: str) -> bool:
+    conn = None
+    try:
+        conn = get_connection()
+        conn.execute(''' INSERT INTO jobs (job_id, kind, description, status, submitted_at)
+                         VALUES (?, ?, ?, 'queued', ?) ''', (job_id, kind, json.dumps(description, default=str), submitted_at))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during insert_job for '{job_id}': {e}")
+        if conn: conn.rollback()
+        return False
+
+def mark_job_started(job_id: str, started_at: str) -> bool:
+    """Setzt 'running', aber nur aus 'queued' heraus (ein bereits abgeschlossener Job wird nicht zurückgesetzt)."""
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        c.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE job_id = ? AND status = 'queued'", (started_at, job_id))
+        conn.commit()
+        return c.rowcount > 0
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during mark_job_started for '{job_id}': {e}")
+        if conn: conn.rollback()
+        return False
+
+def finish_job(job_id: str, status: str, finished_at: str, result_json: Optional[str] = None, error: Optional[str] = None,
+               error_status_code: Optional[int] = None) -> bool:
+    """
+    Schreibt den Endzustand (completed | failed | cancelled) samt Ergebnis bzw. Fehler. Das Ergebnis kommt bereits
+    als JSON-Text (serialization.dumps_json_text) und wird nie gepickelt: load_job entpickelt nichts aus der Datei.
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        conn.execute(''' UPDATE jobs SET status = ?, finished_at = ?, finished_ts = ?, result = ?, error = ?, error_status_code = ?
+                         WHERE job_id = ? ''', (status, finished_at, time.time(), result_json, error, error_status_code, job_id))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during finish_job for '{job_id}': {e}")
+        if conn: conn.rollback()
+        return False
+
+def load_job(job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+    """Job als dict (Felder wie forecast_jobs.get_job) oder None, wenn er unbekannt bzw. schon gelöscht ist."""
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        c.execute(f''' SELECT job_id, kind, description, status, submitted_at, started_at, finished_at,
+                              {'result' if include_result else 'NULL'}, error, error_status_code
+                       FROM jobs WHERE job_id = ? ''', (job_id,))
+        row = c.fetchone()
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during load_job for '{job_id}': {e}")
+        return None
+    if row is None:
+        return None
+    job = {
+        "job_id": row[0], "kind": row[1], "description": json.loads(row[2]) if row[2] else {}, "status": row[3],
+        "submitted_at": row[4], "started_at": row[5], "finished_at": row[6],
+    }
+    if row[3] == 'completed' and include_result:
+        job["result"] = json.loads(row[7]) if row[7] is not None else None
+    elif row[3] == 'failed':
+        job["error"] = row[8]
+        job["error_status_code"] = row[9]
+    return job
+
+def count_jobs_by_status() -> Dict[str, int]:
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        c.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status')
+        return dict(c.fetchall())
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during count_jobs_by_status: {e}")
+        return {}
+
+def delete_jobs_finished_before(finished_ts: float) -> int:
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        c.execute('DELETE FROM jobs WHERE finished_ts IS NOT NULL AND finished_ts < ?', (finished_ts,))
+        conn.commit()
+        return c.rowcount
+    except sqlite3.Error as e:
+        print(f"ERROR (database.py): SQLite error during delete_jobs_finished_before: {e}")
+        if conn: conn.rollback()
+        return 0
@@ -0,0 +1,72 @@
+# src/downsampling.py
+# Formerhaltendes Ausdünnen von Zeitreihen für Diagramme (serverseitig, damit die Payload begrenzt bleibt).
+import numpy as np
+from typing import List, Tuple # Für Typ-Annotationen
+
+DOWNSAMPLING_METHODS = ['lttb', 'minmax']
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: wählt n_out Punkte (erster und letzter bleiben erhalten), je Bucket den Punkt,
+    der mit dem zuletzt gewählten Punkt und dem Mittel des nächsten Buckets die größte Dreiecksfläche bildet.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 1)]
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64) # n_out-2 Buckets zwischen erstem und letztem Punkt
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (end, edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Teilt die Reihe in n_out/2 Buckets und behält je Bucket Minimum und Maximum (Spitzen bleiben sichtbar)."""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    n_buckets = max(n_out // 2, 1)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        bucket = y[start:end]
+        selected.append(start + int(np.argmin(bucket)))
+        selected.append(start + int(np.argmax(bucket)))
+    return np.unique(np.array(selected, dtype=np.int64))
+
+
+def downsample_actuals(rows: List[Tuple[str, float | None, bool]], max_points: int, method: str = 'lttb') -> List[Tuple[str, float | None, bool]]:
+    """
+    Dünnt Zeilen aus load_actuals (Datum, Wert, Anomalie-Flag) auf höchstens max_points aus.
+    Zeilen ohne Wert haben keine Form und werden beim Ausdünnen nicht berücksichtigt.
+    """
+    if len(rows) <= max_points:
+        return rows
+    valued = [row for row in rows if row[1] is not None]
+    if len(valued) <= max_points:
+        return valued
+    y = np.fromiter((row[1] for row in valued), dtype=np.float64, count=len(valued))
+    if method == 'minmax':
+        indices = minmax_indices(y, max_points)
+    elif method == 'lttb':
+        # Sekunden seit Epoche als x-Achse, damit unregelmäßige Abstände korrekt gewichtet werden.
+        x = np.array([row[0][:19] for row in valued], dtype='datetime64[s]').astype(np.float64)
+        indices = lttb_indices(x, y, max_points)
+    else:
+        raise ValueError(f"Unbekannte Downsampling-Methode '{method}'. Erlaubt: {DOWNSAMPLING_METHODS}")
+    return [valued[i] for i in indices]
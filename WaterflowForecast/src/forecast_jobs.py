@@ -0,0 +1,240 @@
+# src/forecast_jobs.py
+import uuid
+import time
+import threading
+import traceback
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Callable
+from src import config
+from src.database import insert_job, mark_job_started, finish_job, load_job, count_jobs_by_status, delete_jobs_finished_before
+from src.serialization import forecast_payload_to_records, dumps_json_text
+
+# Prozess-Pool für Modell-Fits. Prophet (cmdstanpy) und TensorFlow blockieren die CPU für Sekunden bis
+# Minuten; im Event-Loop von uvicorn würden sie alle anderen Requests anhalten.
+# 'spawn' statt 'fork', weil TensorFlow und SQLite-Verbindungen nach einem fork nicht sicher sind.
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Jobs dieses Prozesses (mit Future für das Ergebnis). Der Status ist zusätzlich in der Tabelle 'jobs' gespeichert,
+# damit ihn auch andere uvicorn-Worker-Prozesse abfragen können (siehe get_job).
+_jobs: Dict[str, Dict[str, Any]] = {}
+_jobs_lock = threading.Lock()
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _initialize_worker():
+    """Läuft einmal pro Worker-Prozess: Modell-Backends laut config.PREWARM_MODEL_BACKENDS im Hintergrund importieren."""
+    from src.model_backends import prewarm
+    prewarm(config.PREWARM_MODEL_BACKENDS)
+
+
+def _noop():
+    return None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            print(f"INFO (forecast_jobs.py): Starting process pool with {config.FORECAST_JOB_WORKERS} worker(s).")
+            _executor = ProcessPoolExecutor(
+                max_workers=config.FORECAST_JOB_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_initialize_worker
+            )
+        return _executor
+
+
+def start_workers():
+    """Startet die Worker-Prozesse vorab (sonst erst beim ersten Job), damit sie ihre Backends schon vorladen können."""
+    executor = get_executor()
+    for _ in range(config.FORECAST_JOB_WORKERS):
+        executor.submit(_noop)
+
+
+def _reset_broken_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    print("WARN (forecast_jobs.py): Process pool was broken and has been reset.")
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            print("INFO (forecast_jobs.py): Shutting down process pool.")
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def prune_finished_jobs():
+    """
+    Entfernt abgeschlossene Jobs, deren Ergebnis älter als FORECAST_JOB_RETENTION_SECONDS ist (Speicher und Tabelle 'jobs').
+    Läuft periodisch im Hintergrund (api.py, alle FORECAST_JOB_PRUNE_INTERVAL_SECONDS), nicht bei jedem Einreichen.
+    """
+    cutoff = time.time() - config.FORECAST_JOB_RETENTION_SECONDS
+    with _jobs_lock:
+        expired = [job_id for job_id, job in _jobs.items() if job["finished_ts"] is not None and job["finished_ts"] < cutoff]
+        for job_id in expired:
+            del _jobs[job_id]
+    deleted = delete_jobs_finished_before(cutoff)
+    if expired or deleted:
+        print(f"INFO (forecast_jobs.py): Pruned {max(len(expired), deleted)} finished job(s).")
+
+
+def _run_job(job_id: str, fn: Callable, *args, **kwargs):
+    """Läuft im Worker: markiert den Job erst dann als 'running', wenn er dort tatsächlich beginnt."""
+    mark_job_started(job_id, _utc_now_iso())
+    return fn(*args, **kwargs)
+
+
+def _on_job_done(job_id: str, future: Future):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        job["finished_at"] = _utc_now_iso()
+        job["finished_ts"] = time.time()
+        finished_at = job["finished_at"]
+    if future.cancelled():
+        finish_job(job_id, "cancelled", finished_at)
+        return
+    error = future.exception()
+    if error is None:
+        try:
+            result_json = dumps_json_text(forecast_payload_to_records(future.result()))
+        except TypeError as e: # auch orjson.JSONEncodeError
+            print(f"ERROR (forecast_jobs.py): Result of job '{job_id}' is not JSON-serializable: {e}")
+            finish_job(job_id, "failed", finished_at, error=f"Ergebnis konnte nicht gespeichert werden: {e}", error_status_code=500)
+            return
+        finish_job(job_id, "completed", finished_at, result_json=result_json)
+        return
+    finish_job(job_id, "failed", finished_at, error=str(getattr(error, "detail", error)), error_status_code=getattr(error, "status_code", 500))
+    if not hasattr(error, "status_code"):
+        print(f"ERROR (forecast_jobs.py): Job '{job_id}' failed: {error}")
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+
+def submit_task(fn: Callable, *args, **kwargs) -> Future:
+    """
+    Reicht fn(*args, **kwargs) im Prozess-Pool ein, ohne einen Job anzulegen: Teilaufgaben eines Jobs (z.B. Backtests)
+    und synchrone Prognosen, auf deren Future der Request direkt wartet.
+    """
+    try:
+        return get_executor().submit(fn, *args, **kwargs)
+    except BrokenProcessPool:
+        _reset_broken_executor()
+        return get_executor().submit(fn, *args, **kwargs)
+
+
+def submit_job(kind: str, fn: Callable, *args, description: Optional[Dict[str, Any]] = None, **kwargs) -> str:
+    """Reicht fn(*args, **kwargs) im Prozess-Pool ein und gibt sofort die Job-ID zurück."""
+    job = _create_job(kind, description)
+    try:
+        future = submit_task(_run_job, job["job_id"], fn, *args, **kwargs)
+    except Exception as e:
+        finish_job(job["job_id"], "failed", _utc_now_iso(), error=str(e), error_status_code=500)
+        raise
+    return _register_job(job, future)
+
+
+def submit_coordinator_job(kind: str, fn: Callable, *args, description: Optional[Dict[str, Any]] = None, **kwargs) -> str:
+    """
+    Wie submit_job, aber fn läuft in einem Thread des API-Prozesses. Für Jobs, die selbst nur koordinieren und ihre
+    Teilaufgaben über submit_task auf den Pool verteilen; ein Pool-Worker würde sonst nur warten und einen Platz blockieren.
+    """
+    job = _create_job(kind, description)
+    job_id = job["job_id"]
+    future: Future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(_run_job(job_id, fn, *args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    _register_job(job, future)
+    threading.Thread(target=run, name=f"job-{job_id[:8]}", daemon=True).start()
+    return job_id
+
+
+def _create_job(kind: str, description: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Legt den Job in der Tabelle 'jobs' an, bevor er eingereicht wird (sonst könnte der Worker ihn vorher starten)."""
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "kind": kind,
+        "description": description or {},
+        "submitted_at": _utc_now_iso(),
+        "finished_at": None,
+        "finished_ts": None,
+    }
+    insert_job(job["job_id"], kind, job["description"], job["submitted_at"])
+    return job
+
+
+def _register_job(job: Dict[str, Any], future: Future) -> str:
+    job_id = job["job_id"]
+    with _jobs_lock:
+        _jobs[job_id] = dict(job, future=future)
+    future.add_done_callback(lambda f, job_id=job_id: _on_job_done(job_id, f))
+    print(f"INFO (forecast_jobs.py): Job '{job_id}' ({job['kind']}) submitted.")
+    return job_id
+
+
+def get_job_future(job_id: str) -> Optional[Future]:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return job["future"] if job else None
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Status-Snapshot eines Jobs: queued | running | completed | failed | cancelled (inkl. Ergebnis bzw. Fehler).
+    Jobs anderer API-Prozesse (mehrere uvicorn-Worker) kommen aus der Tabelle 'jobs'. 'running' stammt immer aus
+    der Tabelle: future.running() ist bei ProcessPoolExecutor schon für vorab an den Pool übergebene Aufrufe wahr.
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        job = dict(job) if job is not None else None
+    if job is None:
+        return load_job(job_id)
+
+    future: Future = job.pop("future")
+    job.pop("finished_ts", None)
+    stored = load_job(job_id, include_result=False)
+    job["started_at"] = stored["started_at"] if stored is not None else None
+    if future.cancelled():
+        job["status"] = "cancelled"
+    elif not future.done():
+        job["status"] = "running" if job["started_at"] is not None else "queued"
+    else:
+        error = future.exception()
+        if error is None:
+            job["status"] = "completed"
+            job["result"] = future.result()
+        else:
+            job["status"] = "failed"
+            job["error"] = str(getattr(error, "detail", error))
+            job["error_status_code"] = getattr(error, "status_code", 500)
+    return job
+
+
+def get_job_counts() -> Dict[str, int]:
+    """Jobs aller API-Prozesse nach Status (aus der Tabelle 'jobs')."""
+    by_status = count_jobs_by_status()
+    return {
+        "queued": by_status.get("queued", 0),
+        "running": by_status.get("running", 0),
+        "finished": sum(count for status, count in by_status.items() if status not in ("queued", "running")),
+    }
@@ -0,0 +1,278 @@
+# src/forecast_service.py
+import pandas as pd
+import numpy as np
+from typing import Dict, Any, List, Tuple, Optional # Für Typ-Annotationen
+from src import config
+from src.database import load_actuals, load_actuals_bulk, get_containers, save_forecast_to_db, get_container_data_version
+from src.data_loader import add_features
+from src.lstm_inference import forecast_with_numpy_lstm # TF-frei; tf_keras_model wird erst zum Trainieren importiert
+from src.model_backends import get_backend # Prophet/TensorFlow erst bei der ersten Nutzung importieren
+from src.model_cache import make_cache_key, model_cache
+from src.global_lstm import forecast_with_global_lstm, skipped_in_training, train_and_store_global_model
+
+PERIODS_MAP = {'1d': 1, '7d': 7, '30d': 30, '90d': 90}
+SUPPORTED_MODELS = ['prophet', 'tensorflow', 'tensorflow_global']
+
+
+class ForecastRequestError(Exception):
+    """Fachlicher Fehler der Prognose-Pipeline, den api.py als HTTPException (status_code/detail) weitergibt."""
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def stored_model_name(model_choice: str, lstm_mode: Optional[str] = None, prophet_train_with_anomalies: bool = False) -> str:
+    """
+    model_name in der Tabelle 'forecasts': Modell plus Variante, damit sich z.B. rekursive und direkte LSTM-Prognosen
+    nicht gegenseitig ersetzen. Prophet ohne Anomalien und das rekursive LSTM behalten den bloßen Modellnamen
+    (so wie bereits gespeicherte Prognosen).
+    """
+    if model_choice == 'prophet':
+        return f"{model_choice}[with_anomalies]" if prophet_train_with_anomalies else model_choice
+    if (lstm_mode or config.LSTM_FORECAST_MODE) == 'direct':
+        return f"{model_choice}[direct]"
+    return model_choice
+
+
+def history_frame_from_rows(historical_rows: List[Tuple[str, float | None, bool]]) -> pd.DataFrame:
+    """Zeilen aus load_actuals -> nach Datum sortierter DataFrame (Datum ohne Zeitzone, Zielwert mit NaN für fehlende Werte, is_anomaly)."""
+    history_df_raw = pd.DataFrame(historical_rows, columns=[config.DATE_COLUMN, config.TARGET_COLUMN, 'is_anomaly'])
+    history_df_raw[config.DATE_COLUMN] = pd.to_datetime(history_df_raw[config.DATE_COLUMN])
+    history_df_raw[config.TARGET_COLUMN] = pd.to_numeric(history_df_raw[config.TARGET_COLUMN], errors='coerce')
+    history_df_raw['is_anomaly'] = history_df_raw['is_anomaly'].astype(bool)
+    if history_df_raw[config.DATE_COLUMN].dt.tz is not None:
+        history_df_raw[config.DATE_COLUMN] = history_df_raw[config.DATE_COLUMN].dt.tz_localize(None)
+    return history_df_raw.sort_values(by=config.DATE_COLUMN).reset_index(drop=True)
+
+
+def build_features_from_history(container_id: str, history_df_raw: pd.DataFrame, model_choice: str,
+                                prophet_train_with_anomalies: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Historie aus history_frame_from_rows -> bereinigte Historie mit allen Features (Eingabe für Prophet und LSTM).
+    Fehlende Zielwerte werden nur aus dieser Historie gefüllt (ffill/bfill); das Backtesting übergibt deshalb je Cutoff
+    nur die Zeilen bis zum Cutoff. None, wenn nach der Anomalieentfernung keine Datenpunkte übrig bleiben.
+    """
+    history_df_raw = history_df_raw.copy()
+    if history_df_raw[config.TARGET_COLUMN].isnull().any():
+        print(f"WARNING (forecast_service.py): Zielspalte '{config.TARGET_COLUMN}' für '{container_id}' enthält {history_df_raw[config.TARGET_COLUMN].isnull().sum()} NaNs. Fülle mit ffill/bfill vor Modelltraining.")
+        history_df_raw[config.TARGET_COLUMN] = history_df_raw[config.TARGET_COLUMN].ffill().bfill()
+        if history_df_raw[config.TARGET_COLUMN].isnull().any():
+            print(f"WARNUNG (forecast_service.py): Zielspalte '{config.TARGET_COLUMN}' enthält immer noch NaNs nach ffill/bfill. Fülle mit 0 für Modell '{model_choice}'.")
+            history_df_raw[config.TARGET_COLUMN] = history_df_raw[config.TARGET_COLUMN].fillna(0)
+
+    print(f"INFO (forecast_service.py): Rohdaten für '{container_id}' (nach initialer NaN-Füllung der Zielspalte): {len(history_df_raw)} Zeilen.")
+
+    if model_choice == 'prophet' and prophet_train_with_anomalies:
+        history_df_for_feature_eng = history_df_raw.copy()
+        print(f"INFO (forecast_service.py): Prophet wird MIT Anomalien (gemäß Payload-Option) für '{container_id}' trainiert. Daten für Feature Engineering: {len(history_df_for_feature_eng)} Zeilen.")
+    else:
+        history_df_for_feature_eng = history_df_raw[~history_df_raw['is_anomaly']].copy()
+        removed_count = len(history_df_raw) - len(history_df_for_feature_eng)
+        print(f"INFO (forecast_service.py): {removed_count} Anomalien basierend auf DB-Flag entfernt. Daten für Feature Engineering: {len(history_df_for_feature_eng)} Zeilen.")
+
+    if 'is_anomaly' in history_df_for_feature_eng.columns:
+        history_df_for_feature_eng = history_df_for_feature_eng.drop(columns=['is_anomaly'])
+
+    if history_df_for_feature_eng.empty:
+        return None
+
+    history_df_indexed = history_df_for_feature_eng.set_index(config.DATE_COLUMN)
+    history_df_model_input, _, _ = add_features(
+        history_df_indexed.copy(), target_column=config.TARGET_COLUMN, include_lag_rolling=True
+    )
+    history_df_model_input = history_df_model_input.reset_index()
+    return history_df_model_input
+
+
+def build_model_input(container_id: str, historical_rows: List[Tuple[str, float | None, bool]], model_choice: str,
+                      prophet_train_with_anomalies: bool = False) -> Optional[pd.DataFrame]:
+    """
+    Zeilen aus load_actuals -> bereinigte Historie mit allen Features (Eingabe für Prophet und LSTM).
+    None, wenn nach der Anomalieentfernung keine Datenpunkte übrig bleiben.
+    """
+    return build_features_from_history(container_id, history_frame_from_rows(historical_rows), model_choice, prophet_train_with_anomalies)
+
+
+def build_future_regressors(last_history_date: pd.Timestamp, periods: int) -> pd.DataFrame:
+    """Datums-Features für die `periods` Tage nach last_history_date (Prophet-Regressoren; ohne Lag/Rolling-Features)."""
+    future_dates = pd.date_range(start=last_history_date + pd.Timedelta(days=1), periods=periods, freq='D')
+    future_regressors_df_base = pd.DataFrame({config.DATE_COLUMN: future_dates}).set_index(config.DATE_COLUMN)
+    future_regressors_df_with_features, _, _ = add_features(
+        future_regressors_df_base, target_column=config.TARGET_COLUMN, include_lag_rolling=False
+    )
+    return future_regressors_df_with_features.reset_index()
+
+
+def run_forecast(container_id: str, duration: str, model_choice: str, prophet_train_with_anomalies: bool = False,
+                 historical_rows: Optional[List[Tuple[str, float | None, bool]]] = None, lstm_mode: Optional[str] = None,
+                 include_history: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Lädt die Ist-Werte eines Containers, trainiert das gewählte Modell und liefert den Response-Payload
+    für /api/generate_forecast/. Läuft synchron und ist deshalb für die Ausführung im Prozess-Pool
+    (src/forecast_jobs.py) gedacht, nicht im Event-Loop von uvicorn.
+    historical_rows kann vorab geladen übergeben werden (Batch-Prognosen), sonst wird load_actuals aufgerufen.
+    lstm_mode ('recursive'/'direct') überschreibt config.LSTM_FORECAST_MODE für model_choice='tensorflow' und 'tensorflow_global'.
+    include_history (nur Prophet, None = config.PROPHET_PREDICT_INCLUDE_HISTORY) liefert vor den Prognosetagen den
+    In-Sample-Fit über die Historie (history_rows im Payload); gespeichert werden weiterhin nur die Prognosetage.
+    """
+    lstm_mode = lstm_mode or config.LSTM_FORECAST_MODE
+    if include_history is None:
+        include_history = config.PROPHET_PREDICT_INCLUDE_HISTORY
+    include_history = bool(include_history) and model_choice == 'prophet'
+    if lstm_mode not in config.LSTM_FORECAST_MODES:
+        raise ForecastRequestError(400, f"Ungültiger LSTM-Modus: '{lstm_mode}'. Erlaubt: {config.LSTM_FORECAST_MODES}")
+    model_cache.sync_container(container_id, get_container_data_version(container_id))
+    if historical_rows is None:
+        historical_rows = load_actuals(container_id)
+    if not historical_rows:
+        raise ForecastRequestError(404, f"Keine historischen Daten für Container '{container_id}' gefunden, um eine Prognose zu erstellen.")
+
+    history_df_model_input = build_model_input(container_id, historical_rows, model_choice, prophet_train_with_anomalies)
+    if history_df_model_input is None:
+        detail_message = f"Keine gültigen Datenpunkte für die Prognose für Container '{container_id}' nach der optionalen Anomalieentfernung vorhanden."
+        print(f"WARN (forecast_service.py): {detail_message}")
+        return {"forecast_data": [], "message": detail_message}
+
+    min_data_prophet = 2; min_data_tf = config.LSTM_LOOK_BACK + (config.LSTM_DIRECT_HORIZON if lstm_mode == 'direct' else 1)
+    data_length_check = len(history_df_model_input); min_data_required = 0
+    if model_choice == 'prophet':
+        min_data_required = min_data_prophet
+        data_length_check = history_df_model_input[config.TARGET_COLUMN].notna().sum()
+    elif model_choice == 'tensorflow': min_data_required = min_data_tf
+    elif model_choice == 'tensorflow_global': min_data_required = min_data_tf # Wie im Training, sonst steht der Container dort in containers_skipped
+    else: min_data_required = 2
+
+    if data_length_check < min_data_required and model_choice == 'tensorflow_global':
+        raise ForecastRequestError(422, f"Zu wenig Historie ({data_length_check} Datenpunkte) für das globale LSTM im Modus '{lstm_mode}': "
+                                        f"benötigt werden {min_data_required} (look_back + Horizont). Kürzere Container überspringt das Training "
+                                        f"(containers_skipped im Trainingsbericht), ein erneutes Training hilft erst mit mehr Daten.")
+    if data_length_check < min_data_required:
+        detail_message = f"Nicht genügend Datenpunkte ({data_length_check} gültige) für Modell '{model_choice}' für Container '{container_id}'. Benötigt: {min_data_required}."
+        print(f"ERROR (forecast_service.py): {detail_message}")
+        return {"forecast_data": [], "message": detail_message}
+
+    periods = PERIODS_MAP.get(duration)
+    if periods is None: raise ForecastRequestError(400, f"Ungültige Prognosedauer: '{duration}'. Erlaubt: {list(PERIODS_MAP.keys())}")
+
+    forecast_df = pd.DataFrame()
+    model_training_report = None
+
+    if model_choice == 'prophet':
+        future_regressors_df_with_features = build_future_regressors(history_df_model_input[config.DATE_COLUMN].max(), periods)
+        forecast_df, model_training_report = get_backend('prophet').forecast_with_prophet(
+            history_df_model_input.copy(), periods,
+            extra_regressors_df=future_regressors_df_with_features.copy(),
+            cache_key=make_cache_key(container_id, model_choice, historical_rows, variant=f"with_anomalies={prophet_train_with_anomalies}"),
+            include_history=include_history
+        )
+    elif model_choice == 'tensorflow':
+        lstm_variant = f"mode=direct,horizon={config.LSTM_DIRECT_HORIZON}" if lstm_mode == 'direct' else "mode=recursive"
+        lstm_cache_key = make_cache_key(container_id, model_choice, historical_rows, variant=lstm_variant)
+        served = None
+        if config.LSTM_INFERENCE_ENGINE == 'numpy':
+            served = forecast_with_numpy_lstm(history_df_model_input.copy(), periods, lstm_cache_key, lstm_mode)
+        if served is not None:
+            forecast_df, model_training_report = served
+        else:
+            forecast_df, model_training_report = get_backend('tensorflow').forecast_with_tensorflow(
+                history_df_model_input.copy(), periods,
+                cache_key=lstm_cache_key,
+                mode=lstm_mode
+            )
+    elif model_choice == 'tensorflow_global':
+        served = forecast_with_global_lstm(container_id, history_df_model_input.copy(), periods, lstm_mode)
+        if served is None:
+            skip_reason = skipped_in_training(container_id, lstm_mode)
+            if skip_reason is not None:
+                raise ForecastRequestError(422, f"Container '{container_id}' wurde beim letzten Training des globalen LSTM (Modus '{lstm_mode}') "
+                                                f"übersprungen (containers_skipped: '{skip_reason}'). Ein erneutes Training über POST /api/global_model/train "
+                                                f"bezieht ihn wieder ein, sobald der Grund nicht mehr zutrifft.")
+            raise ForecastRequestError(409, f"Kein globales LSTM-Modell (Modus '{lstm_mode}') für Container '{container_id}' vorhanden. "
+                                            f"Bitte zuerst das Training über POST /api/global_model/train starten.")
+        forecast_df, model_training_report = served
+    else:
+        raise ForecastRequestError(400, f"Ungültiges Modell ausgewählt: {model_choice}")
+
+    if forecast_df is None or forecast_df.empty or 'ds' not in forecast_df.columns or 'yhat' not in forecast_df.columns:
+        detail_message = f"Modell '{model_choice}' lieferte kein Ergebnis für Container '{container_id}'."
+        print(f"ERROR (forecast_service.py): {detail_message}")
+        return {"forecast_data": [], "message": detail_message, "model_training_report": model_training_report}
+
+    forecast_df['ds'] = pd.to_datetime(forecast_df['ds'])
+    if forecast_df['ds'].dt.tz is not None: forecast_df['ds'] = forecast_df['ds'].dt.tz_localize(None)
+
+    last_hist_date = history_df_model_input[config.DATE_COLUMN].max()
+    future_forecast_df = forecast_df[forecast_df['ds'] > last_hist_date].copy()
+
+    if future_forecast_df.empty:
+        detail_message = f"Keine zukünftigen Prognosepunkte von Modell '{model_choice}' für Container '{container_id}' generiert."
+        print(f"WARN (forecast_service.py): {detail_message}")
+        return {"forecast_data": [], "message": detail_message, "model_training_report": model_training_report}
+
+    result_columns = ['ds', 'yhat']
+    if 'yhat_lower' in future_forecast_df.columns and 'yhat_upper' in future_forecast_df.columns:
+        result_columns.extend(['yhat_lower', 'yhat_upper'])
+    if 'trend' in future_forecast_df.columns and model_choice == 'prophet': result_columns.append('trend')
+
+    result_source_df = forecast_df if include_history else future_forecast_df
+    result_df = result_source_df[result_columns].rename(columns={'ds': 'date', 'yhat': 'forecast'})
+    result_df['date'] = pd.to_datetime(result_df['date']).dt.tz_localize('UTC').dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    is_future = (result_source_df['ds'] > last_hist_date).to_numpy()
+
+    if config.PERSIST_FORECASTS:
+        save_forecast_to_db(container_id, stored_model_name(model_choice, lstm_mode, prophet_train_with_anomalies),
+                            list(zip(result_df['date'][is_future], result_df['forecast'][is_future])))
+
+    # Spaltenweise (Liste bzw. NumPy-Array je Spalte): günstiger zu pickeln als ein dict pro Punkt;
+    # api.py serialisiert daraus das angefragte Format (src/serialization.py).
+    forecast_columns = {column: (result_df[column].tolist() if column == 'date' else result_df[column].to_numpy(dtype=np.float64))
+                        for column in result_df.columns}
+    response_payload = {
+        "forecast_data": forecast_columns,
+        "message": f"Prognose für Container '{container_id}' mit Modell '{model_choice}' erfolgreich generiert."
+    }
+    if include_history:
+        response_payload["history_rows"] = int((~is_future).sum()) # Die ersten history_rows Zeilen sind der In-Sample-Fit
+    if model_training_report:
+        response_payload["model_training_report"] = model_training_report
+    return response_payload
+
+
+def run_forecast_batch_item(container_id: str, model_choice: str, durations: List[str], prophet_train_with_anomalies: bool,
+                            historical_rows: List[Tuple[str, float | None, bool]], lstm_mode: Optional[str] = None,
+                            include_history: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Alle Prognosedauern eines (Container, Modell)-Paares in einem Worker. Das Modell wird nur für die erste
+    Dauer trainiert; die weiteren treffen im selben Prozess den Modell-Cache und kosten nur noch Inferenz.
+    """
+    results: Dict[str, Any] = {}
+    for duration in sorted(durations, key=lambda d: PERIODS_MAP[d], reverse=True):
+        try:
+            results[duration] = run_forecast(container_id, duration, model_choice, prophet_train_with_anomalies, historical_rows=historical_rows,
+                                             lstm_mode=lstm_mode, include_history=include_history)
+        except ForecastRequestError as fe:
+            results[duration] = {"forecast_data": [], "message": fe.detail, "error_status_code": fe.status_code}
+        except ValueError as ve:
+            results[duration] = {"forecast_data": [], "message": f"Datenverarbeitungs- oder Modellkonfigurationsfehler: {str(ve)}", "error_status_code": 400}
+    return {"containerId": container_id, "model": model_choice, "results": results}
+
+
+def train_global_lstm_job(container_ids: Optional[List[str]] = None, lstm_mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Trainiert das globale LSTM (model_choice='tensorflow_global') auf allen bzw. den angegebenen Containern.
+    Läuft als Job im Prozess-Pool; gedacht für einen nächtlichen Aufruf, danach kostet jede Prognose nur noch Inferenz.
+    """
+    lstm_mode = lstm_mode or config.LSTM_FORECAST_MODE
+    if lstm_mode not in config.LSTM_FORECAST_MODES:
+        raise ForecastRequestError(400, f"Ungültiger LSTM-Modus: '{lstm_mode}'. Erlaubt: {config.LSTM_FORECAST_MODES}")
+    container_ids = container_ids or get_containers()
+    rows_by_container = load_actuals_bulk(container_ids)
+    frames_by_container = {
+        container_id: build_model_input(container_id, rows, 'tensorflow_global')
+        for container_id, rows in rows_by_container.items() if rows
+    }
+    if not any(frame is not None for frame in frames_by_container.values()):
+        raise ForecastRequestError(404, "Keine historischen Daten für das globale LSTM-Modell gefunden.")
+    report = train_and_store_global_model(frames_by_container, lstm_mode)
+    return {"message": f"Globales LSTM-Modell auf {len(report['containers_trained'])} Container(n) trainiert.", "model_training_report": report}
@@ -0,0 +1,120 @@
+# src/global_lstm.py
+# Globales LSTM: ein Modell für alle Container (Zu-/Abläufe desselben Netzes), trainiert als Job
+# (POST /api/global_model/train, z.B. nächtlich per Cron) statt pro Container und Request.
+# Eingang je Container: die üblichen LSTM-Features, skaliert mit dem Scaler des Containers, plus One-Hot-Kennung.
+# Container mit kurzer Historie profitieren so von den Mustern der anderen; die Trainingszeit hängt von der
+# Datenmenge ab, nicht von der Anzahl der Container.
+# Serving ohne TensorFlow über model.npz (numpy_lstm.py); nur wenn der NumPy-Export fehlt, wird Keras geladen.
+import os
+import uuid
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple # Für Typ-Annotationen
+from src import config, model_store
+from src.lstm_inference import prepare_lstm_input, recursive_forecast, direct_forecast
+from src.model_backends import get_backend
+from src.model_cache import model_cache, fingerprint_config
+from src.numpy_lstm import load_if_exists
+
+GLOBAL_MODEL_ID = "__global__" # Pseudo-Container für model_store / model_cache
+MODEL_NAME = 'tensorflow_global'
+
+
+def lstm_variant(mode: str) -> str:
+    return f"mode=direct,horizon={config.LSTM_DIRECT_HORIZON}" if mode == 'direct' else "mode=recursive"
+
+
+def skipped_in_training(container_id: str, mode: str) -> Optional[str]:
+    """Grund, aus dem der Container beim letzten Training (dieses Modus) übersprungen wurde (containers_skipped), sonst None."""
+    meta = model_store.read_meta(GLOBAL_MODEL_ID, MODEL_NAME, lstm_variant(mode))
+    if meta is None:
+        return None
+    return meta.get("report", {}).get("containers_skipped", {}).get(container_id)
+
+
+def train_and_store_global_model(frames_by_container: Dict[str, pd.DataFrame], mode: str) -> Dict[str, Any]:
+    """Trainiert das globale Modell (TensorFlow wird erst hier importiert) und legt es im model_store ab."""
+    tf_backend = get_backend('tensorflow')
+    trained = tf_backend.train_global_lstm_model(frames_by_container, mode=mode)
+    meta = {
+        "model_id": uuid.uuid4().hex,
+        "trained_at": datetime.now().isoformat(timespec='seconds'),
+        "features": trained["features"],
+        "containers": trained["containers"],
+        "mode": mode,
+        "output_steps": trained["report"]["output_steps"],
+        "config_fingerprint": fingerprint_config('tensorflow'),
+        "report": trained["report"],
+    }
+    saved_to = model_store.save_keras_artifacts(
+        GLOBAL_MODEL_ID, MODEL_NAME, lstm_variant(mode), trained["model"], trained["scalers"], meta,
+        numpy_exporter=lambda path: tf_backend.export_global_numpy_model(trained, path)
+    )
+    if saved_to is None:
+        raise RuntimeError("Globales LSTM-Modell konnte nicht gespeichert werden.")
+    return dict(trained["report"], model_id=meta["model_id"], trained_at=meta["trained_at"], numpy_export=meta.get("numpy_export"))
+
+
+def _load_bundle(meta: Dict[str, Any], variant: str) -> Optional[Dict[str, Any]]:
+    cache_key = (GLOBAL_MODEL_ID, MODEL_NAME, variant, meta["model_id"], meta["config_fingerprint"])
+    bundle = model_cache.get(cache_key)
+    if bundle is not None:
+        return bundle
+    scalers = model_store.load_scaler(GLOBAL_MODEL_ID, MODEL_NAME, variant)
+    if scalers is None:
+        return None
+    numpy_model = load_if_exists(os.path.join(model_store.artifact_dir(GLOBAL_MODEL_ID, MODEL_NAME, variant), model_store.NUMPY_MODEL_FILE))
+    if numpy_model is not None:
+        predict = numpy_model.predict
+        size_bytes = sum(array.nbytes for layer in numpy_model.layers for array in (layer["kernel"], layer["bias"]))
+    else:
+        artifacts = model_store.load_keras_artifacts(GLOBAL_MODEL_ID, MODEL_NAME, variant)
+        if artifacts is None:
+            return None
+        keras_bundle = {"model": artifacts[0], "features": meta["features"] + meta["containers"]}
+        predictor = get_backend('tensorflow').get_predictor(keras_bundle)
+        predict = lambda window: predictor(window).numpy()
+        size_bytes = sum(weight.nbytes for weight in artifacts[0].get_weights())
+    bundle = {"predict": predict, "scalers": scalers, "containers": meta["containers"], "features": meta["features"], "report": meta["report"]}
+    model_cache.put(cache_key, bundle, int(size_bytes))
+    return bundle
+
+
+def forecast_with_global_lstm(container_id: str, history_df_with_all_features: pd.DataFrame, periods: int,
+                              mode: str) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Prognose für einen Container aus dem globalen Modell mit dessen aktueller Historie. None, wenn (für diesen Modus
+    und diese Konfiguration) kein globales Modell vorliegt oder der Container beim Training nicht dabei war.
+    """
+    if mode == 'direct' and periods > config.LSTM_DIRECT_HORIZON:
+        raise ValueError(f"TF: Direct mode predicts at most LSTM_DIRECT_HORIZON={config.LSTM_DIRECT_HORIZON} days, requested {periods}.")
+    variant = lstm_variant(mode)
+    meta = model_store.read_meta(GLOBAL_MODEL_ID, MODEL_NAME, variant)
+    if meta is None or meta.get("config_fingerprint") != fingerprint_config('tensorflow') or container_id not in meta.get("containers", []):
+        return None
+    bundle = _load_bundle(meta, variant)
+    if bundle is None or container_id not in bundle["scalers"]:
+        return None
+
+    df_for_model, features_for_lstm_input, lstm_input_data_df = prepare_lstm_input(history_df_with_all_features)
+    if features_for_lstm_input != bundle["features"]:
+        raise ValueError("TF: Features differ from the global LSTM model. Please retrain the global model.")
+    if len(lstm_input_data_df) < config.LSTM_LOOK_BACK:
+        raise ValueError(f"TF: Not enough data ({len(lstm_input_data_df)}) for look_back={config.LSTM_LOOK_BACK}.")
+    scaler = bundle["scalers"][container_id]
+    scaled_data_np = np.ascontiguousarray(scaler.transform(lstm_input_data_df), dtype=config.FEATURE_DTYPE)
+
+    # Die Container-Kennung ist über den ganzen Horizont konstant: einmal anlegen und an jedes Fenster anhängen.
+    container_block = np.zeros((1, config.LSTM_LOOK_BACK, len(bundle["containers"])), dtype=np.float32)
+    container_block[..., bundle["containers"].index(container_id)] = 1
+    predict = bundle["predict"]
+    predict_fn = lambda window: predict(np.concatenate([window, container_block], axis=2))
+
+    print(f"INFO (global_lstm.py): Forecasting '{container_id}' with the global LSTM model ({meta['trained_at']}).")
+    if mode == 'direct':
+        forecast_df, inference_stats = direct_forecast(predict_fn, scaler, scaled_data_np, df_for_model, periods)
+    else:
+        forecast_df, inference_stats = recursive_forecast(predict_fn, scaler, features_for_lstm_input, scaled_data_np, df_for_model, periods)
+    report = dict(bundle["report"], global_model_id=meta["model_id"], global_model_trained_at=meta["trained_at"], **inference_stats)
+    return forecast_df, report
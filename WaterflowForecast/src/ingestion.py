@@ -0,0 +1,104 @@
+# src/ingestion.py
+import io
+import codecs
+import pandas as pd
+from typing import BinaryIO, Dict, Any, List, Optional # Für Typ-Annotationen
+from src import config
+from src.database import save_actual_to_db
+
+DATE_COLUMN_VARIANTS = ['date', 'datum', 'zeitstempel', 'timestamp', 'ds']
+VALUE_COLUMN_VARIANTS = ['value', 'wert', 'verbrauch', 'y']
+
+
+class CsvStructureError(ValueError):
+    """Upload ist leer oder hat nicht die erwarteten Spalten; api.py gibt status_code/message/detail/errors unverändert zurück."""
+    def __init__(self, status_code: int, message: str, detail: str, errors: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(status_code, message, detail, errors)
+        self.status_code = status_code
+        self.message = message
+        self.detail = detail
+        self.errors = errors or []
+
+
+def _detect_encoding(binary_file: BinaryIO) -> Optional[str]:
+    """Prüft eine Stichprobe auf gültiges UTF-8 (inkl. BOM); sonst latin1. None bei leerer Datei."""
+    sample = binary_file.read(config.UPLOAD_ENCODING_SAMPLE_BYTES)
+    binary_file.seek(0)
+    if not sample:
+        return None
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'latin1'
+
+
+def _open_text(binary_file: BinaryIO, encoding: str) -> io.TextIOWrapper:
+    binary_file.seek(0)
+    # errors='replace': ein einzelnes kaputtes Byte nach der Stichprobe soll nicht den ganzen Upload abbrechen.
+    return io.TextIOWrapper(binary_file, encoding=encoding, errors='replace', newline='')
+
+
+def ingest_csv_stream(binary_file: BinaryIO, container_id: str, source_file: str = "uploaded_data.csv") -> Dict[str, Any]:
+    """
+    Liest eine hochgeladene CSV-Datei (z.B. das SpooledTemporaryFile von UploadFile) in Blöcken von
+    UPLOAD_CHUNK_ROWS Zeilen ein. Jeder Block wird einzeln validiert und in einer eigenen Transaktion
+    gespeichert, sodass der Speicherbedarf unabhängig von der Dateigröße konstant bleibt.
+    """
+    encoding = _detect_encoding(binary_file)
+    if encoding is None:
+        raise CsvStructureError(400, "Die hochgeladene Datei ist leer.", "Die hochgeladene Datei ist leer.")
+    if encoding == 'latin1':
+        print(f"WARN (ingestion.py): File '{source_file}' for '{container_id}' was not UTF-8. Decoding with latin1.")
+
+    # Nur die Kopfzeile lesen, um Datum-/Wertspalte zu bestimmen; danach werden nur diese beiden Spalten geparst.
+    header_stream = _open_text(binary_file, encoding)
+    try:
+        header_columns = list(pd.read_csv(header_stream, sep=config.DATA_SEPARATOR, nrows=0).columns)
+    except pd.errors.EmptyDataError:
+        raise CsvStructureError(400, "CSV enthält keine Datenzeilen.", "CSV enthält keine Datenzeilen.")
+    finally:
+        header_stream.detach()
+
+    normalized_to_original = {str(col).strip().lower(): col for col in header_columns}
+    actual_date_col = next((col for col in normalized_to_original if col in DATE_COLUMN_VARIANTS), None)
+    actual_value_col = next((col for col in normalized_to_original if col in VALUE_COLUMN_VARIANTS), None)
+    error_details_for_user = []
+    if not actual_date_col: error_details_for_user.append(f"Datum ('{'/'.join(DATE_COLUMN_VARIANTS)}')")
+    if not actual_value_col: error_details_for_user.append(f"Wert ('{'/'.join(VALUE_COLUMN_VARIANTS)}')")
+    if error_details_for_user:
+        detail_msg = f"CSV muss Spalten für { ' und '.join(error_details_for_user) } enthalten."
+        raise CsvStructureError(422, "Fehlerhafte CSV-Struktur.", detail_msg, [{"row_csv": 1, "column_name": "Header", "error_message": detail_msg, "original_value": f"Gefundene Spalten (normalisiert): {list(normalized_to_original.keys())}"}])
+
+    date_source_col = normalized_to_original[actual_date_col]
+    value_source_col = normalized_to_original[actual_value_col]
+
+    text_stream = _open_text(binary_file, encoding)
+    processing_errors: List[Dict[str, Any]] = []
+    suppressed_error_count = 0
+    rows_read = 0
+    chunk_count = 0
+    try:
+        reader = pd.read_csv(
+            text_stream, sep=config.DATA_SEPARATOR, usecols=[date_source_col, value_source_col],
+            chunksize=config.UPLOAD_CHUNK_ROWS
+        )
+        for chunk in reader:
+            chunk_count += 1
+            rows_read += len(chunk)
+            # Der Index läuft über die Blöcke weiter, damit row_csv in den Fehlermeldungen stimmt.
+            chunk_to_save = chunk[[date_source_col, value_source_col]].rename(columns={date_source_col: 'Date', value_source_col: 'Value'})
+            chunk_errors = save_actual_to_db(chunk_to_save, container_id, source_file=source_file)
+            room_left = config.UPLOAD_MAX_REPORTED_ERRORS - len(processing_errors)
+            processing_errors.extend(chunk_errors[:max(room_left, 0)])
+            suppressed_error_count += max(len(chunk_errors) - max(room_left, 0), 0)
+    finally:
+        text_stream.detach()
+
+    if rows_read == 0:
+        raise CsvStructureError(400, "CSV enthält keine Datenzeilen.", "CSV enthält keine Datenzeilen.")
+    if suppressed_error_count > 0:
+        processing_errors.append({"row_csv": "…", "column_name": "-", "error_message": f"{suppressed_error_count} weitere fehlerhafte Zeilen nicht einzeln aufgeführt.", "original_value": ""})
+
+    print(f"INFO (ingestion.py): Ingested {rows_read} rows in {chunk_count} chunk(s) for '{container_id}' from '{source_file}'.")
+    return {"rows_read": rows_read, "chunks": chunk_count, "errors": processing_errors}
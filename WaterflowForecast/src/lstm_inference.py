@@ -0,0 +1,193 @@
+# src/lstm_inference.py
+# LSTM-Prognose ohne TensorFlow-Abhängigkeit: Datenaufbereitung, rekursiver und direkter Prognose-Loop über eine
+# beliebige predict-Funktion (getracte tf.function aus tf_keras_model oder NumpyLSTMModel aus numpy_lstm.py) sowie
+# das Serving gespeicherter Modelle aus model.npz, ohne TensorFlow zu importieren.
+import os
+import time
+import pandas as pd
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Tuple # Für Typ-Annotationen
+from src import config, model_store
+from src.data_loader import IncrementalFeatureEngine # Feature rows for the recursive forecast loop
+from src.model_cache import model_cache
+from src.numpy_lstm import load_if_exists
+
+PredictFn = Callable[[np.ndarray], np.ndarray] # (1 x look_back x Features, float32) -> (1 x Ausgabeschritte)
+
+
+def prepare_lstm_input(history_df_with_all_features: pd.DataFrame) -> Tuple[pd.DataFrame, List[str], pd.DataFrame]:
+    """Bereinigt die Historie und legt die Feature-Reihenfolge fest (Zielspalte zuerst, Rest alphabetisch)."""
+    df_for_model = history_df_with_all_features.copy()
+
+    if config.DATE_COLUMN not in df_for_model.columns or config.TARGET_COLUMN not in df_for_model.columns:
+        raise ValueError(f"LSTM: Input DataFrame must contain '{config.DATE_COLUMN}' and '{config.TARGET_COLUMN}' columns.")
+
+    if df_for_model[config.DATE_COLUMN].dt.tz is not None:
+        print(f"INFO (lstm_inference): Removing timezone from '{config.DATE_COLUMN}' column.")
+        df_for_model[config.DATE_COLUMN] = df_for_model[config.DATE_COLUMN].dt.tz_localize(None)
+
+    if not pd.api.types.is_numeric_dtype(df_for_model[config.TARGET_COLUMN]):
+        df_for_model[config.TARGET_COLUMN] = pd.to_numeric(df_for_model[config.TARGET_COLUMN], errors='coerce')
+
+    if df_for_model[config.TARGET_COLUMN].isnull().any():
+        print(f"WARNING (lstm_inference): Target column '{config.TARGET_COLUMN}' contains {df_for_model[config.TARGET_COLUMN].isnull().sum()} NaNs. Filling with ffill/bfill.")
+        df_for_model[config.TARGET_COLUMN] = df_for_model[config.TARGET_COLUMN].ffill().bfill()
+        if df_for_model[config.TARGET_COLUMN].isnull().any():
+            print(f"WARNING (lstm_inference): Target column '{config.TARGET_COLUMN}' still contains NaNs after ffill/bfill. Filling with 0.")
+            df_for_model[config.TARGET_COLUMN] = df_for_model[config.TARGET_COLUMN].fillna(0)
+
+    features_for_lstm_input = [config.TARGET_COLUMN] + [
+        col for col in df_for_model.columns if col not in [config.DATE_COLUMN, config.TARGET_COLUMN]
+    ]
+    features_for_lstm_input = sorted(list(set(features_for_lstm_input)))
+    if config.TARGET_COLUMN in features_for_lstm_input:
+        features_for_lstm_input.remove(config.TARGET_COLUMN)
+    features_for_lstm_input = [config.TARGET_COLUMN] + features_for_lstm_input
+
+    print(f"INFO (lstm_inference): LSTM input features (ordered): {features_for_lstm_input}")
+
+    lstm_input_data_df = df_for_model[features_for_lstm_input].copy()
+
+    for col in lstm_input_data_df.columns:
+        if col != config.TARGET_COLUMN and lstm_input_data_df[col].isnull().any():
+            print(f"WARNING (lstm_inference): Feature column '{col}' contains NaNs. Filling with ffill/bfill/0.")
+            lstm_input_data_df[col] = lstm_input_data_df[col].ffill().bfill().fillna(0)
+
+    # Ein Dtype für alle Spalten: ein zusammenhängender Block, Skalierung und Fenster bleiben in config.FEATURE_DTYPE.
+    lstm_input_data_df = lstm_input_data_df.astype(config.FEATURE_DTYPE, copy=False)
+    return df_for_model, features_for_lstm_input, lstm_input_data_df
+
+
+def recursive_forecast(predict_fn: PredictFn, scaler, features_for_lstm_input: List[str], scaled_data_np: np.ndarray,
+                       df_for_model: pd.DataFrame, periods: int) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Rekursiver Modus: je Schritt ein Forward-Pass, die Vorhersage fließt über die Feature-Zeile in das nächste Fenster ein."""
+    n_features_in_model = len(features_for_lstm_input)
+    target_col_index_in_scaled = 0
+    look_back = config.LSTM_LOOK_BACK
+
+    print("INFO (lstm_inference): Generating forecast with incremental feature updates...")
+
+    # Features der jeweils neuen Zeile kommen aus Ringpuffern (IncrementalFeatureEngine) statt aus add_features über
+    # die ganze Historie; Aufwand pro Schritt ist damit unabhängig von der Historienlänge.
+    feature_engine = IncrementalFeatureEngine(
+        df_for_model[config.TARGET_COLUMN].to_numpy(dtype=np.float64), target_column=config.TARGET_COLUMN,
+        last_row=df_for_model.iloc[-1].to_dict()
+    )
+    # MinMaxScaler.transform ist X * scale_ + min_; für eine einzelne Zeile direkt in NumPy gerechnet.
+    scale, offset = scaler.scale_, scaler.min_
+
+    # Eingabefenster als gleitender Ausschnitt eines vorab angelegten Puffers: kein Kopieren der Sequenz pro Schritt.
+    window_buffer = np.empty((look_back + periods, n_features_in_model), dtype=np.float32)
+    window_buffer[:look_back] = scaled_data_np[-look_back:]
+
+    future_unscaled_y_predictions = []
+    last_known_date_from_input_history = pd.to_datetime(df_for_model[config.DATE_COLUMN].iloc[-1])
+
+    inference_seconds = 0.0
+    for i in range(periods):
+        current_sequence_scaled = window_buffer[i:i + look_back].reshape((1, look_back, n_features_in_model))
+        step_start = time.perf_counter()
+        predicted_y_scaled_current_step = float(predict_fn(current_sequence_scaled)[0, 0])
+        inference_seconds += time.perf_counter() - step_start
+
+        predicted_y_unscaled_current_step = (predicted_y_scaled_current_step - offset[target_col_index_in_scaled]) / scale[target_col_index_in_scaled]
+        future_unscaled_y_predictions.append(predicted_y_unscaled_current_step)
+
+        if i < periods - 1:
+            next_prediction_date = last_known_date_from_input_history + pd.Timedelta(days=i + 1)
+            next_step_features = feature_engine.next_row(next_prediction_date, predicted_y_unscaled_current_step)
+            next_step_unscaled_feature_array = np.fromiter(
+                (next_step_features.get(feat_name, 0) for feat_name in features_for_lstm_input),
+                dtype=np.float64, count=n_features_in_model
+            )
+            window_buffer[look_back + i] = next_step_unscaled_feature_array * scale + offset
+
+    forecast_dates = pd.date_range(
+        start=last_known_date_from_input_history + pd.Timedelta(days=1),
+        periods=periods,
+        freq='D'
+    )
+    forecast_df = pd.DataFrame({
+        'ds': forecast_dates,
+        'yhat': np.array(future_unscaled_y_predictions).flatten().round(2)
+    })
+    print(f"INFO (lstm_inference): Forecast complete ({inference_seconds / periods * 1000:.2f} ms per inference step).")
+    return forecast_df, {"inference_ms_per_step": round(inference_seconds / periods * 1000, 3), "inference_steps": periods}
+
+
+def direct_forecast(predict_fn: PredictFn, scaler, scaled_data_np: np.ndarray, df_for_model: pd.DataFrame,
+                    periods: int) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Direkter Modus: ein Forward-Pass auf dem letzten Fenster liefert den ganzen Horizont; keine Feature-Fortschreibung."""
+    look_back = config.LSTM_LOOK_BACK
+    target_col_index_in_scaled = 0
+
+    print("INFO (lstm_inference): Generating direct multi-horizon forecast in a single forward pass...")
+    last_window = scaled_data_np[-look_back:].reshape((1, look_back, scaled_data_np.shape[1])).astype(np.float32)
+    step_start = time.perf_counter()
+    predicted_scaled = np.asarray(predict_fn(last_window))[0, :periods].astype(np.float64)
+    inference_seconds = time.perf_counter() - step_start
+    predicted_unscaled = (predicted_scaled - scaler.min_[target_col_index_in_scaled]) / scaler.scale_[target_col_index_in_scaled]
+
+    last_known_date_from_input_history = pd.to_datetime(df_for_model[config.DATE_COLUMN].iloc[-1])
+    forecast_df = pd.DataFrame({
+        'ds': pd.date_range(start=last_known_date_from_input_history + pd.Timedelta(days=1), periods=periods, freq='D'),
+        'yhat': np.asarray(predicted_unscaled, dtype=np.float64).round(2)
+    })
+    print("INFO (lstm_inference): Forecast complete.")
+    return forecast_df, {"inference_ms_per_step": round(inference_seconds * 1000, 3), "inference_steps": 1}
+
+
+def _numpy_cache_key(cache_key: Tuple) -> Tuple:
+    container_id, model_name, variant, rows_fingerprint, config_fingerprint = cache_key
+    return (container_id, model_name, f"{variant},engine=numpy", rows_fingerprint, config_fingerprint)
+
+
+def _load_numpy_bundle(history_df_with_all_features: pd.DataFrame, cache_key: Tuple, mode: str) -> Optional[Dict[str, Any]]:
+    """Gespeichertes Modell passt nur, wenn es genau auf diesen Daten mit dieser Konfiguration trainiert wurde."""
+    container_id, model_name, variant = cache_key[0], cache_key[1], cache_key[2]
+    stored_meta = model_store.read_meta(container_id, model_name, variant)
+    if (stored_meta is None or stored_meta.get("data_fingerprint") != cache_key[3]
+            or stored_meta.get("config_fingerprint") != cache_key[4] or stored_meta.get("mode") != mode):
+        return None
+    numpy_model = load_if_exists(os.path.join(model_store.artifact_dir(container_id, model_name, variant), model_store.NUMPY_MODEL_FILE))
+    if numpy_model is None:
+        return None
+    df_for_model, features_for_lstm_input, lstm_input_data_df = prepare_lstm_input(history_df_with_all_features)
+    if features_for_lstm_input != numpy_model.features:
+        return None
+    return {
+        "model": numpy_model,
+        "features": features_for_lstm_input,
+        "scaled_data": numpy_model.transform(lstm_input_data_df.to_numpy(), dtype=config.FEATURE_DTYPE),
+        "history_df": df_for_model,
+        "report": dict(stored_meta.get("report") or {}, training_strategy="stored", retrain_reason=None),
+        "mode": mode,
+    }
+
+
+def forecast_with_numpy_lstm(history_df_with_all_features: pd.DataFrame, periods: int, cache_key: Tuple,
+                             mode: str) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+    """
+    Prognose aus einem gespeicherten LSTM (model.npz) ohne TensorFlow. None, wenn kein passendes Modell vorliegt;
+    dann muss tf_keras_model trainieren bzw. nachtrainieren (und legt dabei das .npz für die nächsten Aufrufe an).
+    """
+    if mode == 'direct' and periods > config.LSTM_DIRECT_HORIZON:
+        return None # tf_keras_model meldet den Fehler
+    numpy_key = _numpy_cache_key(cache_key)
+    bundle = model_cache.get(numpy_key)
+    served_from_cache = bundle is not None
+    if bundle is None:
+        bundle = _load_numpy_bundle(history_df_with_all_features, cache_key, mode)
+        if bundle is None:
+            return None
+        size_bytes = sum(array.nbytes for layer in bundle["model"].layers for array in (layer["kernel"], layer["bias"]))
+        model_cache.put(numpy_key, bundle, int(size_bytes + bundle["scaled_data"].nbytes + bundle["history_df"].memory_usage(deep=True).sum()))
+    print(f"INFO (lstm_inference): Serving LSTM forecast for '{cache_key[0]}' from the stored NumPy model (no TensorFlow).")
+
+    numpy_model = bundle["model"]
+    if mode == 'direct':
+        forecast_df, inference_stats = direct_forecast(numpy_model, numpy_model, bundle["scaled_data"], bundle["history_df"], periods)
+    else:
+        forecast_df, inference_stats = recursive_forecast(numpy_model, numpy_model, bundle["features"], bundle["scaled_data"],
+                                                          bundle["history_df"], periods)
+    return forecast_df, dict(bundle["report"], served_from_cache=served_from_cache, inference_engine="numpy", **inference_stats)
@@ -0,0 +1,60 @@
+# src/model_backends.py
+# Registry der Modell-Backends mit Import bei der ersten Nutzung. prophet_model (Prophet/cmdstanpy) und
+# tf_keras_model (TensorFlow, sklearn) kosten beim Import Sekunden und mehrere hundert MB; ein Worker, der nur
+# Uploads oder Container-CRUD bedient, lädt sie so nie. Optional lädt prewarm() sie nach dem Start im Hintergrund
+# (config.PREWARM_MODEL_BACKENDS, siehe forecast_jobs._initialize_worker).
+import time
+import importlib
+import threading
+from types import ModuleType
+from typing import Dict, Iterable, List, Optional # Für Typ-Annotationen
+
+_BACKEND_MODULES = {
+    'prophet': 'src.prophet_model',
+    'tensorflow': 'src.tf_keras_model',
+}
+
+_loaded: Dict[str, ModuleType] = {}
+_load_lock = threading.Lock()
+
+
+def get_backend(name: str) -> ModuleType:
+    """Modul des Backends, beim ersten Aufruf importiert (thread-sicher, danach nur ein Dict-Zugriff)."""
+    module = _loaded.get(name)
+    if module is not None:
+        return module
+    if name not in _BACKEND_MODULES:
+        raise ValueError(f"Unbekanntes Modell-Backend '{name}'. Verfügbar: {list(_BACKEND_MODULES.keys())}")
+    with _load_lock:
+        module = _loaded.get(name)
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(_BACKEND_MODULES[name])
+            _loaded[name] = module
+            print(f"INFO (model_backends.py): Backend '{name}' loaded in {time.perf_counter() - start:.2f} s.")
+    return module
+
+
+def loaded_backends() -> List[str]:
+    return sorted(_loaded.keys())
+
+
+def prewarm(names: Iterable[str], background: bool = True) -> Optional[threading.Thread]:
+    """Importiert die angegebenen Backends vorab, standardmäßig in einem Daemon-Thread."""
+    names = [name for name in names if name not in _loaded]
+    if not names:
+        return None
+
+    def load_all():
+        for name in names:
+            try:
+                get_backend(name)
+            except Exception as e: # Ein fehlendes Backend soll den Start nicht verhindern; der Fehler kommt dann beim ersten Request
+                print(f"WARN (model_backends.py): Could not prewarm backend '{name}': {e}")
+
+    if not background:
+        load_all()
+        return None
+    thread = threading.Thread(target=load_all, name="model-backend-prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,115 @@
+# src/model_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple # Für Typ-Annotationen
+from src import config
+
+# Prozesslokaler LRU-Cache für trainierte Modelle.
+# Schlüssel: (container, modell, variante, hash der load_actuals-Zeilen, hash der relevanten config-Werte).
+# Ändern sich weder die Ist-Werte noch die Hyperparameter, wird nur noch inferiert statt neu trainiert.
+# Hinweis: Jeder Worker im Prozess-Pool (forecast_jobs.py) hat seinen eigenen Cache. Landet eine Wiederholung auf
+# einem anderen Worker, trainiert dieser neu bzw. lädt das Modell aus dem model_store (sofern dort gespeichert).
+# Änderungen an einem Container (Upload, Anomalien, Imputation, Umbenennen, Löschen) erhöhen dessen Datenversion in
+# der Tabelle 'meta'; sync_container gleicht sie vor jeder Prognose ab und verwirft veraltete Einträge dieses Workers.
+
+_CONFIG_KEYS_BY_MODEL = {
+    'prophet': [
+        'PROPHET_CHANGEPOINT_PRIOR', 'PROPHET_SEASONALITY_PRIOR', 'PROPHET_DAILY_SEASONALITY',
+        'PROPHET_SEASONALITY_MODE', 'PROPHET_UNCERTAINTY_MODE', 'PROPHET_UNCERTAINTY_SAMPLES',
+    ],
+    'tensorflow': [
+        'LSTM_LOOK_BACK', 'LSTM_UNITS_L1', 'LSTM_UNITS_L2', 'LSTM_DROPOUT', 'LSTM_EPOCHS',
+        'LSTM_BATCH_SIZE', 'LSTM_EARLY_STOPPING_PATIENCE',
+    ],
+}
+_FEATURE_CONFIG_KEYS = [
+    'CREATE_LAG_FEATURES', 'LAG_VALUES', 'CREATE_ROLLING_FEATURES', 'ROLLING_WINDOWS', 'CREATE_DATE_FEATURES',
+]
+
+
+def fingerprint_rows(rows: List[Tuple[str, float | None, bool]]) -> str:
+    """Hash über die Zeilen aus load_actuals (Datum, Wert, Anomalie-Flag)."""
+    return hashlib.sha1(repr(rows).encode('utf-8')).hexdigest()
+
+
+def fingerprint_config(model_name: str) -> str:
+    """Hash über alle config-Werte, die das trainierte Modell beeinflussen."""
+    keys = _CONFIG_KEYS_BY_MODEL.get(model_name, []) + _FEATURE_CONFIG_KEYS
+    values = [(key, getattr(config, key, None)) for key in keys]
+    return hashlib.sha1(repr(values).encode('utf-8')).hexdigest()
+
+
+def make_cache_key(container_id: str, model_name: str, rows: List[Tuple[str, float | None, bool]], variant: str = "") -> Tuple[str, str, str, str, str]:
+    return (container_id, model_name, variant, fingerprint_rows(rows), fingerprint_config(model_name))
+
+
+class ModelCache:
+    """LRU-Cache mit Obergrenze für Anzahl Einträge und geschätzte Größe in Bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._container_versions: Dict[str, int] = {}
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Tuple, value: Any, size_bytes: int):
+        if self.max_entries <= 0 or size_bytes > self.max_bytes:
+            print(f"INFO (model_cache.py): Model for '{key[0]}' ({key[1]}) not cached (size {size_bytes} bytes, limit {self.max_bytes}).")
+            return
+        with self._lock:
+            self._drop_container_model(key[0], key[1], key[2])
+            self._entries[key] = (value, size_bytes)
+            self._total_bytes += size_bytes
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                print(f"INFO (model_cache.py): Evicted cached model for '{evicted_key[0]}' ({evicted_key[1]}).")
+
+    def _drop_container_model(self, container_id: str, model_name: str, variant: str):
+        # Ältere Fingerprints desselben Containers/Modells werden nie wieder getroffen.
+        stale_keys = [k for k in self._entries if k[:3] == (container_id, model_name, variant)]
+        for stale_key in stale_keys:
+            _, stale_size = self._entries.pop(stale_key)
+            self._total_bytes -= stale_size
+
+    def invalidate_container(self, container_id: str):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == container_id]:
+                _, size = self._entries.pop(key)
+                self._total_bytes -= size
+
+    def sync_container(self, container_id: str, data_version: int):
+        """
+        Verwirft die Einträge des Containers, wenn sich seine Datenversion (database.get_container_data_version)
+        seit dem letzten Abgleich in diesem Prozess geändert hat. data_version < 0 (Lesefehler) wird ignoriert.
+        """
+        if data_version < 0:
+            return
+        with self._lock:
+            known_version = self._container_versions.get(container_id)
+            self._container_versions[container_id] = data_version
+        if known_version is not None and known_version != data_version:
+            self.invalidate_container(container_id)
+            print(f"INFO (model_cache.py): Data of '{container_id}' changed (version {known_version} -> {data_version}). Cached models dropped.")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._total_bytes, "hits": self.hits, "misses": self.misses}
+
+
+model_cache = ModelCache(config.MODEL_CACHE_MAX_ENTRIES, config.MODEL_CACHE_MAX_BYTES)
@@ -0,0 +1,173 @@
+# src/model_store.py
+# Persistente Modell-Artefakte je Container unter config.MODEL_ARTIFACT_DIR, z.B. für Warm-Start/Fine-Tuning des LSTM.
+# Layout: <MODEL_ARTIFACT_DIR>/<container>/<modell>[_<variante>]/{model.keras, scaler.joblib, model.npz, meta.json}
+# Prophet: meta.json (optimierte Parameter für den Warm-Start) und model.json (serialisiertes Modell, siehe prophet_model.py).
+# Anders als model_cache.py überlebt der Store Neustarts und wird von allen Worker-Prozessen geteilt.
+# TensorFlow wird erst beim Laden/Speichern eines Keras-Modells importiert.
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import joblib
+from typing import Any, Callable, Dict, Optional, Tuple # Für Typ-Annotationen
+from src import config
+
+META_FILE = "meta.json"
+KERAS_MODEL_FILE = "model.keras"
+SCALER_FILE = "scaler.joblib"
+NUMPY_MODEL_FILE = "model.npz" # Gewichte + Scaler für numpy_lstm.py (Serving ohne TensorFlow)
+PROPHET_MODEL_FILE = "model.json" # prophet.serialize.model_to_json
+
+
+def _container_dir_name(container_id: str) -> str:
+    # Bereinigter Name zur Lesbarkeit plus kurzer Hash, damit z.B. 'a/b' und 'a_b' nicht kollidieren.
+    digest = hashlib.sha1(container_id.encode('utf-8')).hexdigest()[:8]
+    return f"{config.sanitize_filename(container_id)}_{digest}"
+
+
+def container_artifact_dir(container_id: str) -> str:
+    return os.path.join(config.MODEL_ARTIFACT_DIR, _container_dir_name(container_id))
+
+
+def artifact_dir(container_id: str, model_name: str, variant: str = "") -> str:
+    name = model_name if not variant else f"{model_name}_{config.sanitize_filename(variant)}"
+    return os.path.join(container_artifact_dir(container_id), name)
+
+
+def read_meta(container_id: str, model_name: str, variant: str = "") -> Optional[Dict[str, Any]]:
+    meta_path = os.path.join(artifact_dir(container_id, model_name, variant), META_FILE)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"WARN (model_store.py): Could not read '{meta_path}': {e}")
+        return None
+
+
+def _write_atomically(target_dir: str, write_fn) -> None:
+    """Schreibt in ein temporäres Verzeichnis und tauscht es dann aus, damit parallele Leser nie halbe Artefakte sehen."""
+    parent = os.path.dirname(target_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp_", dir=parent)
+    try:
+        write_fn(tmp_dir)
+        old_dir = None
+        if os.path.exists(target_dir):
+            old_dir = tempfile.mkdtemp(prefix=".old_", dir=parent)
+            os.rmdir(old_dir)
+            os.replace(target_dir, old_dir)
+        os.replace(tmp_dir, target_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def save_keras_artifacts(container_id: str, model_name: str, variant: str, model, scaler, meta: Dict[str, Any],
+                         numpy_exporter: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+    """
+    Speichert Keras-Modell, Scaler und Metadaten. Fehler werden geloggt, die Prognose selbst schlägt dadurch nicht fehl.
+    numpy_exporter(pfad) schreibt optional zusätzlich model.npz; meta["numpy_export"] hält fest, ob das geklappt hat.
+    """
+    target_dir = artifact_dir(container_id, model_name, variant)
+
+    def write(tmp_dir: str):
+        model.save(os.path.join(tmp_dir, KERAS_MODEL_FILE))
+        joblib.dump(scaler, os.path.join(tmp_dir, SCALER_FILE))
+        if numpy_exporter is not None:
+            try:
+                meta["numpy_export"] = bool(numpy_exporter(os.path.join(tmp_dir, NUMPY_MODEL_FILE)))
+            except Exception as e:
+                print(f"WARN (model_store.py): NumPy export for '{container_id}' failed: {e}")
+                meta["numpy_export"] = False
+        with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+
+    try:
+        _write_atomically(target_dir, write)
+        print(f"INFO (model_store.py): Saved {model_name} artifacts for '{container_id}' to {target_dir}.")
+        return target_dir
+    except Exception as e:
+        print(f"ERROR (model_store.py): Could not save {model_name} artifacts for '{container_id}': {e}")
+        return None
+
+
+def save_json_artifacts(container_id: str, model_name: str, variant: str, meta: Dict[str, Any],
+                        text_files: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """
+    Speichert meta.json und optional weitere Textdateien ({dateiname: inhalt}, z.B. das serialisierte Prophet-Modell).
+    Fehler werden geloggt, nicht geworfen.
+    """
+    target_dir = artifact_dir(container_id, model_name, variant)
+
+    def write(tmp_dir: str):
+        for file_name, content in (text_files or {}).items():
+            with open(os.path.join(tmp_dir, file_name), 'w', encoding='utf-8') as f:
+                f.write(content)
+        with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+
+    try:
+        _write_atomically(target_dir, write)
+        print(f"INFO (model_store.py): Saved {model_name} artifacts for '{container_id}' to {target_dir}.")
+        return target_dir
+    except Exception as e:
+        print(f"ERROR (model_store.py): Could not save {model_name} artifacts for '{container_id}': {e}")
+        return None
+
+
+def load_keras_artifacts(container_id: str, model_name: str, variant: str = "") -> Optional[Tuple[Any, Any, Dict[str, Any]]]:
+    """(model, scaler, meta) oder None, wenn nichts (Vollständiges) gespeichert ist."""
+    meta = read_meta(container_id, model_name, variant)
+    if meta is None:
+        return None
+    source_dir = artifact_dir(container_id, model_name, variant)
+    try:
+        from tensorflow.keras.models import load_model
+        model = load_model(os.path.join(source_dir, KERAS_MODEL_FILE))
+        scaler = joblib.load(os.path.join(source_dir, SCALER_FILE))
+        return model, scaler, meta
+    except Exception as e:
+        print(f"WARN (model_store.py): Could not load {model_name} artifacts for '{container_id}' from {source_dir}: {e}")
+        return None
+
+
+def read_text_artifact(container_id: str, model_name: str, variant: str, file_name: str) -> Optional[str]:
+    text_path = os.path.join(artifact_dir(container_id, model_name, variant), file_name)
+    try:
+        with open(text_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        print(f"WARN (model_store.py): Could not read '{text_path}': {e}")
+        return None
+
+
+def load_scaler(container_id: str, model_name: str, variant: str = "") -> Optional[Any]:
+    """Nur scaler.joblib (ohne Keras-Modell und damit ohne TensorFlow), z.B. für das NumPy-Serving."""
+    scaler_path = os.path.join(artifact_dir(container_id, model_name, variant), SCALER_FILE)
+    try:
+        return joblib.load(scaler_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"WARN (model_store.py): Could not load '{scaler_path}': {e}")
+        return None
+
+
+def delete_container_artifacts(container_id: str) -> None:
+    shutil.rmtree(container_artifact_dir(container_id), ignore_errors=True)
+
+
+def rename_container_artifacts(old_container_id: str, new_container_id: str) -> None:
+    old_dir = container_artifact_dir(old_container_id)
+    if not os.path.isdir(old_dir):
+        return
+    new_dir = container_artifact_dir(new_container_id)
+    shutil.rmtree(new_dir, ignore_errors=True)
+    os.replace(old_dir, new_dir)
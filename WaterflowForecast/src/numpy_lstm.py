@@ -0,0 +1,140 @@
+# src/numpy_lstm.py
+# LSTM-Inferenz in reinem NumPy für Modelle aus tf_keras_model.build_lstm_model (LSTM [-> LSTM] -> Dense, Dropout
+# ist bei der Inferenz die Identität). Gewichte und Scaler werden als kompaktes .npz exportiert; geladen und
+# gerechnet wird ohne TensorFlow, damit Serving-Worker die Laufzeit (Startzeit, Speicher) gar nicht erst laden.
+# Gate-Reihenfolge in Keras-Kernels: input, forget, cell, output.
+import numpy as np
+from typing import Any, Dict, List, Optional # Für Typ-Annotationen
+
+NPZ_FORMAT_VERSION = 1
+
+_ACTIVATIONS = {
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'relu': lambda x: np.maximum(x, 0),
+    'linear': lambda x: x,
+}
+
+
+def _activation_name(value: Any) -> str:
+    name = value if isinstance(value, str) else getattr(value, '__name__', str(value))
+    if name not in _ACTIVATIONS:
+        raise ValueError(f"NumPy-LSTM: Activation '{name}' is not supported.")
+    return name
+
+
+def export_npz(path: str, model, scaler, features: List[str]) -> None:
+    """
+    Schreibt Gewichte, Aktivierungen und MinMaxScaler-Parameter eines Keras-Modells nach `path` (.npz).
+    scaler=None für Modelle mit mehreren Scalern (globales LSTM), die separat gespeichert werden.
+    Das Modell wird nur über get_weights()/get_config() gelesen, TensorFlow wird hier nicht importiert.
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    layer_types = []
+    for layer in model.layers:
+        layer_type = type(layer).__name__
+        if layer_type in ('Dropout', 'InputLayer'):
+            continue
+        layer_config = layer.get_config()
+        index = len(layer_types)
+        if layer_type == 'LSTM':
+            kernel, recurrent_kernel, bias = layer.get_weights()
+            arrays[f"l{index}_kernel"], arrays[f"l{index}_recurrent_kernel"], arrays[f"l{index}_bias"] = kernel, recurrent_kernel, bias
+            arrays[f"l{index}_activations"] = np.array([_activation_name(layer_config['activation']),
+                                                         _activation_name(layer_config['recurrent_activation'])])
+            arrays[f"l{index}_return_sequences"] = np.array(bool(layer_config.get('return_sequences', False)))
+        elif layer_type == 'Dense':
+            kernel, bias = layer.get_weights()
+            arrays[f"l{index}_kernel"], arrays[f"l{index}_bias"] = kernel, bias
+            arrays[f"l{index}_activations"] = np.array([_activation_name(layer_config.get('activation') or 'linear')])
+        else:
+            raise ValueError(f"NumPy-LSTM: Layer type '{layer_type}' is not supported.")
+        layer_types.append(layer_type)
+
+    if scaler is not None:
+        arrays["scaler_scale"], arrays["scaler_min"] = np.asarray(scaler.scale_), np.asarray(scaler.min_)
+    np.savez_compressed(
+        path, format_version=np.array(NPZ_FORMAT_VERSION), layer_types=np.array(layer_types), features=np.array(features), **arrays
+    )
+
+
+class NumpyLSTMModel:
+    """Geladenes .npz-Modell. predict() entspricht model(x, training=False) bis auf Float-Rundung."""
+
+    def __init__(self, layers: List[Dict[str, Any]], features: List[str], scale: Optional[np.ndarray], offset: Optional[np.ndarray]):
+        self.layers = layers
+        self.features = features
+        self.scale_ = scale # Gleiche Attributnamen wie MinMaxScaler, damit der Prognose-Loop beide akzeptiert
+        self.min_ = offset
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyLSTMModel":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['format_version']) != NPZ_FORMAT_VERSION:
+                raise ValueError(f"NumPy-LSTM: Unsupported file format version {int(data['format_version'])} in '{path}'.")
+            layers = []
+            for index, layer_type in enumerate(data['layer_types'].tolist()):
+                activations = [_ACTIVATIONS[name] for name in data[f"l{index}_activations"].tolist()]
+                layer = {"type": layer_type, "kernel": data[f"l{index}_kernel"], "bias": data[f"l{index}_bias"], "activations": activations}
+                if layer_type == 'LSTM':
+                    layer["recurrent_kernel"] = data[f"l{index}_recurrent_kernel"]
+                    layer["return_sequences"] = bool(data[f"l{index}_return_sequences"])
+                layers.append(layer)
+            has_scaler = 'scaler_scale' in data.files
+            return cls(layers, data['features'].tolist(), data['scaler_scale'] if has_scaler else None, data['scaler_min'] if has_scaler else None)
+
+    def transform(self, values: np.ndarray, dtype=np.float32) -> np.ndarray:
+        """Wie MinMaxScaler.transform, Ergebnis in `dtype`."""
+        return (np.asarray(values, dtype=dtype) * self.scale_ + self.min_).astype(dtype, copy=False)
+
+    @staticmethod
+    def _lstm_forward(x: np.ndarray, layer: Dict[str, Any]) -> np.ndarray:
+        activation, recurrent_activation = layer["activations"]
+        recurrent_kernel = layer["recurrent_kernel"]
+        units = recurrent_kernel.shape[0]
+        batch_size, time_steps, _ = x.shape
+        # Eingangsprojektion für alle Zeitschritte auf einmal; im Loop bleibt nur die rekurrente Matrixmultiplikation.
+        projected = x @ layer["kernel"] + layer["bias"]
+        h = np.zeros((batch_size, units), dtype=projected.dtype)
+        c = np.zeros((batch_size, units), dtype=projected.dtype)
+        outputs = np.empty((batch_size, time_steps, units), dtype=projected.dtype) if layer["return_sequences"] else None
+        for t in range(time_steps):
+            z = projected[:, t] + h @ recurrent_kernel
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+    def predict(self, window: np.ndarray) -> np.ndarray:
+        """window: (Batch x look_back x Features) -> (Batch x Ausgabeschritte)."""
+        x = np.asarray(window, dtype=np.float32)
+        for layer in self.layers:
+            if layer["type"] == 'LSTM':
+                x = self._lstm_forward(x, layer)
+            else:
+                x = layer["activations"][0](x @ layer["kernel"] + layer["bias"])
+        return x
+
+    def __call__(self, window: np.ndarray) -> np.ndarray:
+        return self.predict(window)
+
+
+def max_abs_difference(numpy_model: NumpyLSTMModel, keras_predict, window: np.ndarray) -> float:
+    """Abweichung zwischen NumPy- und Keras-Vorhersage auf demselben Fenster (Prüfung vor dem Export)."""
+    keras_output = np.asarray(keras_predict(np.asarray(window, dtype=np.float32)))
+    return float(np.max(np.abs(numpy_model.predict(window) - keras_output)))
+
+
+def load_if_exists(path: str) -> Optional[NumpyLSTMModel]:
+    try:
+        return NumpyLSTMModel.load(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, KeyError, ValueError) as e:
+        print(f"WARN (numpy_lstm.py): Could not load '{path}': {e}")
+        return None
@@ -3,18 +3,190 @@ import pandas as pd
 import numpy as np
 import os
 import sys
+import time
 import traceback
+from datetime import datetime
 from prophet import Prophet
-from src import config
-from typing import Tuple, Dict, Any # Für Typ-Annotationen
+from prophet.serialize import model_to_json, model_from_json
+from src import config, model_store
+from src.model_cache import model_cache, fingerprint_config
+from typing import Tuple, Dict, Any, List, Optional # Für Typ-Annotationen
 
 # Placeholder for holidays DataFrame (wie in der vorherigen Antwort)
 holidays_df = None
 
+MODEL_NAME = 'prophet'
+# Stan-Parameter des MAP-Fits, die als init für den nächsten Fit taugen (Skalare und Vektoren, je Form (1, n) in model.params)
+WARM_START_SCALARS = ['k', 'm', 'sigma_obs']
+WARM_START_VECTORS = ['delta', 'beta']
 
-def forecast_with_prophet(history_df: pd.DataFrame, periods: int, extra_regressors_df: pd.DataFrame = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+
+def forecast_with_prophet(history_df: pd.DataFrame, periods: int, extra_regressors_df: pd.DataFrame = None, cache_key: Optional[Tuple] = None,
+                          include_history: Optional[bool] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Prognose über `periods` Tage. Geliefert werden nur die Prognosetage; include_history=True (Standard aus
+    config.PROPHET_PREDICT_INCLUDE_HISTORY) liefert zusätzlich den In-Sample-Fit über die gesamte Historie.
+    """
     print(f"INFO (prophet_model): Starting Prophet Forecast for {periods} periods.")
+    if include_history is None:
+        include_history = config.PROPHET_PREDICT_INCLUDE_HISTORY
+
+    # Reihenfolge: prozesslokaler model_cache -> serialisiertes Modell im model_store -> Fit (ggf. mit Warm-Start).
+    cached = model_cache.get(cache_key) if cache_key is not None else None
+    served_from_store = False
+    stored_meta = None
+    if cached is None and cache_key is not None and (config.PROPHET_WARM_START or config.PROPHET_STORE_MODELS):
+        stored_meta = model_store.read_meta(cache_key[0], MODEL_NAME, cache_key[2])
+        cached = _load_stored_model(cache_key, stored_meta)
+        if cached is not None:
+            served_from_store = True
+            model_cache.put(cache_key, cached, _estimate_model_size(cached[0]))
+
+    if cached is not None:
+        source = "stored" if served_from_store else "cached"
+        print(f"INFO (prophet_model): Using {source} Prophet model for '{cache_key[0]}' (data and config unchanged). Skipping fit.")
+        model, actual_regressors_for_model, model_training_report = cached
+        extra_regressors_df_prepared = _prepare_extra_regressors(extra_regressors_df)
+        final_forecast_df = predict_prophet_model(model, periods, actual_regressors_for_model, extra_regressors_df_prepared, include_history=include_history,
+                                               residual_interval=model_training_report.get("residual_interval"))
+        return final_forecast_df, dict(model_training_report, served_from_cache=not served_from_store, served_from_store=served_from_store)
+
+    model, actual_regressors_for_model, extra_regressors_df_prepared, model_training_report = fit_prophet_model(
+        history_df, extra_regressors_df, warm_start_meta=stored_meta if config.PROPHET_WARM_START else None
+    )
+    if cache_key is not None:
+        if config.PROPHET_WARM_START or config.PROPHET_STORE_MODELS:
+            _save_prophet_artifacts(cache_key, model, actual_regressors_for_model, model_training_report)
+        model_cache.put(cache_key, (model, actual_regressors_for_model, model_training_report), _estimate_model_size(model))
+
+    final_forecast_df = predict_prophet_model(model, periods, actual_regressors_for_model, extra_regressors_df_prepared, include_history=include_history,
+                                               residual_interval=model_training_report.get("residual_interval"))
+    return final_forecast_df, dict(model_training_report, served_from_cache=False, served_from_store=False)
+
+
+def _estimate_model_size(model: Prophet) -> int:
+    size = int(model.history.memory_usage(deep=True).sum()) if model.history is not None else 0
+    for value in (model.params or {}).values():
+        size += getattr(value, 'nbytes', 0)
+    return size
+
+
+def warm_start_params(model: Prophet) -> Dict[str, Any]:
+    """Optimierte Parameter eines gefitteten Modells als JSON-taugliches Dict (Format von meta["params"])."""
+    params = {name: float(np.asarray(model.params[name])[0][0]) for name in WARM_START_SCALARS}
+    params.update({name: np.asarray(model.params[name])[0].tolist() for name in WARM_START_VECTORS})
+    return params
+
+
+def _save_prophet_artifacts(cache_key: Tuple, model: Prophet, actual_regressors_for_model: List[str],
+                            model_training_report: Dict[str, Any]) -> None:
+    """meta.json mit Parametern (Warm-Start) und Report; mit PROPHET_STORE_MODELS zusätzlich das ganze Modell als model.json."""
+    meta = {
+        "trained_at": datetime.now().isoformat(timespec='seconds'),
+        "data_fingerprint": cache_key[3],
+        "config_fingerprint": cache_key[4],
+        "regressors": actual_regressors_for_model,
+        "params": warm_start_params(model),
+        "report": model_training_report,
+    }
+    text_files = {}
+    if config.PROPHET_STORE_MODELS:
+        try:
+            text_files[model_store.PROPHET_MODEL_FILE] = model_to_json(model)
+        except Exception as e:
+            print(f"WARNING (prophet_model): Could not serialize Prophet model for '{cache_key[0]}': {e}")
+    model_store.save_json_artifacts(cache_key[0], MODEL_NAME, cache_key[2], meta, text_files=text_files)
+
+
+def _load_stored_model(cache_key: Tuple, stored_meta: Optional[Dict[str, Any]]) -> Optional[Tuple[Prophet, List[str], Dict[str, Any]]]:
+    """(model, regressoren, report) wie im model_cache, wenn model.json zu denselben Ist-Werten und derselben config gehört."""
+    if not config.PROPHET_STORE_MODELS or stored_meta is None:
+        return None
+    if stored_meta.get("data_fingerprint") != cache_key[3] or stored_meta.get("config_fingerprint") != cache_key[4]:
+        return None
+    model_json = model_store.read_text_artifact(cache_key[0], MODEL_NAME, cache_key[2], model_store.PROPHET_MODEL_FILE)
+    if model_json is None:
+        return None
+    try:
+        model = model_from_json(model_json)
+    except Exception as e:
+        print(f"WARNING (prophet_model): Could not deserialize stored Prophet model for '{cache_key[0]}': {e}")
+        return None
+    return model, stored_meta.get("regressors", []), stored_meta.get("report") or {}
+
+
+def _expected_changepoint_count(model: Prophet, history_df_prophet: pd.DataFrame) -> int:
+    # Gleiche Regel wie Prophet.set_changepoints: höchstens n_changepoints, begrenzt durch changepoint_range der
+    # Historie (ohne NaN in 'y'); ohne Changepoints bleibt ein einzelnes delta für den Zeitpunkt 0.
+    hist_size = int(np.floor(history_df_prophet['y'].notnull().sum() * model.changepoint_range))
+    return max(min(model.n_changepoints, hist_size - 1), 1)
+
 
+def _warm_start_init(warm_start_meta: Optional[Dict[str, Any]], actual_regressors_for_model: List[str],
+                     expected_changepoints: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(init, None) für model.fit(init=...) oder (None, grund) für einen Kaltstart."""
+    if not config.PROPHET_WARM_START:
+        return None, "disabled"
+    if warm_start_meta is None:
+        return None, "no_stored_params"
+    if warm_start_meta.get("config_fingerprint") != fingerprint_config(MODEL_NAME):
+        return None, "config_changed"
+    if warm_start_meta.get("regressors") != actual_regressors_for_model:
+        return None, "regressors_changed"
+    params = warm_start_meta.get("params") or {}
+    try:
+        init = {name: float(params[name]) for name in WARM_START_SCALARS}
+        init.update({name: np.asarray(params[name], dtype=float) for name in WARM_START_VECTORS})
+    except (KeyError, TypeError, ValueError):
+        return None, "invalid_metadata"
+    if len(init['delta']) != expected_changepoints:
+        return None, "changepoints_changed"
+    return init, None
+
+
+def _uncertainty_samples() -> int:
+    if config.PROPHET_UNCERTAINTY_MODE not in config.PROPHET_UNCERTAINTY_MODES:
+        raise ValueError(f"Prophet: Unknown PROPHET_UNCERTAINTY_MODE '{config.PROPHET_UNCERTAINTY_MODE}'. Allowed: {config.PROPHET_UNCERTAINTY_MODES}")
+    # 0 schaltet Prophets Simulation ab; 'residual' setzt die Grenzen anschließend selbst.
+    return int(config.PROPHET_UNCERTAINTY_SAMPLES) if config.PROPHET_UNCERTAINTY_MODE == 'sampling' else 0
+
+
+def compute_residual_interval(model: Prophet, actual_regressors_for_model: List[str]) -> Tuple[float, float]:
+    """
+    Unteres/oberes Quantil der In-Sample-Residuen (y - yhat) zur interval_width des Modells. Ein predict() über die
+    Historie ohne Sampling, also ein einziger vektorisierter Durchlauf; die Grenzen gelten für jeden Prognosetag.
+    """
+    history = model.history.dropna(subset=['y'])
+    in_sample = model.predict(history[['ds'] + actual_regressors_for_model])
+    residuals = history['y'].to_numpy(dtype=np.float64) - in_sample['yhat'].to_numpy(dtype=np.float64)
+    lower, upper = np.quantile(residuals, [(1.0 - model.interval_width) / 2, (1.0 + model.interval_width) / 2])
+    return float(lower), float(upper)
+
+
+def _prepare_extra_regressors(extra_regressors_df: pd.DataFrame = None) -> Optional[pd.DataFrame]:
+    if extra_regressors_df is None or extra_regressors_df.empty:
+        return None
+    extra_regressors_df_prepared = extra_regressors_df.copy()
+    if 'ds' not in extra_regressors_df_prepared.columns and isinstance(extra_regressors_df_prepared.index, pd.DatetimeIndex):
+        extra_regressors_df_prepared = extra_regressors_df_prepared.reset_index()
+
+    if 'ds' not in extra_regressors_df_prepared.columns:
+         raise ValueError("Prophet: extra_regressors_df must have a 'ds' column or a DatetimeIndex.")
+
+    if not pd.api.types.is_datetime64_any_dtype(extra_regressors_df_prepared['ds']):
+        extra_regressors_df_prepared['ds'] = pd.to_datetime(extra_regressors_df_prepared['ds'], errors='coerce')
+    if extra_regressors_df_prepared['ds'].dt.tz is not None:
+        extra_regressors_df_prepared['ds'] = extra_regressors_df_prepared['ds'].dt.tz_localize(None)
+    return extra_regressors_df_prepared
+
+
+def fit_prophet_model(history_df: pd.DataFrame, extra_regressors_df: pd.DataFrame = None,
+                      warm_start_meta: Optional[Dict[str, Any]] = None) -> Tuple[Prophet, List[str], Optional[pd.DataFrame], Dict[str, Any]]:
+    """
+    Fit eines neuen Prophet-Modells. warm_start_meta (gespeicherte Parameter aus model_store) dient als Stan-init, wenn
+    Konfiguration, Regressoren und Changepoint-Raster übereinstimmen. Passt die Anzahl der Saisonalitäts-Features (beta)
+    nicht, verwendet Prophet selbst die Standard-Startwerte; der Report weist das als Kaltstart aus.
+    """
     if history_df.empty:
         raise ValueError("Prophet: Empty DataFrame provided for training data.")
     required_cols = ['ds', 'y']
@@ -49,28 +221,17 @@ def forecast_with_prophet(history_df: pd.DataFrame, periods: int, extra_regresso
         weekly_seasonality='auto',
         yearly_seasonality='auto',
         seasonality_mode=config.PROPHET_SEASONALITY_MODE,
-        holidays=holidays_df
+        holidays=holidays_df,
+        uncertainty_samples=_uncertainty_samples()
     )
 
     potential_regressors_in_history = [
         col for col in history_df_prophet.columns if col not in ['ds', 'y', 'cap', 'floor']
     ]
     actual_regressors_for_model = []
-    extra_regressors_df_prepared = None
-
-    if extra_regressors_df is not None and not extra_regressors_df.empty:
-        extra_regressors_df_prepared = extra_regressors_df.copy()
-        if 'ds' not in extra_regressors_df_prepared.columns and isinstance(extra_regressors_df_prepared.index, pd.DatetimeIndex):
-            extra_regressors_df_prepared = extra_regressors_df_prepared.reset_index()
-
-        if 'ds' not in extra_regressors_df_prepared.columns:
-             raise ValueError("Prophet: extra_regressors_df must have a 'ds' column or a DatetimeIndex.")
-
-        if not pd.api.types.is_datetime64_any_dtype(extra_regressors_df_prepared['ds']):
-            extra_regressors_df_prepared['ds'] = pd.to_datetime(extra_regressors_df_prepared['ds'], errors='coerce')
-        if extra_regressors_df_prepared['ds'].dt.tz is not None:
-            extra_regressors_df_prepared['ds'] = extra_regressors_df_prepared['ds'].dt.tz_localize(None)
+    extra_regressors_df_prepared = _prepare_extra_regressors(extra_regressors_df)
 
+    if extra_regressors_df_prepared is not None:
         for regressor_name in potential_regressors_in_history:
             if regressor_name in extra_regressors_df_prepared.columns:
                 if not pd.api.types.is_numeric_dtype(history_df_prophet[regressor_name]):
@@ -88,16 +249,28 @@ def forecast_with_prophet(history_df: pd.DataFrame, periods: int, extra_regresso
                 except Exception as e_reg:
                     print(f"WARNING (prophet_model): Error adding regressor '{regressor_name}': {e_reg}. Skipping.")
 
-    print("INFO (prophet_model): Fitting Prophet model...")
+    warm_start_init, warm_start_reason = _warm_start_init(
+        warm_start_meta, actual_regressors_for_model, _expected_changepoint_count(model, history_df_prophet)
+    )
+    fit_kwargs = {"init": warm_start_init} if warm_start_init is not None else {}
+
+    print(f"INFO (prophet_model): Fitting Prophet model ({'warm start' if warm_start_init is not None else f'cold start: {warm_start_reason}'})...")
+    fit_start = time.perf_counter()
     try:
         # Prophet doesn't return a direct 'loss' like Keras during fit
-        model.fit(history_df_prophet)
+        model.fit(history_df_prophet, **fit_kwargs)
         training_loss_info = "N/A (Prophet does not expose direct training loss like Keras)"
     except Exception as fit_err:
         print(f"ERROR (prophet_model): Error during Prophet model.fit(): {fit_err}")
         traceback.print_exc()
         raise ValueError(f"Prophet model.fit() failed: {fit_err}")
-    print("INFO (prophet_model): Fitting complete.")
+    fit_seconds = time.perf_counter() - fit_start
+    print(f"INFO (prophet_model): Fitting complete in {fit_seconds:.2f} s.")
+    if warm_start_init is not None and any(
+        np.asarray(model.params[name])[0].shape != warm_start_init[name].shape for name in WARM_START_VECTORS
+    ):
+        warm_start_init, warm_start_reason = None, "seasonalities_changed"
+    interval = compute_residual_interval(model, actual_regressors_for_model) if config.PROPHET_UNCERTAINTY_MODE == 'residual' else None
 
     model_training_report = {
         "changepoint_prior_scale_used": model.changepoint_prior_scale,
@@ -109,15 +282,26 @@ def forecast_with_prophet(history_df: pd.DataFrame, periods: int, extra_regresso
         "active_regressors": actual_regressors_for_model,
         "daily_seasonality_setting": config.PROPHET_DAILY_SEASONALITY,
         "training_loss": training_loss_info, # Placeholder
-        "validation_loss": None # Not applicable for Prophet's direct fit method
+        "validation_loss": None, # Not applicable for Prophet's direct fit method
+        "fit_seconds": round(fit_seconds, 3),
+        "warm_start": warm_start_init is not None,
+        "warm_start_reason": warm_start_reason,
+        "uncertainty_mode": config.PROPHET_UNCERTAINTY_MODE,
+        "uncertainty_samples": model.uncertainty_samples,
+        "residual_interval": interval,
     }
     if holidays_df is not None:
         model_training_report["holidays_configured_count"] = len(holidays_df)
     else:
         model_training_report["holidays_configured_count"] = 0
 
-    print(f"INFO (prophet_model): Creating future DataFrame for {periods} periods...")
-    future_df = model.make_future_dataframe(periods=periods, freq='D')
+    return model, actual_regressors_for_model, extra_regressors_df_prepared, model_training_report
+
+
+def predict_prophet_model(model: Prophet, periods: int, actual_regressors_for_model: List[str], extra_regressors_df_prepared: Optional[pd.DataFrame],
+                          include_history: bool = False, residual_interval: Optional[Tuple[float, float]] = None) -> pd.DataFrame:
+    print(f"INFO (prophet_model): Creating future DataFrame for {periods} periods{' (including history)' if include_history else ''}...")
+    future_df = model.make_future_dataframe(periods=periods, freq='D', include_history=False)
 
     if actual_regressors_for_model and extra_regressors_df_prepared is not None:
         columns_to_select_from_extra = ['ds'] + [
@@ -138,6 +322,12 @@ def forecast_with_prophet(history_df: pd.DataFrame, periods: int, extra_regresso
              if regressor not in future_df.columns:
                 future_df[regressor] = 0
 
+    if include_history:
+        # In-Sample-Zeilen mit den Regressoren, mit denen das Modell trainiert wurde (model.history). extra_regressors_df_prepared
+        # deckt nur die Prognosetage ab; ffill/bfill würde deren Werte (Wochentag, Saison) auf die ganze Historie kopieren.
+        history_rows = model.history[['ds'] + [reg for reg in actual_regressors_for_model if reg in model.history.columns]]
+        future_df = pd.concat([history_rows, future_df[[col for col in history_rows.columns if col in future_df.columns]]], ignore_index=True)
+
     print("INFO (prophet_model): Generating forecast...")
     try:
         forecast_df_output = model.predict(future_df)
@@ -147,8 +337,11 @@ def forecast_with_prophet(history_df: pd.DataFrame, periods: int, extra_regresso
         raise ValueError(f"Prophet model.predict() failed: {pred_err}. Check regressors in future_df.")
 
     print("INFO (prophet_model): Forecast complete.")
+    if residual_interval is not None:
+        forecast_df_output['yhat_lower'] = forecast_df_output['yhat'] + residual_interval[0]
+        forecast_df_output['yhat_upper'] = forecast_df_output['yhat'] + residual_interval[1]
 
     output_columns = ['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'trend']
     final_forecast_df = forecast_df_output[[col for col in output_columns if col in forecast_df_output.columns]].copy()
 
-    return final_forecast_df, model_training_report
\ No newline at end of file
+    return final_forecast_df
\ No newline at end of file
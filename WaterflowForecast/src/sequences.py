@@ -0,0 +1,39 @@
+# src/sequences.py
+# Aufbau der LSTM-Trainingsfenster (look_back Zeitschritte x Features -> nächster Zielwert). Ohne TensorFlow-Abhängigkeit.
+import numpy as np
+from typing import Tuple # Für Typ-Annotationen
+
+
+def sliding_window_sequences(input_data: np.ndarray, target_data: np.ndarray, look_back: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    LSTM-Trainingsfenster als schreibgeschützte Strided-View auf input_data:
+    X[i] = input_data[i:i+look_back], y[i] = target_data[i+look_back]. Es wird nichts kopiert.
+    """
+    if input_data.ndim == 1:
+        input_data = input_data.reshape(-1, 1)
+    if target_data.ndim == 2:
+        target_data = target_data[:, 0]
+    n_samples = len(input_data) - look_back
+    if n_samples <= 0:
+        return np.empty((0, look_back, input_data.shape[1]), dtype=input_data.dtype), np.empty((0,), dtype=target_data.dtype)
+    # Form (n - look_back + 1, look_back, n_features); das letzte Fenster hat keinen Zielwert mehr.
+    windows = np.lib.stride_tricks.sliding_window_view(input_data, look_back, axis=0).transpose(0, 2, 1)
+    return windows[:n_samples], target_data[look_back:]
+
+
+def multi_horizon_window_sequences(input_data: np.ndarray, target_data: np.ndarray, look_back: int, horizon: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fenster für direkte Mehrschritt-Prognosen: X[i] = input_data[i:i+look_back], Y[i] = target_data[i+look_back:i+look_back+horizon].
+    Beide Rückgaben sind Strided-Views (keine Kopie).
+    """
+    if input_data.ndim == 1:
+        input_data = input_data.reshape(-1, 1)
+    if target_data.ndim == 2:
+        target_data = target_data[:, 0]
+    n_samples = len(input_data) - look_back - horizon + 1
+    if n_samples <= 0:
+        return np.empty((0, look_back, input_data.shape[1]), dtype=input_data.dtype), np.empty((0, horizon), dtype=target_data.dtype)
+    windows = np.lib.stride_tricks.sliding_window_view(input_data, look_back, axis=0).transpose(0, 2, 1)
+    targets = np.lib.stride_tricks.sliding_window_view(target_data, horizon)
+    return windows[:n_samples], targets[look_back:look_back + n_samples]
+
@@ -0,0 +1,161 @@
+# src/serialization.py
+# Antwortformate für Zeitreihen (Historie, Prognosen) mit Content Negotiation.
+#   records  - Liste von Objekten je Punkt (Standard, Format des DPA-Dashboards)
+#   columns  - {"date": [...], "actual": [...]} als kompaktes JSON direkt aus NumPy-Arrays
+#   msgpack  - wie columns, binär (MessagePack)
+#   arrow    - Apache Arrow IPC-Stream; Zusatzfelder (message, model_training_report, ...) stehen in den Schema-Metadaten
+# orjson, msgpack und pyarrow sind optional: ohne orjson wird auf json zurückgefallen, ohne msgpack/pyarrow gibt es 406.
+# pyarrow wird erst bei der ersten Arrow-Antwort importiert (Kaltstart des API-Workers).
+import json
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence # Für Typ-Annotationen
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+_pyarrow = None # None = noch nicht versucht, False = nicht installiert
+
+
+def _load_pyarrow():
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc
+            _pyarrow = pyarrow
+        except ImportError:
+            _pyarrow = False
+    return _pyarrow or None
+
+RESPONSE_FORMATS = ['records', 'columns', 'msgpack', 'arrow']
+MEDIA_TYPES = {
+    'records': 'application/json',
+    'columns': 'application/vnd.waterflow.columns+json',
+    'msgpack': 'application/msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+_FORMAT_BY_MEDIA_TYPE = {media_type: fmt for fmt, media_type in MEDIA_TYPES.items()}
+_FORMAT_BY_MEDIA_TYPE.update({'application/x-msgpack': 'msgpack', 'application/*': 'records', '*/*': 'records'})
+
+Table = Dict[str, Sequence] # Spaltenname -> Liste oder NumPy-Array, alle gleich lang
+
+
+class UnsupportedFormatError(Exception):
+    """Angefordertes Format ist unbekannt oder die optionale Bibliothek dafür fehlt; api.py antwortet mit 406."""
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.status_code = 406
+        self.detail = detail
+
+
+def negotiate_format(accept_header: Optional[str], requested_format: Optional[str] = None) -> str:
+    """Ein expliziter ?format=-Parameter hat Vorrang, sonst entscheidet der Accept-Header (q-Werte werden beachtet)."""
+    if requested_format:
+        if requested_format not in RESPONSE_FORMATS:
+            raise UnsupportedFormatError(f"Unbekanntes Antwortformat '{requested_format}'. Erlaubt: {RESPONSE_FORMATS}")
+        return requested_format
+    if not accept_header:
+        return 'records'
+    candidates = []
+    for position, part in enumerate(accept_header.split(',')):
+        media_type, *params = [p.strip() for p in part.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try: quality = float(param[2:])
+                except ValueError: quality = 0.0
+        if quality > 0 and media_type.lower() in _FORMAT_BY_MEDIA_TYPE:
+            candidates.append((-quality, position, _FORMAT_BY_MEDIA_TYPE[media_type.lower()]))
+    return min(candidates)[2] if candidates else 'records'
+
+
+def _to_json_list(column: Sequence) -> List[Any]:
+    """Spalte als Python-Liste; NaN wird zu None."""
+    if isinstance(column, np.ndarray):
+        values = column.tolist()
+        if column.dtype.kind == 'f':
+            return [None if v != v else v for v in values]
+        return values
+    return list(column)
+
+
+def table_to_records(table: Table) -> List[Dict[str, Any]]:
+    if not table:
+        return []
+    names = list(table.keys())
+    return [dict(zip(names, row)) for row in zip(*(_to_json_list(table[name]) for name in names))]
+
+
+def forecast_payload_to_records(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Payload aus forecast_service.run_forecast (forecast_data spaltenweise) in das bisherige records-Format bringen."""
+    if isinstance(payload, dict) and isinstance(payload.get("forecast_data"), dict):
+        return dict(payload, forecast_data=table_to_records(payload["forecast_data"]))
+    return payload
+
+
+def dumps_json_text(content: Any) -> str:
+    """JSON-Text mit NumPy-Unterstützung, z.B. für Job-Ergebnisse in der Tabelle 'jobs' (database.finish_job)."""
+    return _dumps_json(content).decode('utf-8')
+
+
+def _dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return _to_json_list(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _wrap(table_content: Any, meta: Optional[Dict[str, Any]], table_key: Optional[str]) -> Any:
+    if table_key is None:
+        return table_content
+    return dict(meta or {}, **{table_key: table_content})
+
+
+def _encode_arrow(pa, table: Table, meta: Optional[Dict[str, Any]]) -> bytes:
+    arrays = {name: pa.array(column, from_pandas=True) for name, column in table.items()} # from_pandas: NaN -> null
+    arrow_table = pa.table(arrays) if arrays else pa.table({})
+    if meta:
+        arrow_table = arrow_table.replace_schema_metadata({"meta": _dumps_json(meta)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue().to_pybytes()
+
+
+def render_table_response(table: Table, response_format: str, meta: Optional[Dict[str, Any]] = None, table_key: Optional[str] = None,
+                          status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serialisiert eine spaltenweise Tabelle im gewünschten Format. Ohne table_key ist die Tabelle selbst die Antwort,
+    sonst wird sie unter table_key neben die Felder aus meta gelegt (z.B. forecast_data + message).
+    """
+    table = table or {}
+    if response_format == 'records':
+        body = _dumps_json(_wrap(table_to_records(table), meta, table_key))
+    elif response_format == 'columns':
+        body = _dumps_json(_wrap(table, meta, table_key))
+    elif response_format == 'msgpack':
+        if msgpack is None:
+            raise UnsupportedFormatError("MessagePack ist auf dem Server nicht verfügbar (Paket 'msgpack' fehlt).")
+        columns = {name: _to_json_list(column) for name, column in table.items()}
+        body = msgpack.packb(_wrap(columns, meta, table_key), use_bin_type=True, default=_json_default)
+    elif response_format == 'arrow':
+        pa = _load_pyarrow()
+        if pa is None:
+            raise UnsupportedFormatError("Apache Arrow ist auf dem Server nicht verfügbar (Paket 'pyarrow' fehlt).")
+        body = _encode_arrow(pa, table, meta)
+    else:
+        raise UnsupportedFormatError(f"Unbekanntes Antwortformat '{response_format}'. Erlaubt: {RESPONSE_FORMATS}")
+    return Response(content=body, status_code=status_code, media_type=MEDIA_TYPES[response_format], headers=headers)
@@ -1,309 +1,183 @@
-import pandas as pd
-import numpy as np
-import os
-import datetime
-import time
-import matplotlib.pyplot as plt
-from prophet import Prophet
-
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Input, Dropout
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-
-OUTPUT_DIRECTORY = "data/synthetic"
-RESULTS_DIR = "results/model_comparison"
-FIGURES_DIR = os.path.join(RESULTS_DIR, "figures")
-TRAIN_TEST_SPLIT_DAYS = 30
-
-PROPHET_WINS_CONFIG = {
-    "filename": "synthetic_data_prophet_wins.csv", "start_date": "2020-01-01", "end_date": "2024-12-31",
-    "base_level": 500, "noise_std": 15, "min_val": 0, "max_val": 1000,
-    "trend_segments": [{"slope": 0.1, "until": "2021-06-30"}, {"slope": -0.05, "until": "2023-01-31"}, {"slope": 0.2, "until": "2024-12-31"}],
-    "yearly_amp": 150, "weekly_amp": 50, "daily_amp": 10,
-    "holidays": [{"date": "12-25", "effect": 100}, {"dayofweek": 0, "effect": -30}],
-    "outlier_pct": 0.01, "outlier_mag": 200
-}
-
-LSTM_WINS_CONFIG = {
-    "filename": "synthetic_data_lstm_wins.csv", "start_date": "2020-01-01", "end_date": "2024-12-31",
-    "base_level": 300, "noise_std": 5, "min_val": 0, "max_val": 1000,
-    "logistic_k": 700, "logistic_m": 1000, "logistic_b": 0.01,
-    "complex_season_period": 90, "complex_season_base_amp": 30,
-    "lag_1_coeff": 0.6, "lag_long_coeff": 0.3, "lag_long_days": 45
-}
-
-def generate_prophet_wins_data(config, output_dir):
-    dates = pd.date_range(start=config['start_date'], end=config['end_date'], freq='D')
-    num_days = len(dates)
-    days_elapsed = np.arange(num_days)
-    values = np.zeros(num_days) + config['base_level']
-    current_trend_val = 0
-    last_segment_end_day = -1
-    start_date_dt = pd.to_datetime(config['start_date'])
-    for segment in config['trend_segments']:
-        segment_end_date = pd.to_datetime(segment['until'])
-        segment_end_day = (segment_end_date - start_date_dt).days
-        start_index = last_segment_end_day + 1
-        end_index = segment_end_day + 1
-        if start_index < num_days and start_index < end_index:
-             actual_end_index = min(end_index, num_days)
-             segment_indices = np.arange(start_index, actual_end_index)
-             segment_len = len(segment_indices)
-             if segment_len > 0:
-                 segment_days = np.arange(segment_len)
-                 values[segment_indices] += current_trend_val + segment['slope'] * segment_days
-                 current_trend_val += segment['slope'] * (segment_len -1) if segment_len > 1 else segment['slope'] * 0
-                 last_segment_end_day = actual_end_index -1
-    day_of_year = dates.dayofyear
-    day_of_week = dates.dayofweek
-    values += config['yearly_amp'] * np.sin(2 * np.pi * day_of_year / 365.25)
-    values += config['weekly_amp'] * np.sin(2 * np.pi * day_of_week / 7)
-    for holiday in config['holidays']:
-        if 'date' in holiday:
-            month_day = dates.strftime('%m-%d')
-            values[month_day == holiday['date']] += holiday['effect']
-        elif 'dayofweek' in holiday:
-             values[day_of_week == holiday['dayofweek']] += holiday['effect']
-    values += np.random.normal(0, config['noise_std'], num_days)
-    num_outliers = int(config['outlier_pct'] * num_days)
-    if num_outliers > 0:
-        outlier_indices = np.random.choice(num_days, num_outliers, replace=False)
-        outlier_noise = np.random.choice([-1, 1], num_outliers) * config['outlier_mag']
-        values[outlier_indices] += outlier_noise
-    values = np.clip(values, config['min_val'], config['max_val'])
-    df = pd.DataFrame({'Date': dates, 'Value': values})
-    df['Value'] = df['Value'].round(2)
-    save_path = os.path.join(output_dir, config['filename'])
-    os.makedirs(output_dir, exist_ok=True)
-    df.to_csv(save_path, index=False, sep=';')
-    return df
-
-def generate_lstm_wins_data(config, output_dir):
-    dates = pd.date_range(start=config['start_date'], end=config['end_date'], freq='D')
-    num_days = len(dates)
-    days_elapsed = np.arange(num_days)
-    values = np.zeros(num_days)
-    trend = config['base_level'] + config['logistic_k'] / (1 + np.exp(-config['logistic_b'] * (days_elapsed - config['logistic_m'])))
-
-    complex_seasonality = np.zeros(num_days)
-    for t in range(num_days):
-        period_phase = (t % config['complex_season_period']) / config['complex_season_period']
-        current_amp = config['complex_season_base_amp'] * (1 + 0.2 * (trend[t] - config['base_level']) / config['logistic_k'])
-        complex_seasonality[t] = current_amp * (2 * period_phase - 1) if period_phase < 0.5 else current_amp * (1 - 2 * (period_phase - 0.5))
-
-    lag1 = config['lag_1_coeff']
-    lagL = config['lag_long_coeff']
-    lagL_days = config['lag_long_days']
-    noise_std = config['noise_std']
-    values[:lagL_days] = trend[:lagL_days] + complex_seasonality[:lagL_days] + np.random.normal(0, noise_std * 5, lagL_days)
-    for t in range(lagL_days, num_days):
-        ar_component = lag1 * values[t-1] + lagL * values[t-lagL_days]
-        deterministic_part = trend[t] + complex_seasonality[t]
-        noise = np.random.normal(0, noise_std)
-        values[t] = 0.5 * ar_component + 0.5 * deterministic_part + noise
-    values = np.clip(values, config['min_val'], config['max_val'])
-    df = pd.DataFrame({'Date': dates, 'Value': values})
-    df['Value'] = df['Value'].round(2)
-    save_path = os.path.join(output_dir, config['filename'])
-    os.makedirs(output_dir, exist_ok=True)
-    df.to_csv(save_path, index=False, sep=';')
-    return df
-
-def run_comparison(df, dataset_label):
-    os.makedirs(FIGURES_DIR, exist_ok=True)
-    df['Date'] = pd.to_datetime(df['Date'])
-    split_date = df['Date'].max() - pd.Timedelta(days=TRAIN_TEST_SPLIT_DAYS -1)
-    df_train_orig = df[df['Date'] < split_date].copy()
-    df_test_orig = df[df['Date'] >= split_date].copy()
-    actual_values = df_test_orig['Value'].values
-
-    prophet_train_df = df_train_orig[['Date', 'Value']].rename(columns={'Date': 'ds', 'Value': 'y'})
-    prophet_model = Prophet(daily_seasonality='auto')
-    prophet_model.fit(prophet_train_df)
-    future_df = prophet_model.make_future_dataframe(periods=TRAIN_TEST_SPLIT_DAYS, freq='D')
-    prophet_forecast_df = prophet_model.predict(future_df)
-    prophet_forecast = prophet_forecast_df['yhat'][-TRAIN_TEST_SPLIT_DAYS:].values
-
-    lstm_forecast = np.full(TRAIN_TEST_SPLIT_DAYS, np.nan)
-    LOOK_BACK = 60
-    df_diff = df.set_index('Date').copy()
-    df_diff['Value_diff'] = df_diff['Value'].diff()
-    df_diff = df_diff.dropna()
-    df_train_diff = df_diff[df_diff.index < split_date]
-    last_actual_train_value = df_train_orig['Value'].iloc[-1]
-    if len(df_train_diff) > LOOK_BACK + TRAIN_TEST_SPLIT_DAYS:
-        scaler = MinMaxScaler(feature_range=(-1, 1))
-        scaled_data_train_diff = scaler.fit_transform(df_train_diff[['Value_diff']])
-        n_features = 1
-        X, y = [], []
-        for i in range(LOOK_BACK, len(scaled_data_train_diff)):
-            X.append(scaled_data_train_diff[i-LOOK_BACK:i, 0])
-            y.append(scaled_data_train_diff[i, 0])
-        X, y = np.array(X), np.array(y)
-        X = np.reshape(X, (X.shape[0], X.shape[1], n_features))
-        val_split_index = int(len(X) * 0.9)
-        X_train, X_val = X[:val_split_index], X[val_split_index:]
-        y_train, y_val = y[:val_split_index], y[val_split_index:]
-
-        tf.keras.backend.clear_session()
-        lstm_model = Sequential([
-            Input(shape=(LOOK_BACK, n_features)),
-            LSTM(75, return_sequences=True),
-            Dropout(0.2),
-            LSTM(35, return_sequences=False),
-            Dropout(0.2),
-            Dense(1)
-        ])
-        lstm_model.compile(optimizer='adam', loss='mean_squared_error')
-
-        early_stopping = EarlyStopping(monitor='val_loss', patience=25, restore_best_weights=True, verbose=1)
-        reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.2, patience=10, min_lr=1e-6, verbose=1)
-
-        lstm_model.fit(X_train, y_train, epochs=300, batch_size=32, validation_data=(X_val, y_val),
-                        callbacks=[early_stopping, reduce_lr], verbose=1, shuffle=False)
-
-        last_sequence_scaled_diff = scaled_data_train_diff[-LOOK_BACK:]
-        current_batch_scaled_diff = last_sequence_scaled_diff.reshape((1, LOOK_BACK, n_features))
-        future_predictions_scaled_diff = []
-        for _ in range(TRAIN_TEST_SPLIT_DAYS):
-            pred_scaled_diff = lstm_model.predict(current_batch_scaled_diff, verbose=0)[0, 0]
-            future_predictions_scaled_diff.append(pred_scaled_diff)
-            next_input_step_scaled_diff = np.reshape(pred_scaled_diff, (1, 1, n_features))
-            current_batch_scaled_diff = np.append(current_batch_scaled_diff[:, 1:, :], next_input_step_scaled_diff, axis=1)
-
-        predicted_diffs = scaler.inverse_transform(np.array(future_predictions_scaled_diff).reshape(-1, 1)).flatten()
-        lstm_forecast[0] = last_actual_train_value + predicted_diffs[0]
-        for i in range(1, TRAIN_TEST_SPLIT_DAYS):
-            lstm_forecast[i] = lstm_forecast[i-1] + predicted_diffs[i]
-
-        lstm_forecast = lstm_forecast.round(2)
-
-    metrics = {}
-    mae_prophet = mean_absolute_error(actual_values, prophet_forecast)
-    rmse_prophet = np.sqrt(mean_squared_error(actual_values, prophet_forecast))
-    metrics['Prophet'] = {'MAE': mae_prophet, 'RMSE': rmse_prophet}
-
-    if not np.isnan(lstm_forecast).any():
-        mae_lstm = mean_absolute_error(actual_values, lstm_forecast)
-        rmse_lstm = np.sqrt(mean_squared_error(actual_values, lstm_forecast))
-        metrics['LSTM'] = {'MAE': mae_lstm, 'RMSE': rmse_lstm}
-
-    plt.figure(figsize=(14, 7))
-    plt.plot(df_test_orig['Date'], actual_values, label='Actual', color='black', linewidth=2)
-    plt.plot(df_test_orig['Date'], prophet_forecast, label=f'Prophet (MAE: {mae_prophet:.2f})', color='blue', linestyle='--')
-    if not np.isnan(lstm_forecast).any():
-        plt.plot(df_test_orig['Date'], lstm_forecast, label=f'LSTM (MAE: {mae_lstm:.2f})', color='red', linestyle=':')
-
-    plt.title(f'Model Comparison on: {dataset_label}')
-    plt.xlabel('Date')
-    plt.ylabel('Value')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plot_path = os.path.join(FIGURES_DIR, f"comparison_{dataset_label.replace(' ', '_')}.png")
-    plt.savefig(plot_path)
-    plt.close()
-
-if __name__ == "__main__":
-    start_run_time = time.time()
-    os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
-
-    df_prophet_wins = generate_prophet_wins_data(PROPHET_WINS_CONFIG, OUTPUT_DIRECTORY)
-    run_comparison(df_prophet_wins, "Prophet Wins Data")
-
-    df_lstm_wins = generate_lstm_wins_data(LSTM_WINS_CONFIG, OUTPUT_DIRECTORY)
-    run_comparison(df_lstm_wins, "LSTM Wins Data")
-
-    end_run_time = time.time()
-    print(f"\n--- Full script finished in {end_run_time - start_run_time:.2f} seconds ---")
-
 # src/tf_keras_model.py
 import pandas as pd
 import numpy as np
 import os
+import time
+from datetime import datetime
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2') # Vor dem ersten TensorFlow-Import setzen
 from sklearn.preprocessing import MinMaxScaler
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Input, Dropout
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+from tensorflow.keras.optimizers import Adam
 import tensorflow as tf
-from src import config
-from src.data_loader import add_features # Used to generate features, including iteratively
-from typing import Tuple, Dict, Any
-
-def create_multivariate_sequences(input_data: np.ndarray, target_data: np.ndarray, look_back: int):
-    X, y = [], []
-    if input_data.ndim == 1: # Ensure input_data is 2D
-        input_data = input_data.reshape(-1,1)
-    if target_data.ndim == 1:
-        target_data = target_data.reshape(-1,1) # target_data also as 2D for consistency
-
-    if len(input_data) <= look_back: # Not enough data for one sequence
-        return np.array(X), np.array(y) # Return empty arrays
-
-    for i in range(len(input_data) - look_back): # target_data[i + look_back] is the y-value
-        X.append(input_data[i:(i + look_back), :]) # All features for the lookback period
-        y.append(target_data[i + look_back, 0])    # Only the target value (first column of target_data)
-    return np.array(X), np.array(y)
+from src import config, model_store
+from src.lstm_inference import prepare_lstm_input, recursive_forecast, direct_forecast # TF-freie Teile, auch für das NumPy-Serving
+from src.numpy_lstm import NumpyLSTMModel, export_npz, max_abs_difference
+from src.model_cache import model_cache
+from src.sequences import sliding_window_sequences, multi_horizon_window_sequences
+from typing import Tuple, Dict, Any, List, Optional
+
+
+def configure_tf_threading():
+    """
+    Thread-Pools von TensorFlow je Prozess begrenzen (config.TF_INTRA_OP_THREADS / TF_INTER_OP_THREADS). Ohne Begrenzung
+    nimmt jeder Worker des Prozess-Pools alle Kerne und parallele Trainings verdrängen sich gegenseitig.
+    Muss vor der ersten TensorFlow-Operation laufen, deshalb Aufruf direkt beim Import dieses Moduls.
+    """
+    intra_op_threads = config.TF_INTRA_OP_THREADS
+    if intra_op_threads is None:
+        intra_op_threads = max(1, (os.cpu_count() or 1) // max(1, config.FORECAST_JOB_WORKERS))
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(config.TF_INTER_OP_THREADS)
+        print(f"INFO (tf_keras_model): TensorFlow threads: intra_op={intra_op_threads}, inter_op={config.TF_INTER_OP_THREADS} (0 = TF default).")
+    except RuntimeError as e: # TensorFlow wurde in diesem Prozess bereits initialisiert
+        print(f"WARN (tf_keras_model): Could not set TensorFlow thread pools: {e}")
+
+
+configure_tf_threading()
+
+
+def make_window_dataset(scaled_data_np: np.ndarray, targets: np.ndarray, start: int, count: int, batch_size: int) -> tf.data.Dataset:
+    """
+    tf.data-Pipeline über die Fenster start .. start+count-1: Fenster i = scaled_data_np[i:i+look_back], Ziel = targets[i]
+    (targets wie aus make_training_windows). Im Speicher liegt nur die Basisreihe; jeder Batch entsteht per tf.gather
+    über (Batch x look_back)-Indizes neu, ohne den kompletten Fenster-Tensor. cache() nur mit config.LSTM_DATASET_CACHE.
+    prefetch() bereitet den nächsten Batch vor, während der aktuelle trainiert wird. Reihenfolge bleibt chronologisch.
+    """
+    look_back = config.LSTM_LOOK_BACK
+    series = tf.constant(np.asarray(scaled_data_np[start:start + count + look_back - 1], dtype=np.float32))
+    batch_targets = tf.constant(np.ascontiguousarray(targets[start:start + count], dtype=np.float32))
+    offsets = tf.range(look_back, dtype=tf.int64)
+
+    def window_batch(batch_start):
+        sample_index = tf.range(batch_start, tf.minimum(batch_start + batch_size, count))
+        return tf.gather(series, sample_index[:, None] + offsets[None, :]), tf.gather(batch_targets, sample_index)
+
+    dataset = tf.data.Dataset.range(0, count, batch_size).map(window_batch)
+    if config.LSTM_DATASET_CACHE:
+        dataset = dataset.cache()
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def forecast_with_tensorflow(history_df_with_all_features: pd.DataFrame, periods: int, cache_key: Optional[Tuple] = None,
+                             mode: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    mode: 'recursive' oder 'direct' (siehe config.LSTM_FORECAST_MODE); None = Konfigurationswert.
+    Reihenfolge bei gesetztem cache_key: Modell-Cache -> gespeicherte Artefakte (Warm-Start, model_store.py) -> Volltraining.
+    """
+    mode = mode or config.LSTM_FORECAST_MODE
+    if mode not in config.LSTM_FORECAST_MODES:
+        raise ValueError(f"TF: Unknown LSTM forecast mode '{mode}'. Allowed: {config.LSTM_FORECAST_MODES}")
+    if mode == 'direct' and periods > config.LSTM_DIRECT_HORIZON:
+        raise ValueError(f"TF: Direct mode predicts at most LSTM_DIRECT_HORIZON={config.LSTM_DIRECT_HORIZON} days, requested {periods}.")
+    print(f"INFO (tf_keras_model): Starting TensorFlow/Keras Forecast for {periods} periods (mode: {mode}).")
+
+    trained = model_cache.get(cache_key) if cache_key is not None else None
+    served_from_cache = trained is not None
+    if served_from_cache:
+        print(f"INFO (tf_keras_model): Using cached LSTM model and scaler for '{cache_key[0]}' (data and config unchanged). Skipping training.")
+    else:
+        if cache_key is not None and config.LSTM_WARM_START:
+            trained = load_or_train_lstm_model(history_df_with_all_features, mode, cache_key)
+        else:
+            trained = train_lstm_model(history_df_with_all_features, mode=mode)
+        if cache_key is not None:
+            model_cache.put(cache_key, trained, _estimate_trained_size(trained))
+
+    if trained["mode"] == 'direct':
+        forecast_df, inference_stats = predict_direct_lstm(trained, periods)
+    else:
+        forecast_df, inference_stats = predict_with_trained_lstm(trained, periods)
+    return forecast_df, dict(trained["report"], served_from_cache=served_from_cache, **inference_stats)
+
+
+def get_predictor(trained: Dict[str, Any]):
+    """
+    Kompilierter Forward-Pass für genau ein Fenster (1 x look_back x Features, float32). Wird einmal pro trainiertem
+    Modell per tf.function mit fester input_signature getraced und im Modell-Bundle abgelegt, damit alle Schritte
+    und alle Requests auf demselben Graphen laufen; model.predict baut dagegen bei jedem Aufruf Adapter und Callbacks neu auf.
+    """
+    predictor = trained.get("predictor")
+    if predictor is None:
+        model = trained["model"]
+        input_spec = tf.TensorSpec(shape=(1, config.LSTM_LOOK_BACK, len(trained["features"])), dtype=tf.float32)
+        predictor = tf.function(lambda window: model(window, training=False), input_signature=[input_spec])
+        trained["predictor"] = predictor
+    return predictor
+
+
+def build_lstm_model(n_features: int, output_steps: int = 1) -> Sequential:
+    model = Sequential()
+    model.add(Input(shape=(config.LSTM_LOOK_BACK, n_features)))
+    model.add(LSTM(config.LSTM_UNITS_L1, return_sequences=(True if config.LSTM_UNITS_L2 > 0 else False)))
+    model.add(Dropout(config.LSTM_DROPOUT))
+    if config.LSTM_UNITS_L2 > 0:
+        model.add(LSTM(config.LSTM_UNITS_L2, return_sequences=False))
+        model.add(Dropout(config.LSTM_DROPOUT))
+    model.add(Dense(output_steps))
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
 
-def forecast_with_tensorflow(history_df_with_all_features: pd.DataFrame, periods: int) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-    print(f"INFO (tf_keras_model): Starting TensorFlow/Keras Forecast for {periods} periods.")
 
-    df_for_model = history_df_with_all_features.copy()
+def _estimate_trained_size(trained: Dict[str, Any]) -> int:
+    weights_size = sum(weight.nbytes for weight in trained["model"].get_weights())
+    return int(weights_size + trained["scaled_data"].nbytes + trained["history_df"].memory_usage(deep=True).sum())
 
-    if config.DATE_COLUMN not in df_for_model.columns or config.TARGET_COLUMN not in df_for_model.columns:
-        raise ValueError(f"TF: Input DataFrame must contain '{config.DATE_COLUMN}' and '{config.TARGET_COLUMN}' columns.")
 
-    if df_for_model[config.DATE_COLUMN].dt.tz is not None:
-        print(f"INFO (tf_keras_model): Removing timezone from '{config.DATE_COLUMN}' column.")
-        df_for_model[config.DATE_COLUMN] = df_for_model[config.DATE_COLUMN].dt.tz_localize(None)
+def make_training_windows(scaled_data_np: np.ndarray, mode: str, output_steps: int) -> Tuple[np.ndarray, np.ndarray]:
+    target_col_index_in_scaled = 0
+    # Strided-View statt kopierter Fenster (siehe src/sequences.py)
+    if mode == 'direct':
+        X_train_val, y_train_val = multi_horizon_window_sequences(
+            scaled_data_np,
+            scaled_data_np[:, target_col_index_in_scaled],
+            config.LSTM_LOOK_BACK,
+            output_steps
+        )
+    else:
+        X_train_val, y_train_val = sliding_window_sequences(
+            scaled_data_np,
+            scaled_data_np[:, target_col_index_in_scaled],
+            config.LSTM_LOOK_BACK
+        )
 
-    if not pd.api.types.is_numeric_dtype(df_for_model[config.TARGET_COLUMN]):
-        df_for_model[config.TARGET_COLUMN] = pd.to_numeric(df_for_model[config.TARGET_COLUMN], errors='coerce')
+    if X_train_val.shape[0] == 0:
+        raise ValueError("TF: Could not create training sequences. Not enough data after look_back application.")
+    return X_train_val, y_train_val
 
-    if df_for_model[config.TARGET_COLUMN].isnull().any():
-        print(f"WARNING (tf_keras_model): Target column '{config.TARGET_COLUMN}' contains {df_for_model[config.TARGET_COLUMN].isnull().sum()} NaNs. Filling with ffill/bfill.")
-        df_for_model[config.TARGET_COLUMN] = df_for_model[config.TARGET_COLUMN].ffill().bfill()
-        if df_for_model[config.TARGET_COLUMN].isnull().any():
-            print(f"WARNING (tf_keras_model): Target column '{config.TARGET_COLUMN}' still contains NaNs after ffill/bfill. Filling with 0.")
-            df_for_model[config.TARGET_COLUMN] = df_for_model[config.TARGET_COLUMN].fillna(0)
 
-    features_for_lstm_input = [config.TARGET_COLUMN] + [
-        col for col in df_for_model.columns if col not in [config.DATE_COLUMN, config.TARGET_COLUMN]
+def training_callbacks(use_validation_set: bool) -> list:
+    monitor = 'val_loss' if use_validation_set else 'loss'
+    return [
+        EarlyStopping(
+            monitor=monitor,
+            patience=config.LSTM_EARLY_STOPPING_PATIENCE,
+            restore_best_weights=True, verbose=1
+        ),
+        ReduceLROnPlateau(
+            monitor=monitor,
+            factor=0.2, patience=5, min_lr=1e-6, verbose=1
+        )
     ]
-    features_for_lstm_input = sorted(list(set(features_for_lstm_input)))
-    if config.TARGET_COLUMN in features_for_lstm_input:
-        features_for_lstm_input.remove(config.TARGET_COLUMN)
-    features_for_lstm_input = [config.TARGET_COLUMN] + features_for_lstm_input
-
-    print(f"INFO (tf_keras_model): LSTM input features (ordered): {features_for_lstm_input}")
 
-    lstm_input_data_df = df_for_model[features_for_lstm_input].copy()
 
-    for col in lstm_input_data_df.columns:
-        if col != config.TARGET_COLUMN and lstm_input_data_df[col].isnull().any():
-            print(f"WARNING (tf_keras_model): Feature column '{col}' contains NaNs. Filling with ffill/bfill/0.")
-            lstm_input_data_df[col] = lstm_input_data_df[col].ffill().bfill().fillna(0)
+def train_lstm_model(history_df_with_all_features: pd.DataFrame, mode: str = 'recursive') -> Dict[str, Any]:
+    """
+    Trainiert das LSTM und gibt alles zurück, was für (wiederholte) Prognosen nötig ist.
+    mode='direct' trainiert auf Zielvektoren der Länge LSTM_DIRECT_HORIZON (Dense(H)-Ausgang) statt auf den nächsten Wert.
+    """
+    output_steps = config.LSTM_DIRECT_HORIZON if mode == 'direct' else 1
+    df_for_model, features_for_lstm_input, lstm_input_data_df = prepare_lstm_input(history_df_with_all_features)
 
-    if len(lstm_input_data_df) < config.LSTM_LOOK_BACK + 1:
-        raise ValueError(f"TF: Not enough data ({len(lstm_input_data_df)}) for look_back={config.LSTM_LOOK_BACK} + 1.")
+    if len(lstm_input_data_df) < config.LSTM_LOOK_BACK + output_steps:
+        raise ValueError(f"TF: Not enough data ({len(lstm_input_data_df)}) for look_back={config.LSTM_LOOK_BACK} + {output_steps}.")
 
     scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data_np = scaler.fit_transform(lstm_input_data_df)
-
-    target_col_index_in_scaled = 0
-
-    X_train_val, y_train_val = create_multivariate_sequences(
-        scaled_data_np,
-        scaled_data_np[:, target_col_index_in_scaled],
-        config.LSTM_LOOK_BACK
-    )
+    scaled_data_np = np.ascontiguousarray(scaler.fit_transform(lstm_input_data_df), dtype=config.FEATURE_DTYPE) # ohne Kopie, wenn schon float32
 
-    if X_train_val.shape[0] == 0:
-        raise ValueError("TF: Could not create training sequences. Not enough data after look_back application.")
+    X_train_val, y_train_val = make_training_windows(scaled_data_np, mode, output_steps)
 
     val_split_percentage = 0.2
     num_val_samples = int(X_train_val.shape[0] * val_split_percentage)
@@ -324,35 +198,22 @@ def forecast_with_tensorflow(history_df_with_all_features: pd.DataFrame, periods
     print(f"INFO (tf_keras_model): Number of features for LSTM input layer: {n_features_in_model}")
 
     tf.keras.backend.clear_session()
-    model = Sequential()
-    model.add(Input(shape=(config.LSTM_LOOK_BACK, n_features_in_model)))
-    model.add(LSTM(config.LSTM_UNITS_L1, return_sequences=(True if config.LSTM_UNITS_L2 > 0 else False)))
-    model.add(Dropout(config.LSTM_DROPOUT))
-    if config.LSTM_UNITS_L2 > 0:
-        model.add(LSTM(config.LSTM_UNITS_L2, return_sequences=False))
-        model.add(Dropout(config.LSTM_DROPOUT))
-    model.add(Dense(1))
-    model.compile(optimizer='adam', loss='mean_squared_error')
+    model = build_lstm_model(n_features_in_model, output_steps)
     model.summary()
 
-    callbacks = [
-        EarlyStopping(
-            monitor='val_loss' if use_validation_set and X_val is not None else 'loss',
-            patience=config.LSTM_EARLY_STOPPING_PATIENCE,
-            restore_best_weights=True, verbose=1
-        ),
-        ReduceLROnPlateau(
-            monitor='val_loss' if use_validation_set and X_val is not None else 'loss',
-            factor=0.2, patience=5, min_lr=1e-6, verbose=1
-        )
-    ]
+    callbacks = training_callbacks(use_validation_set and X_val is not None)
+
+    train_batches = make_window_dataset(scaled_data_np, y_train_val, 0, len(X_train), config.LSTM_BATCH_SIZE)
+    val_batches = make_window_dataset(scaled_data_np, y_train_val, len(X_train), len(X_val), config.LSTM_BATCH_SIZE) if use_validation_set and X_val is not None else None
 
     print("INFO (tf_keras_model): Training LSTM model...")
-    history = model.fit( # Capture the history object here
-        X_train, y_train, epochs=config.LSTM_EPOCHS, batch_size=config.LSTM_BATCH_SIZE,
-        validation_data=(X_val, y_val) if use_validation_set and X_val is not None else None,
-        callbacks=callbacks, verbose=1, shuffle=False
+    fit_start = time.perf_counter()
+    history = model.fit( # Capture the history object here; batches come in order from the tf.data pipeline
+        train_batches, epochs=config.LSTM_EPOCHS,
+        validation_data=val_batches,
+        callbacks=callbacks, verbose=1
     )
+    fit_seconds = time.perf_counter() - fit_start
     print("INFO (tf_keras_model): Training complete.")
 
     training_loss = history.history['loss'][-1]
@@ -368,83 +229,282 @@ def forecast_with_tensorflow(history_df_with_all_features: pd.DataFrame, periods
         "epochs_trained": len(history.history['loss']), # Actual epochs trained
         "early_stopping_patience": config.LSTM_EARLY_STOPPING_PATIENCE,
         "batch_size": config.LSTM_BATCH_SIZE,
-        "features_used_count": n_features_in_model
+        "features_used_count": n_features_in_model,
+        "forecast_mode": mode,
+        "output_steps": output_steps,
+        "training_samples_per_second": round(len(X_train) * len(history.history['loss']) / fit_seconds, 1)
     }
 
-    print("INFO (tf_keras_model): Generating forecast with iterative feature updates...")
-
-    iterative_history_df = df_for_model.copy()
-
-    current_sequence_scaled = scaled_data_np[-config.LSTM_LOOK_BACK:].reshape((1, config.LSTM_LOOK_BACK, n_features_in_model))
-
-    future_unscaled_y_predictions = []
-    last_known_date_from_input_history = pd.to_datetime(df_for_model[config.DATE_COLUMN].iloc[-1])
-
-    for i in range(periods):
-        predicted_y_scaled_current_step = model.predict(current_sequence_scaled, verbose=0)[0, 0]
-
-        temp_for_unscale = np.zeros((1, n_features_in_model))
-        temp_for_unscale[0, target_col_index_in_scaled] = predicted_y_scaled_current_step
-        predicted_y_unscaled_current_step = scaler.inverse_transform(temp_for_unscale)[0, target_col_index_in_scaled]
-        future_unscaled_y_predictions.append(predicted_y_unscaled_current_step)
-
-        if i < periods - 1:
-            next_prediction_date = last_known_date_from_input_history + pd.Timedelta(days=i + 1)
-
-            new_predicted_row_for_features = pd.DataFrame([{
-                config.DATE_COLUMN: next_prediction_date,
-                config.TARGET_COLUMN: predicted_y_unscaled_current_step
-            }])
+    return {
+        "model": model,
+        "scaler": scaler,
+        "features": features_for_lstm_input,
+        "scaled_data": scaled_data_np,
+        "history_df": df_for_model,
+        "report": model_training_report,
+        "mode": mode,
+    }
 
-            temp_df_for_add_features = pd.concat([
-                iterative_history_df[[config.DATE_COLUMN, config.TARGET_COLUMN]],
-                new_predicted_row_for_features
-            ], ignore_index=True).set_index(config.DATE_COLUMN)
 
-            all_features_recalculated_df, _, _ = add_features(
-                temp_df_for_add_features.copy(),
-                target_column=config.TARGET_COLUMN,
-                include_lag_rolling=True
-            )
+def _artifact_meta(trained: Dict[str, Any], cache_key: Tuple, base_meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Metadaten für model_store: Fingerprints wie im Modell-Cache-Schlüssel, Loss des letzten Volltrainings als Referenz."""
+    report = trained["report"]
+    is_full_training = report.get("training_strategy", "full") == "full"
+    return {
+        "features": trained["features"],
+        "mode": trained["mode"],
+        "output_steps": report["output_steps"],
+        "data_fingerprint": cache_key[3],
+        "config_fingerprint": cache_key[4],
+        "n_rows": int(len(trained["history_df"])),
+        "last_date": str(pd.to_datetime(trained["history_df"][config.DATE_COLUMN].iloc[-1]).date()),
+        "full_training_loss": float(report["training_loss"]) if is_full_training or base_meta is None else base_meta["full_training_loss"],
+        "full_trained_at": datetime.now().isoformat(timespec='seconds') if is_full_training or base_meta is None else base_meta["full_trained_at"],
+        "fine_tune_count": 0 if is_full_training or base_meta is None else int(base_meta.get("fine_tune_count", 0)) + 1,
+        "report": report,
+    }
 
-            next_step_all_unscaled_features_series = all_features_recalculated_df.iloc[-1]
 
-            next_step_unscaled_feature_array = np.array([
-                next_step_all_unscaled_features_series.get(feat_name, 0)
-                for feat_name in features_for_lstm_input
-            ])
+def _full_retrain_reason(stored_meta: Dict[str, Any], features: List[str], mode: str, cache_key: Tuple) -> Optional[str]:
+    """Gründe, die ein Fine-Tuning von vornherein ausschließen (ohne das Modell zu laden)."""
+    if stored_meta.get("config_fingerprint") != cache_key[4]:
+        return "config_changed"
+    if stored_meta.get("mode") != mode:
+        return "mode_changed"
+    if stored_meta.get("features") != features:
+        return "features_changed"
+    try:
+        age_days = (datetime.now() - datetime.fromisoformat(stored_meta["full_trained_at"])).days
+    except (KeyError, TypeError, ValueError):
+        return "invalid_metadata"
+    if age_days > config.LSTM_FULL_RETRAIN_MAX_AGE_DAYS:
+        return f"base_model_age_{age_days}d"
+    return None
+
+
+def fine_tune_lstm_model(history_df_with_all_features: pd.DataFrame, model, scaler, stored_meta: Dict[str, Any],
+                         mode: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Trainiert gespeicherte Gewichte mit kleiner Lernrate für LSTM_FINETUNE_EPOCHS Epochen auf den jüngsten Fenstern weiter.
+    Der Scaler bleibt unverändert (die Gewichte sind auf ihn abgestimmt). Gibt (trained, None) zurück oder (None, grund),
+    wenn stattdessen voll trainiert werden soll: Drift außerhalb des Scaler-Bereichs oder Loss über der Schwelle.
+    """
+    output_steps = config.LSTM_DIRECT_HORIZON if mode == 'direct' else 1
+    df_for_model, features_for_lstm_input, lstm_input_data_df = prepare_lstm_input(history_df_with_all_features)
+    if len(lstm_input_data_df) < config.LSTM_LOOK_BACK + output_steps:
+        raise ValueError(f"TF: Not enough data ({len(lstm_input_data_df)}) for look_back={config.LSTM_LOOK_BACK} + {output_steps}.")
+
+    scaled_data_np = np.ascontiguousarray(scaler.transform(lstm_input_data_df), dtype=config.FEATURE_DTYPE)
+    tolerance = config.LSTM_FINETUNE_DRIFT_TOLERANCE
+    if scaled_data_np.min() < -tolerance or scaled_data_np.max() > 1 + tolerance:
+        return None, "drift"
+
+    X_train_val, y_train_val = make_training_windows(scaled_data_np, mode, output_steps)
+    X_recent = X_train_val[-config.LSTM_FINETUNE_RECENT_WINDOWS:]
+    print(f"INFO (tf_keras_model): Fine-tuning stored LSTM weights on the {len(X_recent)} most recent windows "
+          f"for {config.LSTM_FINETUNE_EPOCHS} epochs (lr={config.LSTM_FINETUNE_LEARNING_RATE}).")
+
+    model.compile(optimizer=Adam(learning_rate=config.LSTM_FINETUNE_LEARNING_RATE), loss='mean_squared_error')
+    recent_batches = make_window_dataset(scaled_data_np, y_train_val, len(X_train_val) - len(X_recent), len(X_recent), config.LSTM_BATCH_SIZE)
+    history = model.fit(recent_batches, epochs=config.LSTM_FINETUNE_EPOCHS, verbose=1)
+    training_loss = history.history['loss'][-1]
 
-            next_step_scaled_feature_array_row = scaler.transform(
-                pd.DataFrame([next_step_unscaled_feature_array], columns=features_for_lstm_input)
-            )
+    loss_limit = stored_meta["full_training_loss"] * config.LSTM_FINETUNE_MAX_LOSS_RATIO
+    if training_loss > loss_limit:
+        print(f"WARNING (tf_keras_model): Fine-tune loss {training_loss:.6f} exceeds limit {loss_limit:.6f}.")
+        return None, "fine_tune_loss_too_high"
+
+    model_training_report = dict(
+        stored_meta.get("report") or {},
+        training_loss=training_loss,
+        validation_loss=None,
+        epochs_trained=len(history.history['loss']),
+        features_used_count=len(features_for_lstm_input),
+        forecast_mode=mode,
+        output_steps=output_steps,
+        training_strategy="fine_tune",
+        fine_tune_windows=len(X_recent),
+    )
+    return {
+        "model": model,
+        "scaler": scaler,
+        "features": features_for_lstm_input,
+        "scaled_data": scaled_data_np,
+        "history_df": df_for_model,
+        "report": model_training_report,
+        "mode": mode,
+    }, None
+
+
+def load_or_train_lstm_model(history_df_with_all_features: pd.DataFrame, mode: str, cache_key: Tuple) -> Dict[str, Any]:
+    """
+    Warm-Start über model_store: identische Daten -> gespeichertes Modell direkt verwenden; neue Ist-Werte -> Fine-Tuning;
+    geänderte Konfiguration/Features, Drift, zu hoher Loss oder zu altes Basismodell -> Volltraining.
+    Das Ergebnis (außer bei unveränderten Daten) wird wieder gespeichert.
+    """
+    container_id, model_name, variant = cache_key[0], cache_key[1], cache_key[2]
+    stored_meta = model_store.read_meta(container_id, model_name, variant)
+    retrain_reason = "no_stored_model" if stored_meta is None else None
+
+    if stored_meta is not None:
+        _, features_for_lstm_input, _ = prepare_lstm_input(history_df_with_all_features)
+        retrain_reason = _full_retrain_reason(stored_meta, features_for_lstm_input, mode, cache_key)
+
+    trained = None
+    if retrain_reason is None:
+        tf.keras.backend.clear_session()
+        artifacts = model_store.load_keras_artifacts(container_id, model_name, variant)
+        if artifacts is None:
+            retrain_reason = "stored_model_unreadable"
+        elif stored_meta.get("data_fingerprint") == cache_key[3]:
+            model, scaler, _ = artifacts
+            df_for_model, features_for_lstm_input, lstm_input_data_df = prepare_lstm_input(history_df_with_all_features)
+            print(f"INFO (tf_keras_model): Using stored LSTM model for '{container_id}' (data unchanged since it was saved).")
+            return {
+                "model": model, "scaler": scaler, "features": features_for_lstm_input,
+                "scaled_data": np.ascontiguousarray(scaler.transform(lstm_input_data_df), dtype=config.FEATURE_DTYPE), "history_df": df_for_model,
+                "report": dict(stored_meta.get("report") or {}, training_strategy="stored", retrain_reason=None),
+                "mode": mode,
+            }
+        else:
+            model, scaler, _ = artifacts
+            trained, retrain_reason = fine_tune_lstm_model(history_df_with_all_features, model, scaler, stored_meta, mode)
+
+    if trained is None:
+        print(f"INFO (tf_keras_model): Full LSTM training for '{container_id}' (reason: {retrain_reason}).")
+        trained = train_lstm_model(history_df_with_all_features, mode=mode)
+        trained["report"] = dict(trained["report"], training_strategy="full", retrain_reason=retrain_reason)
+        stored_meta = None
+    else:
+        trained["report"]["retrain_reason"] = None
+
+    model_store.save_keras_artifacts(container_id, model_name, variant, trained["model"], trained["scaler"],
+                                     _artifact_meta(trained, cache_key, stored_meta),
+                                     numpy_exporter=lambda path: _export_numpy_model(trained, path))
+    return trained
+
+
+def _export_numpy_model(trained: Dict[str, Any], path: str) -> bool:
+    """Schreibt model.npz für lstm_inference, aber nur wenn die NumPy-Vorhersage mit Keras übereinstimmt."""
+    export_npz(path, trained["model"], trained["scaler"], trained["features"])
+    last_window = trained["scaled_data"][-config.LSTM_LOOK_BACK:][np.newaxis].astype(np.float32)
+    difference = max_abs_difference(NumpyLSTMModel.load(path), lambda window: get_predictor(trained)(window).numpy(), last_window)
+    if difference > config.LSTM_NUMPY_TOLERANCE:
+        print(f"WARN (tf_keras_model): NumPy LSTM deviates from Keras by {difference:.2e} (> {config.LSTM_NUMPY_TOLERANCE}). Not exporting model.npz.")
+        os.remove(path)
+        return False
+    return True
+
+
+def predict_with_trained_lstm(trained: Dict[str, Any], periods: int) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    predictor = get_predictor(trained)
+    return recursive_forecast(lambda window: predictor(window).numpy(), trained["scaler"], trained["features"],
+                              trained["scaled_data"], trained["history_df"], periods)
+
+
+def predict_direct_lstm(trained: Dict[str, Any], periods: int) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    predictor = get_predictor(trained)
+    return direct_forecast(lambda window: predictor(window).numpy(), trained["scaler"], trained["scaled_data"],
+                           trained["history_df"], periods)
+
+
+def train_global_lstm_model(frames_by_container: Dict[str, pd.DataFrame], mode: str = 'recursive') -> Dict[str, Any]:
+    """
+    Ein LSTM für alle Container (siehe global_lstm.py): je Container eigener MinMaxScaler, dazu ein One-Hot-Block mit der
+    Container-Kennung als zusätzliche Eingangsfeatures. Die Fenster aller Container werden über tf.data gemischt
+    (sample_from_datasets, gewichtet nach Fensteranzahl), damit kein Container eine Epoche am Stück dominiert.
+    Container mit zu kurzer Historie oder abweichenden Features werden übersprungen und im Bericht aufgeführt.
+    """
+    output_steps = config.LSTM_DIRECT_HORIZON if mode == 'direct' else 1
+    features_for_lstm_input = None
+    prepared: Dict[str, Tuple[MinMaxScaler, np.ndarray]] = {}
+    skipped: Dict[str, str] = {}
+    for container_id, frame in sorted(frames_by_container.items()):
+        if frame is None or len(frame) < config.LSTM_LOOK_BACK + output_steps:
+            skipped[container_id] = "not_enough_data"
+            continue
+        _, container_features, lstm_input_data_df = prepare_lstm_input(frame)
+        if features_for_lstm_input is None:
+            features_for_lstm_input = container_features
+        elif container_features != features_for_lstm_input:
+            skipped[container_id] = "features_differ"
+            continue
+        scaler = MinMaxScaler(feature_range=(0, 1))
+        scaled_data_np = np.ascontiguousarray(scaler.fit_transform(lstm_input_data_df), dtype=config.FEATURE_DTYPE)
+        prepared[container_id] = (scaler, scaled_data_np)
+
+    if not prepared:
+        raise ValueError(f"TF: No container has enough data for the global LSTM (look_back={config.LSTM_LOOK_BACK} + {output_steps}).")
+    containers = list(prepared.keys())
+    print(f"INFO (tf_keras_model): Training global LSTM on {len(containers)} container(s); skipped: {skipped or 'none'}.")
+
+    train_sets, train_counts, val_sets, val_counts = [], [], [], []
+    sample_with_id = None
+    for container_index, container_id in enumerate(containers):
+        scaled_data_np = prepared[container_id][1]
+        container_block = np.zeros((len(scaled_data_np), len(containers)), dtype=scaled_data_np.dtype)
+        container_block[:, container_index] = 1
+        scaled_with_id = np.concatenate([scaled_data_np, container_block], axis=1)
+        X_train_val, y_train_val = make_training_windows(scaled_with_id, mode, output_steps)
+        num_val_samples = int(len(X_train_val) * 0.2)
+        num_train_samples = len(X_train_val) - num_val_samples
+        train_sets.append(make_window_dataset(scaled_with_id, y_train_val, 0, num_train_samples, config.LSTM_BATCH_SIZE))
+        train_counts.append(num_train_samples)
+        if num_val_samples >= 1:
+            val_sets.append(make_window_dataset(scaled_with_id, y_train_val, num_train_samples, num_val_samples, config.LSTM_BATCH_SIZE))
+            val_counts.append(num_val_samples)
+        sample_with_id = scaled_with_id
+
+    def combine(datasets: list, counts: list):
+        if len(datasets) == 1:
+            return datasets[0]
+        weights = [count / sum(counts) for count in counts]
+        return tf.data.Dataset.sample_from_datasets(datasets, weights=weights, seed=42).prefetch(tf.data.AUTOTUNE)
+
+    train_batches = combine(train_sets, train_counts)
+    val_batches = combine(val_sets, val_counts) if val_sets else None
+
+    n_features_in_model = len(features_for_lstm_input) + len(containers)
+    tf.keras.backend.clear_session()
+    model = build_lstm_model(n_features_in_model, output_steps)
+
+    print("INFO (tf_keras_model): Training global LSTM model...")
+    fit_start = time.perf_counter()
+    history = model.fit(train_batches, epochs=config.LSTM_EPOCHS, validation_data=val_batches,
+                        callbacks=training_callbacks(val_batches is not None), verbose=1)
+    fit_seconds = time.perf_counter() - fit_start
+    print("INFO (tf_keras_model): Global training complete.")
+
+    report = {
+        "training_loss": history.history['loss'][-1],
+        "validation_loss": history.history['val_loss'][-1] if 'val_loss' in history.history else None,
+        "look_back_window": config.LSTM_LOOK_BACK,
+        "lstm_units_layer1": config.LSTM_UNITS_L1,
+        "lstm_units_layer2": config.LSTM_UNITS_L2,
+        "dropout_rate": config.LSTM_DROPOUT,
+        "epochs_trained": len(history.history['loss']),
+        "early_stopping_patience": config.LSTM_EARLY_STOPPING_PATIENCE,
+        "batch_size": config.LSTM_BATCH_SIZE,
+        "features_used_count": n_features_in_model,
+        "forecast_mode": mode,
+        "output_steps": output_steps,
+        "training_samples_per_second": round(sum(train_counts) * len(history.history['loss']) / fit_seconds, 1),
+        "training_strategy": "global",
+        "containers_trained": containers,
+        "containers_skipped": skipped,
+    }
+    return {
+        "model": model,
+        "scalers": {container_id: prepared[container_id][0] for container_id in containers},
+        "features": features_for_lstm_input,
+        "containers": containers,
+        "sample_scaled_data": sample_with_id, # Für den Abgleich NumPy vs. Keras beim Export
+        "report": report,
+        "mode": mode,
+    }
 
-            current_sequence_scaled = np.append(
-                current_sequence_scaled[:, 1:, :],
-                next_step_scaled_feature_array_row.reshape(1, 1, n_features_in_model),
-                axis=1
-            )
 
-            new_row_to_add_to_iterative_history = {
-                config.DATE_COLUMN: next_prediction_date,
-                config.TARGET_COLUMN: predicted_y_unscaled_current_step
-            }
-            for feat_name in features_for_lstm_input:
-                if feat_name != config.TARGET_COLUMN:
-                    new_row_to_add_to_iterative_history[feat_name] = next_step_all_unscaled_features_series.get(feat_name, 0)
-
-            iterative_history_df = pd.concat([
-                iterative_history_df,
-                pd.DataFrame([new_row_to_add_to_iterative_history])
-            ], ignore_index=True)
-
-    forecast_dates = pd.date_range(
-        start=last_known_date_from_input_history + pd.Timedelta(days=1),
-        periods=periods,
-        freq='D'
-    )
-    forecast_df = pd.DataFrame({
-        'ds': forecast_dates,
-        'yhat': np.array(future_unscaled_y_predictions).flatten().round(2)
-    })
-    print("INFO (tf_keras_model): Forecast complete.")
-    return forecast_df, model_training_report
\ No newline at end of file
+def export_global_numpy_model(trained: Dict[str, Any], path: str) -> bool:
+    container_features = [f"container_{index}" for index in range(len(trained["containers"]))]
+    return _export_numpy_model({"model": trained["model"], "scaler": None, "features": trained["features"] + container_features,
+                                "scaled_data": trained["sample_scaled_data"]}, path)